@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""Compara o tempo de carregamento do Dashboard: consultas sequenciais, paralelas e RPC única.
+
+Usa o Supabase configurado em .streamlit/secrets.toml. Exemplo:
+    python benchmarks/bench_dashboard_bundle.py --runs 10 --start 2024-01-01 --end 2024-12-31
+"""
+import argparse
+import datetime
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import database
+
+
+def sequential(start, end):
+    return {
+        "recentes": database.fetch_dashboard_data(start, end, 5),
+        "total": database.get_total_customers_count(),
+        "novos_no_periodo": database.get_new_customers_in_period_count(start, end),
+        "stats": database.get_dashboard_stats(start, end),
+    }
+
+
+def concurrent(start, end):
+    return database._fetch_dashboard_bundle_concurrent(start, end)
+
+
+def bundle(start, end):
+    return database.fetch_dashboard_bundle(start, end)
+
+
+def measure(func, runs, start, end):
+    timings = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        func(start, end)
+        timings.append((time.perf_counter() - t0) * 1000)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--start", type=datetime.date.fromisoformat, default=None)
+    parser.add_argument("--end", type=datetime.date.fromisoformat, default=None)
+    args = parser.parse_args()
+
+    # Aquece a conexão para não contar o handshake TLS na primeira medição
+    database.get_total_customers_count()
+
+    print(f"{'caminho':<12} {'mediana (ms)':>13} {'mín (ms)':>10} {'máx (ms)':>10}")
+    for name, func in [("sequencial", sequential), ("paralelo", concurrent), ("rpc única", bundle)]:
+        timings = measure(func, args.runs, args.start, args.end)
+        print(f"{name:<12} {statistics.median(timings):>13.1f} {min(timings):>10.1f} {max(timings):>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""Micro-benchmark: formatação por .apply (validators) vs. vetorizada (formatters).
+
+Exemplo:
+    python benchmarks/bench_formatters.py --rows 10000
+"""
+import argparse
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pandas as pd
+import formatters
+import validators
+
+
+def random_digits(rng, n):
+    return ''.join(rng.choice("0123456789") for _ in range(n))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    columns = {
+        "format_cpf": pd.Series([random_digits(rng, 11) for _ in range(args.rows)]),
+        "format_cnpj": pd.Series([random_digits(rng, 14) for _ in range(args.rows)]),
+        "format_whatsapp": pd.Series([random_digits(rng, rng.choice([10, 11])) for _ in range(args.rows)]),
+        "get_whatsapp_url": pd.Series([random_digits(rng, 11) for _ in range(args.rows)]),
+    }
+
+    print(f"{args.rows} linhas, melhor de {args.repeat} execuções")
+    print(f"{'função':<18} {'apply (ms)':>11} {'vetorizada (ms)':>16} {'ganho':>7}")
+    for name, series in columns.items():
+        scalar = getattr(validators, name)
+        batch = getattr(formatters, name)
+        t_apply = min(timeit.repeat(lambda: series.apply(lambda x: scalar(x) if x else x), number=1, repeat=args.repeat))
+        t_batch = min(timeit.repeat(lambda: batch(series), number=1, repeat=args.repeat))
+        print(f"{name:<18} {t_apply * 1000:>11.1f} {t_batch * 1000:>16.1f} {t_apply / t_batch:>6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""Benchmark do backend SQLite local: paginação por offset vs. cursor (keyset) e busca indexada.
+
+Cria um banco temporário com N clientes e mede as funções públicas de database.py. Exemplo:
+    python benchmarks/bench_sqlite_backend.py --rows 200000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import database
+import validators
+
+
+def seed(backend, rows):
+    rng = random.Random(0)
+    states = ['SP', 'RJ', 'MG', 'PR', 'RS', 'BA', 'SC']
+    with backend.pool.connection() as conn:
+        conn.executemany(
+            "INSERT INTO customers (nome_completo, tipo_documento, cpf, estado, cidade, data_cadastro) VALUES (?, 'CPF', ?, ?, ?, ?)",
+            (
+                (f"Cliente {i}", validators.format_cpf(f"{i:011d}"), rng.choice(states), f"Cidade {i % 500}",
+                 f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}")
+                for i in range(1, rows + 1)
+            ),
+        )
+
+
+def measure(func, runs=20):
+    timings = []
+    for _ in range(runs):
+        database.clear_cache()
+        t0 = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--page-size", type=int, default=25)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        backend = database.create_backend("sqlite", path=os.path.join(tmp, "bench.db"))
+        database.set_backend(backend)
+        seed(backend, args.rows)
+
+        last_page = args.rows // args.page_size
+        cursor = args.page_size + 1 # menor 'id' da penúltima página
+        cases = [
+            ("página 1 (offset)", lambda: database.fetch_data(page=1, page_size=args.page_size)),
+            (f"página {last_page} (offset)", lambda: database.fetch_data(page=last_page, page_size=args.page_size)),
+            (f"página {last_page} (keyset)", lambda: database.fetch_data(page=last_page, page_size=args.page_size, after_id=cursor)),
+            ("busca por CPF (prefixo)", lambda: database.fetch_data(search_query="000.001", page_size=args.page_size)),
+            ("busca por nome (FTS5)", lambda: database.fetch_data(search_query="cliente 4242", page_size=args.page_size)),
+            ("estatísticas do dashboard", lambda: database.get_dashboard_stats()),
+        ]
+        print(f"{args.rows} clientes, {args.page_size} por página")
+        for name, func in cases:
+            print(f"{name:<32} {measure(func):>8.2f} ms")
+        database.set_backend(None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""Micro-benchmark: validação linha a linha (_validate_row) vs. em lote (validators.validate_frame).
+
+A validação linha a linha é medida em uma amostra e extrapolada para o total de linhas.
+
+Exemplo:
+    python benchmarks/bench_validate_frame.py --rows 1000000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+import pandas as pd
+from validate_docbr import CPF, CNPJ
+import database
+import validators
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--sample", type=int, default=20000, help="Linhas validadas uma a uma")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    cpfs = [CPF().generate(mask=True) for _ in range(5000)]
+    cnpjs = [CNPJ().generate(mask=True) for _ in range(5000)]
+    is_cpf = np.arange(args.rows) % 2 == 0
+    df = pd.DataFrame({
+        'nome_completo': 'Cliente',
+        'tipo_documento': np.where(is_cpf, 'CPF', 'CNPJ'),
+        'cpf': np.where(is_cpf, [rng.choice(cpfs) for _ in range(args.rows)], None),
+        'cnpj': np.where(is_cpf, None, [rng.choice(cnpjs) for _ in range(args.rows)]),
+        'telefone1': '(11) 98765-4321',
+        'telefone2': '',
+    })
+
+    started = time.perf_counter()
+    codes = validators.validate_frame(df)
+    t_batch = time.perf_counter() - started
+
+    sample = df.head(args.sample)
+    started = time.perf_counter()
+    for _, row in sample.iterrows():
+        try:
+            database._validate_row(row)
+        except validators.ValidationError:
+            pass
+    t_rows = (time.perf_counter() - started) * args.rows / len(sample)
+
+    print(f"{args.rows} linhas ({int((codes != 0).sum())} com erro)")
+    print(f"linha a linha (estimado): {t_rows:8.1f} s")
+    print(f"validate_frame:           {t_batch:8.1f} s  ({t_rows / t_batch:.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
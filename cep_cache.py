@@ -0,0 +1,102 @@
+"""Cache persistente das consultas de CEP ao ViaCEP, em um arquivo SQLite.
+
+Endereços encontrados valem por `ttl` segundos; CEPs inexistentes (resposta com "erro")
+também são guardados, por `negative_ttl`, para não repetir a consulta. Um LRU em memória na
+frente do arquivo atende as repetições sem acessar o disco; o arquivo mantém o cache entre
+reinícios do aplicativo.
+"""
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from sqlite_backend import ConnectionPool
+
+CEP_CACHE_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS cep_cache (
+        cep TEXT PRIMARY KEY,  -- 8 dígitos
+        payload TEXT,          -- resposta do ViaCEP em JSON; NULL para CEP inexistente
+        fetched_at REAL NOT NULL
+    ) WITHOUT ROWID;
+'''
+
+CEP_CACHE_TTL = 30 * 24 * 3600 # endereços mudam raramente
+CEP_NEGATIVE_TTL = 24 * 3600 # um CEP novo pode passar a existir
+MEMORY_SIZE = 1024 # CEPs mantidos em memória
+
+
+def create_cep_cache_schema(conn: sqlite3.Connection):
+    conn.executescript(CEP_CACHE_SCHEMA)
+
+
+class CepCache:
+    """Respostas do ViaCEP por CEP; `get` retorna (achou, endereço), com endereço None para CEP inexistente."""
+
+    def __init__(self, path: str = "cep_cache.db", ttl: float = CEP_CACHE_TTL,
+                 negative_ttl: float = CEP_NEGATIVE_TTL, memory_size: int = MEMORY_SIZE):
+        self.pool = ConnectionPool(path, size=2, schema=create_cep_cache_schema)
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.memory_size = memory_size
+        self._memory = OrderedDict() # cep -> (gravado em, endereço ou None)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+
+    def _expired(self, fetched_at: float, data) -> bool:
+        return time.time() - fetched_at >= (self.ttl if data is not None else self.negative_ttl)
+
+    def _remember(self, cep: str, fetched_at: float, data):
+        self._memory[cep] = (fetched_at, data)
+        self._memory.move_to_end(cep)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def get(self, cep: str):
+        with self._lock:
+            entry = self._memory.get(cep)
+            if entry is not None:
+                self._memory.move_to_end(cep)
+        if entry is None:
+            with self.pool.connection() as conn:
+                row = conn.execute("SELECT fetched_at, payload FROM cep_cache WHERE cep = ?", (cep,)).fetchone()
+            if row is not None:
+                entry = (row[0], json.loads(row[1]) if row[1] is not None else None)
+                with self._lock:
+                    self._remember(cep, *entry)
+        with self._lock:
+            if entry is None or self._expired(*entry):
+                self.misses += 1
+                return False, None
+            if entry[1] is None:
+                self.negative_hits += 1
+                return True, None
+            self.hits += 1
+        return True, dict(entry[1])
+
+    def set(self, cep: str, data: dict = None):
+        """Guarda o endereço do CEP, ou None se o ViaCEP respondeu que ele não existe."""
+        fetched_at = time.time()
+        payload = json.dumps(data, ensure_ascii=False) if data is not None else None
+        with self.pool.connection() as conn:
+            conn.execute(
+                "INSERT INTO cep_cache (cep, payload, fetched_at) VALUES (?, ?, ?) "
+                "ON CONFLICT (cep) DO UPDATE SET payload = excluded.payload, fetched_at = excluded.fetched_at",
+                (cep, payload, fetched_at))
+        with self._lock:
+            self._remember(cep, fetched_at, dict(data) if data is not None else None)
+
+    def purge(self) -> int:
+        """Remove do arquivo as entradas vencidas; retorna quantas foram removidas."""
+        now = time.time()
+        with self.pool.connection() as conn:
+            cursor = conn.execute(
+                "DELETE FROM cep_cache WHERE fetched_at <= CASE WHEN payload IS NULL THEN ? ELSE ? END",
+                (now - self.negative_ttl, now - self.ttl))
+            return cursor.rowcount
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits, "negative_hits": self.negative_hits, "misses": self.misses,
+                    "memory_size": len(self._memory)}
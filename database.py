@@ -1,8 +1,28 @@
 import pandas as pd
 import streamlit as st
 import logging
+import copy
+import re
+import datetime
+import functools
+import inspect
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
 import validators
-from supabase import create_client, Client
+import formatters
+from storage import StorageBackend
+from supabase_backend import SupabaseBackend
+from sqlite_backend import SQLiteBackend
+from replica import ReplicaBackend, SYNC_INTERVAL
+import outbox as outbox_module
+from document_index import DocumentIndex
+import http_pool
+import metrics
+from supabase import create_client, Client, ClientOptions
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
@@ -12,6 +32,9 @@ class DatabaseError(Exception):
 class DuplicateEntryError(DatabaseError):
     pass
 
+class DatabaseUnavailableError(DatabaseError):
+    """O disjuntor do cliente HTTP está aberto (muitas falhas seguidas do banco)."""
+
 DB_COLUMNS = [
     'nome_completo', 'tipo_documento', 'cpf', 'cnpj', 
     'contato1', 'telefone1', 'contato2', 'telefone2', 'cargo',
@@ -20,16 +43,443 @@ DB_COLUMNS = [
     'observacao', 'data_cadastro'
 ]
 ALL_COLUMNS_WITH_ID = ['id'] + DB_COLUMNS
+REPLICA_COLUMNS = ALL_COLUMNS_WITH_ID + ['updated_at'] # colunas copiadas para a réplica local
+DASHBOARD_COLUMNS = ['nome_completo', 'email', 'cidade', 'data_cadastro', 'tipo_documento', 'estado']
 
 @st.cache_resource
 def get_supabase_client() -> Client:
+    global _http_transport
     url = st.secrets.get("SUPABASE_URL")
     key = st.secrets.get("SUPABASE_KEY")
     if not url or not key:
         st.error("Por favor, configure SUPABASE_URL e SUPABASE_KEY nos Segredos (Secrets) do seu Streamlit App.")
         st.stop()
+    client, transport = http_pool.create_http_client({name: _get_setting(name) for name in http_pool.DEFAULTS}, open_error=DatabaseUnavailableError)
+    _http_transport = transport
+    return create_client(url, key, options=ClientOptions(httpx_client=client))
+
+def get_supabase_admin_client() -> Client:
+    """Cliente com a chave service_role (SUPABASE_SERVICE_KEY), só para manutenção por linha de
+    comando (ex.: python rollup.py). Nunca é usado pelas páginas."""
+    url = _get_setting("SUPABASE_URL")
+    key = _get_setting("SUPABASE_SERVICE_KEY")
+    if not url or not key:
+        raise DatabaseError("Configure SUPABASE_URL e SUPABASE_SERVICE_KEY nos Segredos para esta operação de manutenção.")
     return create_client(url, key)
 
+_http_transport = None
+
+def get_http_stats() -> dict:
+    """Uso do pool de conexões HTTP do Supabase (ver http_pool.py); None antes do primeiro acesso."""
+    return _http_transport.stats() if _http_transport is not None else None
+
+def _get_setting(name: str, default=None):
+    """Lê uma configuração de st.secrets, usando o padrão se ela (ou o arquivo) não existir."""
+    try:
+        return st.secrets.get(name, default)
+    except Exception:
+        return default
+
+# --- Backend de armazenamento ---
+
+_backend = None
+_backend_lock = threading.Lock()
+
+def create_backend(name: str, **options) -> StorageBackend:
+    """Cria um backend: 'supabase' (padrão), 'sqlite' (opções: path, pool_size) ou
+    'replica' (réplica SQLite do Supabase; opções: path, pool_size, sync_interval)."""
+    if name == "supabase":
+        # O cliente é buscado a cada chamada, permitindo substituí-lo (ex.: em testes)
+        return SupabaseBackend(lambda: get_supabase_client(), lambda: get_supabase_admin_client())
+    if name == "sqlite":
+        return SQLiteBackend(
+            options.get("path", "clientes.db"),
+            int(options.get("pool_size", 4)),
+            connect=lambda: get_db_connection(),
+        )
+    if name == "replica":
+        local = SQLiteBackend(options.get("path", "clientes.db"), int(options.get("pool_size", 4)))
+        return ReplicaBackend(
+            create_backend("supabase"), local, REPLICA_COLUMNS,
+            sync_interval=float(options.get("sync_interval", SYNC_INTERVAL)),
+            on_change=lambda rows: invalidate_cache(rows),
+        )
+    raise ValueError(f"Backend de armazenamento desconhecido: '{name}'. Use 'supabase', 'sqlite' ou 'replica'.")
+
+def get_backend() -> StorageBackend:
+    """Backend configurado em DB_BACKEND nos Segredos ('supabase', 'sqlite' ou 'replica')."""
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            name = _get_setting("DB_BACKEND", "supabase")
+            _backend = create_backend(
+                name,
+                path=_get_setting("SQLITE_PATH", "clientes.db"),
+                pool_size=_get_setting("SQLITE_POOL_SIZE", 4),
+                sync_interval=_get_setting("REPLICA_SYNC_INTERVAL", SYNC_INTERVAL),
+            )
+            logging.info(f"Backend de armazenamento: {_backend.name}")
+            _start_metrics_server()
+        return _backend
+
+_metrics_server = None
+
+def _start_metrics_server():
+    """Inicia o endpoint /metrics do Prometheus, se METRICS_PORT estiver nos Segredos."""
+    global _metrics_server
+    port = _get_setting("METRICS_PORT")
+    if port and _metrics_server is None:
+        try:
+            _metrics_server = metrics.start_server(int(port))
+        except OSError as e:
+            logging.warning(f"Não foi possível servir as métricas na porta {port}: {e}")
+
+def set_backend(backend: StorageBackend):
+    """Substitui o backend em uso (testes, scripts e benchmarks) e limpa o cache de consultas."""
+    global _backend, _document_index
+    with _backend_lock:
+        _backend = backend
+    _document_index = None
+    clear_cache()
+
+def get_db_connection():
+    """Empresta uma conexão do pool do backend SQLite, para uso com `with`."""
+    backend = get_backend()
+    if not isinstance(backend, SQLiteBackend):
+        raise DatabaseError("O backend em uso não é o SQLite local.")
+    return backend.pool.connection()
+
+# --- Cache de consultas ---
+
+QUERY_CACHE_TTL = 300 # segundos
+QUERY_CACHE_MAXSIZE = 256 # entradas
+
+# Parâmetros que restringem quais clientes uma consulta enxerga; os demais (página, colunas...)
+# apenas diferenciam as entradas do cache
+FILTER_PARAMS = ('search_query', 'state_filter', 'start_date', 'end_date', 'customer_id')
+
+class QueryCache:
+    """Cache LRU com expiração (TTL), compartilhado por todas as sessões do aplicativo.
+
+    Cada entrada guarda os filtros normalizados da consulta, para que uma escrita
+    invalide apenas as consultas que poderiam conter os clientes alterados.
+    """
+
+    def __init__(self, maxsize: int = QUERY_CACHE_MAXSIZE, ttl: float = QUERY_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True, entry[2]
+
+    def set(self, key, value, filters: dict):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, filters, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, rows: list):
+        """Remove as entradas cujos filtros aceitam ao menos um dos clientes em `rows`."""
+        with self._lock:
+            affected = [key for key, (_, filters, _) in self._entries.items() if _filters_match_any(filters, rows)]
+            for key in affected:
+                del self._entries[key]
+            self.invalidations += len(affected)
+            return len(affected)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits, "misses": self.misses, "size": len(self._entries),
+                "evictions": self.evictions, "invalidations": self.invalidations,
+            }
+
+def _normalize_param(name, value):
+    if name == 'search_query':
+        return value.strip() or None if value else None
+    if name == 'state_filter':
+        return None if not value or value == "Todos" else value
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()[:10]
+    if isinstance(value, list):
+        return tuple(value)
+    return value
+
+def _filters_match_any(filters: dict, rows: list) -> bool:
+    if 'customer_id' in filters:
+        return any(row.get('id') is None or int(row['id']) == int(filters['customer_id']) for row in rows)
+    return any(_filters_match(filters, row) for row in rows)
+
+def _filters_match(filters: dict, row: dict) -> bool:
+    """Diz se o cliente pode aparecer no resultado da consulta. Na dúvida, considera que sim."""
+    state = filters.get('state_filter')
+    if state and 'estado' in row and row['estado'] != state:
+        return False
+    search = filters.get('search_query')
+    if search and not ('%' in search or '_' in search):
+        name, digits = _search_terms(search)
+        if name and 'nome_completo' in row and name not in validators.fold_accents(row['nome_completo']):
+            return False
+        if digits and ('cpf' in row or 'cnpj' in row):
+            documents = [validators.only_digits(row.get(col)) for col in ('cpf', 'cnpj')]
+            if not any(doc.startswith(digits) for doc in documents):
+                return False
+    start, end = filters.get('start_date'), filters.get('end_date')
+    if start and end and row.get('data_cadastro'):
+        data_cadastro = str(row['data_cadastro'])[:10]
+        if not start <= data_cadastro <= end:
+            return False
+    return True
+
+query_cache = QueryCache()
+
+ROW_CACHE_MAXSIZE = 2000 # clientes
+
+class RowCache:
+    """Linhas de clientes já baixadas pelas consultas de página, por id (LRU com expiração).
+
+    Atende a visão de detalhes sem nova requisição quando a linha guardada tem as colunas pedidas. Escritas removem os clientes alterados;
+    a expiração cobre as alterações feitas por outros processos.
+    """
+
+    def __init__(self, maxsize: int = ROW_CACHE_MAXSIZE, ttl: float = QUERY_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict() # id -> (expira em, linha sem formatação)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def fill(self, rows: list, generation: int):
+        """Guarda as linhas lidas na geração `generation`; nada é guardado se houve escrita desde então."""
+        with self._lock:
+            # Conferido sob o lock: invalidate_cache muda a geração antes de chamar discard
+            if generation != get_write_generation():
+                return
+            expires = time.monotonic() + self.ttl
+            for row in rows:
+                if row.get('id') is None:
+                    continue
+                key = int(row['id'])
+                self._entries[key] = (expires, dict(row))
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def get(self, customer_id: int, columns: list):
+        """Cópia da linha do cliente, se estiver no cache, dentro da validade e com todas as `columns`."""
+        with self._lock:
+            key = int(customer_id)
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] < time.monotonic():
+                del self._entries[key]
+                entry = None
+            if entry is None or not all(col in entry[1] for col in columns):
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return dict(entry[1])
+
+    def discard(self, ids):
+        with self._lock:
+            for customer_id in ids:
+                self._entries.pop(int(customer_id), None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._entries)}
+
+row_cache = RowCache()
+
+def _record_call(name: str, params: dict, started: float, result=None, error: Exception = None, cache: str = None):
+    filters = metrics.filter_signature({k: v for k, v in params.items() if k in FILTER_PARAMS})
+    metrics.query_metrics.record(name, filters, time.perf_counter() - started, result, error, cache)
+
+def cached_query(func=None, *, invalidate_on: tuple = FILTER_PARAMS):
+    """Decorator de leitura com cache: a chave é o nome da função mais seus argumentos normalizados.
+
+    Uma escrita invalida a entrada se os filtros em `invalidate_on` aceitarem o cliente
+    alterado; com `invalidate_on=()`, qualquer escrita a invalida. Cada chamada, atendida
+    pelo cache ou não, é registrada nas métricas (ver metrics.py).
+    """
+    if func is None:
+        return functools.partial(cached_query, invalidate_on=invalidate_on)
+    signature = inspect.signature(func)
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        params = {name: _normalize_param(name, value) for name, value in bound.arguments.items()}
+        key = (func.__name__, tuple(sorted(params.items())))
+        started = time.perf_counter()
+        hit, value = query_cache.get(key)
+        if not hit:
+            try:
+                value = func(*args, **kwargs)
+            except Exception as e:
+                _record_call(func.__name__, params, started, error=e, cache="miss")
+                raise
+            query_cache.set(key, value, {k: v for k, v in params.items() if k in invalidate_on})
+        _record_call(func.__name__, params, started, value, cache="hit" if hit else "miss")
+        # Cópia para que alterações feitas pelas páginas não contaminem o cache
+        return copy.deepcopy(value)
+    return wrapper
+
+def instrumented(func):
+    """Decorator que registra tempo, linhas e bytes de cada chamada nas métricas (gravações e consultas sem cache)."""
+    signature = inspect.signature(func)
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        params = signature.bind(*args, **kwargs).arguments
+        started = time.perf_counter()
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            _record_call(func.__name__, params, started, error=e)
+            raise
+        _record_call(func.__name__, params, started, result)
+        return result
+    return wrapper
+
+def get_query_metrics():
+    """Tabela de métricas por consulta: chamadas, p50/p95/p99 (ms), linhas e bytes médios."""
+    return metrics.query_metrics.summary()
+
+def get_prometheus_metrics() -> str:
+    return metrics.query_metrics.prometheus_text()
+
+def reset_query_metrics():
+    metrics.query_metrics.reset()
+
+_write_counter = itertools.count(1)
+_write_generation = 0
+
+def get_write_generation() -> int:
+    """Muda a cada gravação (invalidate_cache) e limpeza do cache: caches fora deste módulo,
+    como o de páginas (page_cache.py), descartam o que foi buscado em uma geração anterior."""
+    return _write_generation
+
+def invalidate_cache(rows: list):
+    """Invalida as consultas em cache afetadas pela escrita dos clientes em `rows`."""
+    global _write_generation
+    rows = [row for row in rows if row]
+    _add_states(rows)
+    if rows:
+        _write_generation = next(_write_counter)
+        row_cache.discard(row['id'] for row in rows if row.get('id') is not None)
+        removed = query_cache.invalidate(rows)
+        logging.info(f"Cache: {removed} consulta(s) invalidada(s) por escrita em {len(rows)} cliente(s).")
+
+def clear_cache():
+    global _states, _write_generation
+    _write_generation = next(_write_counter)
+    query_cache.clear()
+    row_cache.clear()
+    _states = None
+
+def get_cache_stats() -> dict:
+    """Contadores do cache de consultas: hits, misses, size, evictions e invalidations."""
+    return query_cache.stats()
+
+# --- Execução concorrente de consultas ---
+
+QUERY_WORKERS = 8 # threads compartilhadas por todas as sessões
+
+_executor = None
+_executor_lock = threading.Lock()
+_worker_state = threading.local()
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            workers = int(_get_setting("DB_QUERY_WORKERS", QUERY_WORKERS))
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="database")
+        return _executor
+
+def _run_in_worker(func, ctx):
+    # O contexto da sessão do Streamlit acompanha a tarefa, para que st.* funcione na thread
+    thread = threading.current_thread()
+    if ctx is not None:
+        add_script_run_ctx(thread, ctx)
+    was_active = getattr(_worker_state, 'active', False)
+    _worker_state.active = True
+    try:
+        return func()
+    except DatabaseError:
+        raise
+    except Exception as e:
+        raise DatabaseError(f"Erro ao executar consulta em paralelo: {e}") from e
+    finally:
+        _worker_state.active = was_active
+        if ctx is not None:
+            add_script_run_ctx(thread, None)
+
+def submit_query(func, *args, **kwargs):
+    """Agenda `func(*args, **kwargs)` no pool compartilhado e retorna o Future.
+
+    Exceções que não forem DatabaseError são convertidas em DatabaseError.
+    """
+    task = functools.partial(func, *args, **kwargs)
+    if getattr(_worker_state, 'active', False):
+        # Já dentro do pool: executa na própria thread para não esperar por vagas que ela ocupa
+        future = Future()
+        try:
+            future.set_result(_run_in_worker(task, None))
+        except DatabaseError as e:
+            future.set_exception(e)
+        return future
+    ctx = get_script_run_ctx(suppress_warning=True)
+    return _get_executor().submit(_run_in_worker, task, ctx)
+
+def run_queries(calls: dict, return_exceptions: bool = False) -> dict:
+    """Executa consultas independentes em paralelo e espera por todas.
+
+    `calls` mapeia um nome para uma função sem argumentos (use functools.partial ou lambda).
+    Retorna {nome: resultado}. Se alguma falhar, lança a DatabaseError da primeira (na ordem
+    de `calls`) ou, com `return_exceptions=True`, devolve a exceção no lugar do resultado.
+    """
+    futures = {name: submit_query(func) for name, func in calls.items()}
+    results = {}
+    for name, future in futures.items():
+        try:
+            results[name] = future.result()
+        except DatabaseError as e:
+            results[name] = e
+    if not return_exceptions:
+        for result in results.values():
+            if isinstance(result, DatabaseError):
+                raise result
+    return results
+
 def _validate_row(row: pd.Series):
     doc_type = row.get('tipo_documento')
     if not row.get('nome_completo') or not doc_type:
@@ -51,182 +501,486 @@ def _validate_row(row: pd.Series):
     if row.get('email') and len(row.get('email')) > 0:
         validators.is_valid_email(row['email'])
 
+@instrumented
 def insert_customer(data: dict):
     data_to_insert = {k: v for k, v in data.items() if v is not None and v != ''}
     _validate_row(pd.Series(data_to_insert))
-    
+    data_to_insert = {k: v.isoformat() if isinstance(v, datetime.date) else v for k, v in data_to_insert.items()}
+
+    outbox = get_outbox()
+    if outbox is not None:
+        # Gravação em segundo plano: o cadastro fica na fila local e é enviado pelo flusher
+        if outbox.has_pending(data_to_insert.get('cpf') or data_to_insert.get('cnpj')):
+            raise DuplicateEntryError("O CPF ou CNPJ informado já está na fila de envio.")
+        outbox.enqueue(data_to_insert)
+        _flusher.wake()
+        logging.info(f"Cliente '{data.get('nome_completo')}' colocado na fila de envio.")
+        return
+
     try:
-        response = get_supabase_client().table("customers").insert(data_to_insert).execute()
+        inserted = get_backend().insert_customer(data_to_insert)
         logging.info(f"Cliente '{data.get('nome_completo')}' inserido com sucesso.")
+        invalidate_cache(inserted or [data_to_insert])
+        _update_document_index(added=inserted or [data_to_insert])
     except Exception as e:
-        error_msg = str(e).lower()
-        if "duplicate key value" in error_msg or "unique constraint" in error_msg:
-            logging.warning("Tentativa de inserir CPF/CNPJ duplicado.")
-            raise DuplicateEntryError("O CPF ou CNPJ informado já existe no banco de dados.") from e
-        logging.error(f"Erro ao inserir cliente: {e}")
-        raise DatabaseError(f"Ocorreu um erro ao salvar no Supabase: {e}") from e
-
-def _apply_filters(query, search_query: str = None, state_filter: str = None, start_date=None, end_date=None):
-    if search_query:
-        search_pattern = f"%{search_query}%"
-        query = query.or_(f"nome_completo.ilike.{search_pattern},cpf.ilike.{search_pattern},cnpj.ilike.{search_pattern}")
-    
-    if state_filter and state_filter != "Todos":
-        query = query.eq("estado", state_filter)
-        
-    if start_date and end_date:
-        query = query.gte("data_cadastro", start_date).lte("data_cadastro", end_date)
-        
-    return query
+        _raise_insert_error(e)
 
-def count_total_records(search_query: str = None, state_filter: str = None) -> int:
+def _raise_insert_error(e: Exception):
+    """Converte o erro do backend em DuplicateEntryError (CPF/CNPJ repetido) ou DatabaseError."""
+    error_msg = str(e).lower()
+    if "duplicate key value" in error_msg or "unique constraint" in error_msg:
+        logging.warning("Tentativa de inserir CPF/CNPJ duplicado.")
+        raise DuplicateEntryError("O CPF ou CNPJ informado já existe no banco de dados.") from e
+    logging.error(f"Erro ao inserir cliente: {e}")
+    raise DatabaseError(f"Ocorreu um erro ao salvar no banco de dados: {e}") from e
+
+@instrumented
+def insert_customers(rows: list) -> list:
+    """Insere um lote de clientes já validados em uma única operação e retorna as linhas gravadas.
+
+    O lote é atômico: se algum CPF/CNPJ já existir, lança DuplicateEntryError e nada é gravado.
+    """
+    rows = [{k: v.isoformat() if isinstance(v, datetime.date) else v for k, v in row.items()} for row in rows]
+    if not rows:
+        return []
     try:
-        query = get_supabase_client().table("customers").select("id", count="exact")
-        query = _apply_filters(query, search_query, state_filter)
-        response = query.execute()
-        return response.count if response.count is not None else 0
+        inserted = get_backend().insert_customers(rows)
+        logging.info(f"{len(rows)} cliente(s) inserido(s) em lote.")
+        invalidate_cache(inserted or rows)
+        _update_document_index(added=inserted or rows)
+        return inserted
     except Exception as e:
-        raise DatabaseError(f"Não foi possível contar os registros: {e}") from e
+        _raise_insert_error(e)
+
+# --- Fila de gravação em segundo plano (outbox) ---
 
-def fetch_data(search_query: str = None, state_filter: str = None, page: int = 1, page_size: int = 10000):
+_outbox = None
+_flusher = None
+_outbox_lock = threading.Lock()
+
+def get_outbox():
+    """Fila local de cadastros, se WRITE_BEHIND estiver ativo nos Segredos (senão None).
+
+    Na primeira chamada abre o arquivo OUTBOX_PATH e inicia a thread que envia a fila.
+    """
+    global _outbox, _flusher
+    with _outbox_lock:
+        if _outbox is None and _get_setting("WRITE_BEHIND", False):
+            _outbox = outbox_module.Outbox(_get_setting("OUTBOX_PATH", "outbox.db"))
+            _flusher = outbox_module.Flusher(
+                _outbox, insert_customers, DuplicateEntryError,
+                transient_errors=outbox_module.TRANSIENT_ERRORS + (DatabaseUnavailableError,))
+            _flusher.start()
+            logging.info("Fila de gravação em segundo plano ativa.")
+        return _outbox
+
+def get_outbox_stats() -> dict:
+    """Profundidade da fila e latência de envio (ver outbox.Outbox.stats); None se a fila estiver desativada."""
+    outbox = get_outbox()
+    if outbox is None:
+        return None
+    stats = outbox.stats()
+    stats["last_flush_seconds"] = _flusher.last_flush_seconds
+    return stats
+
+def get_outbox_problems() -> list:
+    """Cadastros da fila recusados pelo banco (CPF/CNPJ duplicado ou falha definitiva) ainda não vistos."""
+    outbox = get_outbox()
+    return outbox.problems() if outbox is not None else []
+
+def acknowledge_outbox_problems(ids: list):
+    outbox = get_outbox()
+    if outbox is not None:
+        outbox.acknowledge(ids)
+
+DOCUMENT_LOOKUP_BATCH = 1000 # documentos por consulta (limita o tamanho da URL do PostgREST)
+
+@instrumented
+def find_existing_documents(cpfs=(), cnpjs=()) -> set:
+    """Retorna os CPFs/CNPJs (formatados) de `cpfs` e `cnpjs` que já existem no banco.
+
+    Cada lote de até DOCUMENT_LOOKUP_BATCH documentos é verificado em uma única consulta 'in'.
+    """
+    cpfs = sorted({c for c in cpfs if c})
+    cnpjs = sorted({c for c in cnpjs if c})
+    documents = [('cpf', c) for c in cpfs] + [('cnpj', c) for c in cnpjs]
+    existing = set()
     try:
-        query = get_supabase_client().table("customers").select("*")
-        query = _apply_filters(query, search_query, state_filter)
-        
-        offset = (page - 1) * page_size
-        query = query.range(offset, offset + page_size - 1).order("id", desc=True)
-        
-        response = query.execute()
-        
-        df = pd.DataFrame(response.data)
-        if df.empty:
-            df = pd.DataFrame(columns=ALL_COLUMNS_WITH_ID)
-            return df
-            
-        df['data_nascimento'] = pd.to_datetime(df['data_nascimento'], errors='coerce').dt.date
-        df['data_cadastro'] = pd.to_datetime(df['data_cadastro'], errors='coerce').dt.date
+        for start in range(0, len(documents), DOCUMENT_LOOKUP_BATCH):
+            batch = documents[start:start + DOCUMENT_LOOKUP_BATCH]
+            rows = get_backend().find_documents([v for k, v in batch if k == 'cpf'], [v for k, v in batch if k == 'cnpj'])
+            for row in rows:
+                existing.update(v for v in (row.get('cpf'), row.get('cnpj')) if v)
+    except Exception as e:
+        logging.error(f"Erro ao verificar documentos existentes: {e}")
+        raise DatabaseError(f"Não foi possível verificar os CPFs/CNPJs no banco de dados: {e}") from e
+    return existing & set(cpfs + cnpjs)
+
+# --- Índice em memória de CPFs/CNPJs (ver document_index.py) ---
+
+DOCUMENT_INDEX_TTL = 600 # segundos; recarrega para incorporar gravações de outros processos
+DOCUMENT_INDEX_PAGE_SIZE = 1000 # não acima do max-rows do PostgREST (1000 por padrão)
+
+_document_index = None
+_document_index_lock = threading.Lock()
+_document_index_loader = None # thread da carga em andamento (ou da última)
+_document_index_journal = None # gravações feitas durante a carga, reaplicadas ao fim dela
+
+def _row_documents(rows: list) -> list:
+    return [doc for row in rows if row for doc in (row.get('cpf'), row.get('cnpj')) if doc]
+
+def _load_document_index(backend: StorageBackend) -> DocumentIndex:
+    # Até uma página vazia: o servidor pode devolver menos linhas que as pedidas (max-rows)
+    documents, after_id = [], None
+    while True:
+        rows, _ = backend.select_customers(['id', 'cpf', 'cnpj'], _query_filters(), 1, DOCUMENT_INDEX_PAGE_SIZE, after_id)
+        if not rows:
+            break
+        documents.extend(_row_documents(rows))
+        after_id = min(int(row['id']) for row in rows)
+    index = DocumentIndex()
+    index.load(documents) # também marca o momento da carga quando não há documentos
+    return index
+
+def _reload_document_index(backend: StorageBackend):
+    global _document_index, _document_index_journal
+    try:
+        index = _load_document_index(backend)
+    except Exception as e:
+        logging.warning(f"Falha ao carregar o índice de documentos: {e}")
+        index = None
+    with _document_index_lock:
+        if _backend is not backend: # backend substituído durante a carga
+            pass
+        elif index is not None:
+            for added, removed in _document_index_journal:
+                index.remove(removed)
+                index.add(added)
+            _document_index = index
+            logging.info(f"Índice de documentos carregado: {len(index)} CPF(s)/CNPJ(s).")
+        elif _document_index is not None:
+            _document_index.loaded_at = time.monotonic() # segue com o anterior até o próximo TTL
+        _document_index_journal = None
+
+def get_document_index() -> DocumentIndex:
+    """Índice dos CPFs/CNPJs cadastrados, ou None enquanto a primeira carga não termina.
+
+    A carga (e a recarga a cada DOCUMENT_INDEX_TTL segundos) roda em segundo plano; as
+    gravações feitas por este processo atualizam o índice na hora.
+    """
+    global _document_index_loader, _document_index_journal
+    index = _document_index
+    ttl = float(_get_setting("DOCUMENT_INDEX_TTL", DOCUMENT_INDEX_TTL))
+    if index is not None and time.monotonic() - index.loaded_at < ttl:
+        return index
+    with _document_index_lock:
+        if _document_index_loader is None or not _document_index_loader.is_alive():
+            _document_index_journal = []
+            _document_index_loader = threading.Thread(
+                target=_reload_document_index, args=(get_backend(),), name="document-index", daemon=True)
+            _document_index_loader.start()
+    return index
+
+def _update_document_index(added: list = (), removed: list = ()):
+    """Aplica gravações ao índice, se ele já estiver carregado (remoções antes das inclusões)."""
+    added, removed = _row_documents(added), _row_documents(removed)
+    with _document_index_lock:
+        if _document_index_journal is not None:
+            _document_index_journal.append((added, removed))
+        index = _document_index
+        if index is not None:
+            index.remove(removed)
+            index.add(added)
+
+def document_exists(document: str) -> bool:
+    """Indica se o CPF ou CNPJ (com ou sem pontuação) já está cadastrado.
+
+    A resposta negativa vem só do índice em memória. A positiva é confirmada no banco,
+    pois o cliente pode ter sido removido por outro processo desde a última carga; o
+    banco também é consultado enquanto o índice não foi carregado.
+    """
+    index = get_document_index()
+    if index is not None and document not in index:
+        return False
+    digits = validators.only_digits(document)
+    cpfs, cnpjs = ([validators.format_cpf(digits)], []) if len(digits) == 11 else ([], [validators.format_cnpj(digits)])
+    try:
+        return bool(find_existing_documents(cpfs, cnpjs))
+    except DatabaseError as e:
+        if index is None:
+            raise
+        logging.warning(f"Não foi possível confirmar o documento no banco; usando o índice: {e}")
+        return True
+
+def _search_terms(search_query: str):
+    """Separa a busca em (nome sem acentos, dígitos do documento); apenas um dos dois é usado.
+
+    Termos com letras buscam no nome; termos só com números e pontuação buscam por
+    prefixo nos dígitos do CPF/CNPJ, com ou sem pontuação.
+    """
+    name = ' '.join(re.sub(r'[,()*"\\]', ' ', validators.fold_accents(search_query)).split())
+    if any(c.isalpha() for c in name):
+        return name, None
+    digits = validators.only_digits(search_query)
+    return None, digits or None
+
+def _query_filters(search_query: str = None, state_filter: str = None, start_date=None, end_date=None) -> dict:
+    """Normaliza os filtros das páginas no formato usado pelos backends (ver storage.py)."""
+    name, digits = _search_terms(search_query) if search_query else (None, None)
+    both_dates = bool(start_date and end_date)
+    return {
+        'name': name,
+        'digits': digits,
+        'state': state_filter if state_filter and state_filter != "Todos" else None,
+        'start_date': _normalize_param('start_date', start_date) if both_dates else None,
+        'end_date': _normalize_param('end_date', end_date) if both_dates else None,
+    }
+
+# Estratégias de contagem do PostgREST: 'exact' (COUNT(*) completo), 'planned' (estimativa do
+# planejador do Postgres) e 'estimated' (exata até o limite de linhas do servidor, planejada acima dele)
+COUNT_METHODS = ('exact', 'planned', 'estimated')
+
+def _check_count_method(count: str):
+    if count not in COUNT_METHODS:
+        raise ValueError(f"Estratégia de contagem inválida: '{count}'. Use uma de {COUNT_METHODS}.")
+
+@cached_query
+def count_total_records(search_query: str = None, state_filter: str = None, count: str = 'exact') -> int:
+    _check_count_method(count)
+    try:
+        return get_backend().count_customers(_query_filters(search_query, state_filter), count)
+    except Exception as e:
+        raise DatabaseError(f"Não foi possível contar os registros: {e}") from e
+
+# Colunas calculadas a partir de outra coluna do banco
+DERIVED_COLUMNS = {'link_wpp_1': 'telefone1', 'link_wpp_2': 'telefone2'}
+
+def _select_columns(columns: list = None) -> list:
+    """Monta a projeção do select. 'id' é sempre incluído (paginação e seleção na grade)."""
+    if not columns:
+        return list(ALL_COLUMNS_WITH_ID)
+    selected = ['id']
+    for col in columns:
+        source = DERIVED_COLUMNS.get(col, col)
+        if source not in selected:
+            selected.append(source)
+    return selected
+
+def _format_customer_df(df: pd.DataFrame) -> pd.DataFrame:
+    """Formata datas, documentos e telefones; colunas ausentes na projeção são ignoradas."""
+    for col in ['data_nascimento', 'data_cadastro']:
+        if col in df.columns:
+            df[col] = pd.to_datetime(df[col], errors='coerce').dt.date
+
+    if 'cpf' in df.columns:
+        df['cpf'] = formatters.format_filled(df['cpf'], formatters.format_cpf)
+    if 'cnpj' in df.columns:
+        df['cnpj'] = formatters.format_filled(df['cnpj'], formatters.format_cnpj)
+
+    if 'telefone1' in df.columns:
+        df['link_wpp_1'] = formatters.format_filled(df['telefone1'], formatters.get_whatsapp_url)
+        df['telefone1'] = formatters.format_filled(df['telefone1'], formatters.format_whatsapp)
+    if 'telefone2' in df.columns:
+        df['link_wpp_2'] = formatters.format_filled(df['telefone2'], formatters.get_whatsapp_url)
+        df['telefone2'] = formatters.format_filled(df['telefone2'], formatters.format_whatsapp)
+    return df
+
+def _format_customer_dict(customer_dict: dict) -> dict:
+    if customer_dict.get('data_nascimento'):
+        try: customer_dict['data_nascimento'] = pd.to_datetime(customer_dict['data_nascimento']).date()
+        except: customer_dict['data_nascimento'] = None
+    if customer_dict.get('data_cadastro'):
+        try: customer_dict['data_cadastro'] = pd.to_datetime(customer_dict['data_cadastro']).date()
+        except: customer_dict['data_cadastro'] = None
+
+    if customer_dict.get('cpf'): customer_dict['cpf'] = validators.format_cpf(customer_dict.get('cpf'))
+    if customer_dict.get('cnpj'): customer_dict['cnpj'] = validators.format_cnpj(customer_dict.get('cnpj'))
+    if customer_dict.get('telefone1'): customer_dict['telefone1'] = validators.format_whatsapp(customer_dict.get('telefone1'))
+    if customer_dict.get('telefone2'): customer_dict['telefone2'] = validators.format_whatsapp(customer_dict.get('telefone2'))
+    return customer_dict
+
+def _query_customers(search_query, state_filter, page, page_size, after_id, before_id, columns, count=None, cache_rows=True):
+    generation = get_write_generation()
+    rows, total = get_backend().select_customers(
+        _select_columns(columns), _query_filters(search_query, state_filter), page, page_size, after_id, before_id, count)
+    if cache_rows:
+        row_cache.fill(rows, generation)
+    df = pd.DataFrame(rows)
+    if df.empty:
+        empty_columns = ['id'] + [c for c in columns if c != 'id'] if columns else ALL_COLUMNS_WITH_ID
+        return pd.DataFrame(columns=empty_columns), total
         
-        if 'cpf' in df.columns:
-            df['cpf'] = df['cpf'].apply(lambda x: validators.format_cpf(x) if x else x)
-        if 'cnpj' in df.columns:
-            df['cnpj'] = df['cnpj'].apply(lambda x: validators.format_cnpj(x) if x else x)
-            
-        if 'telefone1' in df.columns:
-            df['link_wpp_1'] = df['telefone1'].apply(lambda x: validators.get_whatsapp_url(x) if x else x)
-            df['telefone1'] = df['telefone1'].apply(lambda x: validators.format_whatsapp(x) if x else x)
-        if 'telefone2' in df.columns:
-            df['link_wpp_2'] = df['telefone2'].apply(lambda x: validators.get_whatsapp_url(x) if x else x)
-            df['telefone2'] = df['telefone2'].apply(lambda x: validators.format_whatsapp(x) if x else x)
-            
+    return _format_customer_df(df), total
+
+@cached_query
+def fetch_data(search_query: str = None, state_filter: str = None, page: int = 1, page_size: int = 10000,
+               after_id: int = None, before_id: int = None, columns: list = None):
+    """Busca uma página de clientes. `columns` limita as colunas baixadas e formatadas (padrão: todas)."""
+    try:
+        df, _ = _query_customers(search_query, state_filter, page, page_size, after_id, before_id, columns)
         return df
     except Exception as e:
         raise DatabaseError(f"Erro ao buscar dados: {e}") from e
 
-def get_customer_by_id(customer_id: int) -> dict:
+@cached_query
+def fetch_page(search_query: str = None, state_filter: str = None, page: int = 1, page_size: int = 10000,
+               after_id: int = None, before_id: int = None, columns: list = None, count: str = 'exact'):
+    """Busca uma página e o total de registros dos filtros em uma única requisição.
+
+    Retorna (DataFrame, total). Com `after_id` a contagem cobre apenas os registros após o
+    cursor, então o total é derivado do número da página. Com `before_id` o total não pode
+    ser derivado e é retornado como None, assim como com `count` None (sem contagem).
+    """
+    if count is not None:
+        _check_count_method(count)
     try:
-        response = get_supabase_client().table("customers").select("*").eq("id", customer_id).execute()
+        df, total = _query_customers(search_query, state_filter, page, page_size, after_id, before_id, columns, count)
+    except Exception as e:
+        raise DatabaseError(f"Erro ao buscar dados: {e}") from e
+
+    if total is None or (after_id is None and before_id is not None):
+        return df, None
+    if after_id is not None:
+        total += (page - 1) * page_size
+    return df, total
+
+@cached_query
+def get_customer_by_id(customer_id: int, columns: list = None) -> dict:
+    try:
+        customer_dict = get_backend().get_customer(customer_id, _select_columns(columns))
         
-        if response.data and len(response.data) > 0:
-            customer_dict = response.data[0]
-            
-            if customer_dict.get('data_nascimento'):
-                try: customer_dict['data_nascimento'] = pd.to_datetime(customer_dict['data_nascimento']).date()
-                except: customer_dict['data_nascimento'] = None
-            if customer_dict.get('data_cadastro'):
-                try: customer_dict['data_cadastro'] = pd.to_datetime(customer_dict['data_cadastro']).date()
-                except: customer_dict['data_cadastro'] = None
-
-            if customer_dict.get('cpf'): customer_dict['cpf'] = validators.format_cpf(customer_dict.get('cpf'))
-            if customer_dict.get('cnpj'): customer_dict['cnpj'] = validators.format_cnpj(customer_dict.get('cnpj'))
-            if customer_dict.get('telefone1'): customer_dict['telefone1'] = validators.format_whatsapp(customer_dict.get('telefone1'))
-            if customer_dict.get('telefone2'): customer_dict['telefone2'] = validators.format_whatsapp(customer_dict.get('telefone2'))
-
-            return customer_dict
+        if customer_dict:
+            return _format_customer_dict(customer_dict)
         else:
             return None
     except Exception as e:
         raise DatabaseError(f"Erro ao buscar cliente por ID: {e}") from e
 
+def get_customer_details(customer_id: int, columns: list = None) -> dict:
+    """Cliente para a visão de detalhes: da linha já baixada com a página, se ela tiver as
+    `columns` (padrão: todas), sem nova requisição; senão, de get_customer_by_id."""
+    started = time.perf_counter()
+    selected = _select_columns(columns)
+    customer_dict = row_cache.get(customer_id, selected)
+    if customer_dict is None:
+        return get_customer_by_id(customer_id, columns)
+    customer_dict = _format_customer_dict({col: customer_dict[col] for col in selected})
+    _record_call('get_customer_details', {'customer_id': customer_id}, started, customer_dict, cache="hit")
+    return customer_dict
+
+def get_row_cache_stats() -> dict:
+    return row_cache.stats()
+
+@instrumented
 def delete_customer_by_id(customer_id: int):
     try:
-        response = get_supabase_client().table("customers").delete().eq("id", customer_id).execute()
+        deleted = get_backend().delete_customer(customer_id)
         
-        logging.info(f"Cliente com ID {customer_id} deletado com sucesso do Supabase.")
+        logging.info(f"Cliente com ID {customer_id} deletado com sucesso do banco de dados.")
+        invalidate_cache(deleted or [{'id': customer_id}])
+        _update_document_index(removed=deleted or [])
     except Exception as e:
         logging.error(f"Erro ao deletar cliente com ID {customer_id}: {e}")
         raise DatabaseError(f"Ocorreu um erro ao deletar o cliente: {e}") from e
 
-def fetch_dashboard_data(start_date=None, end_date=None) -> pd.DataFrame:
+DELETE_CHUNK_SIZE = 200 # ids por requisição (limita o tamanho da URL do PostgREST)
+
+@instrumented
+def delete_customers(ids: list, chunk_size: int = DELETE_CHUNK_SIZE) -> dict:
+    """Remove vários clientes com uma requisição 'in' por bloco de `chunk_size` ids.
+
+    Um bloco com erro não interrompe os demais. Retorna {"deleted": [ids removidos],
+    "failed": [{"ids": [...], "error": "mensagem"}, ...]}, um item de "failed" por bloco.
+    """
+    ids = list(dict.fromkeys(int(i) for i in ids))
+    result = {"deleted": [], "failed": []}
+    for start in range(0, len(ids), chunk_size):
+        chunk = ids[start:start + chunk_size]
+        try:
+            deleted = get_backend().delete_customers(chunk)
+        except Exception as e:
+            logging.error(f"Erro ao deletar {len(chunk)} cliente(s) (IDs {chunk[0]}..{chunk[-1]}): {e}")
+            result["failed"].append({"ids": chunk, "error": str(e)})
+            continue
+        result["deleted"].extend(int(row['id']) for row in deleted if row.get('id') is not None)
+        invalidate_cache(deleted or [{'id': i} for i in chunk])
+        _update_document_index(removed=deleted or [])
+    logging.info(f"{len(result['deleted'])} cliente(s) deletado(s) em lote; {len(result['failed'])} bloco(s) com erro.")
+    return result
+
+@cached_query
+def fetch_dashboard_data(start_date=None, end_date=None, limit: int = None) -> pd.DataFrame:
     try:
-        query = get_supabase_client().table("customers").select("nome_completo,email,cidade,data_cadastro,tipo_documento,estado")
-        query = _apply_filters(query, start_date=start_date, end_date=end_date)
-        query = query.order("data_cadastro", desc=True)
-        
-        response = query.execute()
-        df = pd.DataFrame(response.data)
-        if df.empty:
-            return pd.DataFrame(columns=["nome_completo", "email", "cidade", "data_cadastro", "tipo_documento", "estado"])
-        df['data_cadastro'] = pd.to_datetime(df['data_cadastro'], errors='coerce').dt.date
-        return df
+        rows = get_backend().select_recent(DASHBOARD_COLUMNS, _query_filters(start_date=start_date, end_date=end_date), limit)
+        return _dashboard_df(rows)
     except Exception as e:
         raise DatabaseError(f"Erro ao buscar dados para o dashboard: {e}") from e
 
+def _dashboard_df(rows: list) -> pd.DataFrame:
+    df = pd.DataFrame(rows)
+    if df.empty:
+        return pd.DataFrame(columns=DASHBOARD_COLUMNS)
+    df['data_cadastro'] = pd.to_datetime(df['data_cadastro'], errors='coerce').dt.date
+    return df
+
+EDITABLE_COLUMNS = [col for col in DB_COLUMNS if col != 'data_cadastro']
+# Enviadas em toda atualização: o INSERT ... ON CONFLICT do upsert verifica NOT NULL e CHECK
+# na linha proposta antes de detectar o conflito, então elas não podem faltar
+UPSERT_REQUIRED_COLUMNS = ['nome_completo', 'tipo_documento', 'cpf', 'cnpj']
+
+def _normalize_for_diff(df: pd.DataFrame) -> pd.DataFrame:
+    """Colunas editáveis indexadas por 'id', com vazios (None, NaN, '') como None e datas como 'AAAA-MM-DD'."""
+    df = df.set_index('id').reindex(columns=EDITABLE_COLUMNS).astype(object)
+    df = df.where(df.notna() & (df != ''), None)
+    dates = pd.to_datetime(df['data_nascimento'], errors='coerce')
+    df['data_nascimento'] = dates.dt.strftime('%Y-%m-%d').astype(object).where(dates.notna(), None)
+    return df
+
 def _get_updates(edited_df: pd.DataFrame, original_df: pd.DataFrame) -> list:
-    updates = []
-    original_df_indexed = original_df.set_index('id')
-    
-    for _, edited_row in edited_df.iterrows():
-        idx = edited_row['id']
-        if idx in original_df_indexed.index:
-            original_row = original_df_indexed.loc[idx]
-            
-            row_changed = False
-            editable_cols = [col for col in DB_COLUMNS if col not in ['id', 'data_cadastro']]
-            
-            for col in editable_cols: 
-                edited_value = edited_row.get(col)
-                original_value = original_row.get(col)
-
-                if pd.isna(edited_value): edited_value = None
-                if pd.isna(original_value): original_value = None
-                
-                if col in ['data_nascimento']:
-                    edited_date = pd.to_datetime(edited_value).strftime('%Y-%m-%d') if edited_value else None
-                    original_date = pd.to_datetime(original_value).strftime('%Y-%m-%d') if original_value else None
-                    if edited_date != original_date:
-                        row_changed = True
-                        break
-                    continue
+    """Compara as tabelas de uma vez e retorna, por cliente alterado, apenas as colunas que mudaram.
 
-                if (edited_value is None and original_value == '') or (edited_value == '' and original_value is None):
-                    continue
+    Cada atualização leva também o 'id' e UPSERT_REQUIRED_COLUMNS.
+    """
+    edited = _normalize_for_diff(edited_df)
+    edited = edited[edited.index.isin(original_df['id'])]
+    original = _normalize_for_diff(original_df).reindex(edited.index)
+
+    # Células alteradas: valores diferentes, exceto quando ambos estão vazios
+    changed = (edited != original) & ~(edited.isna() & original.isna())
+    changed_rows = changed.any(axis=1)
+    if not changed_rows.any():
+        return []
+    edited, changed = edited[changed_rows], changed[changed_rows]
 
-                if edited_value != original_value:
-                    row_changed = True
-                    break
-            
-            if row_changed:
-                _validate_row(edited_row)
-                
-                update_dict = {"id": int(idx)}
-                for col in editable_cols:
-                    value = edited_row.get(col)
-                    if col == 'data_nascimento' and pd.notna(value):
-                        update_dict[col] = pd.to_datetime(value).strftime('%Y-%m-%d')
-                    elif pd.isna(value) or value == '':
-                        update_dict[col] = None
-                    else:
-                        update_dict[col] = value
-                
-                updates.append(update_dict)
+    updates = []
+    columns = edited.columns
+    required = columns.isin(UPSERT_REQUIRED_COLUMNS)
+    for idx, values, mask in zip(edited.index, edited.to_numpy(), changed.to_numpy()):
+        row = dict(zip(columns, values))
+        _validate_row(pd.Series(row))
+        update = {"id": int(idx)}
+        update.update((col, value) for col, value, send in zip(columns, values, mask | required) if send)
+        updates.append(update)
     return updates
 
+def _group_by_columns(updates: list) -> list:
+    """Agrupa as atualizações com o mesmo conjunto de colunas (um upsert por grupo)."""
+    groups = {}
+    for update in updates:
+        groups.setdefault(tuple(update), []).append(update)
+    return list(groups.values())
+
 def _get_deletes(edited_df: pd.DataFrame) -> list:
     if 'Deletar' not in edited_df.columns:
         return []
     delete_mask = edited_df['Deletar'] == True
     return edited_df.loc[delete_mask, 'id'].tolist()
 
+def _original_rows(original_df: pd.DataFrame, ids: list) -> list:
+    rows = original_df[original_df['id'].isin(ids)]
+    return rows.astype(object).where(rows.notna(), None).to_dict('records')
+
+@instrumented
 def commit_changes(edited_df: pd.DataFrame, original_df: pd.DataFrame):
     deletes = _get_deletes(edited_df)
     if 'Deletar' in edited_df.columns:
@@ -241,45 +995,162 @@ def commit_changes(edited_df: pd.DataFrame, original_df: pd.DataFrame):
         return {"updated": 0, "deleted": 0}
 
     try:
-        if updates:
-            get_supabase_client().table("customers").upsert(updates).execute()
-        if deletes:
-            for d in deletes:
-                get_supabase_client().table("customers").delete().eq("id", int(d)).execute()
-        return {"updated": len(updates), "deleted": len(deletes)}
+        for group in _group_by_columns(updates):
+            get_backend().upsert_customers(group)
     except Exception as e:
-        raise DatabaseError(f"Ocorreu um erro ao atualizar dados no Supabase: {e}") from e
+        raise DatabaseError(f"Ocorreu um erro ao atualizar dados no banco de dados: {e}") from e
+    finally:
+        # Versões nova e antiga de cada cliente alterado: ambas podem estar em consultas em cache
+        originals = _original_rows(original_df, [u['id'] for u in updates])
+        original_by_id = {int(row['id']): row for row in originals}
+        invalidate_cache([{**original_by_id.get(u['id'], {}), **u} for u in updates] + originals)
+    _update_document_index(added=updates, removed=originals)
+
+    # delete_customers invalida o cache dos blocos removidos
+    result = delete_customers(deletes) if deletes else {"deleted": [], "failed": []}
+    if result["failed"]:
+        failed_ids = [i for failure in result["failed"] for i in failure["ids"]]
+        raise DatabaseError(f"{len(updates)} cliente(s) atualizado(s) e {len(result['deleted'])} deletado(s), "
+                            f"mas houve erro ao deletar os IDs {failed_ids}: {result['failed'][0]['error']}")
+    return {"updated": len(updates), "deleted": len(result["deleted"])}
+
+# --- UFs do filtro por estado ---
+
+STATES_CACHE_TTL = 600 # segundos; UFs que deixaram de ter clientes saem da lista na recarga
+
+_states = None # (momento da carga, frozenset das UFs)
+_states_lock = threading.Lock()
+
+@instrumented
+def list_states() -> list:
+    """UFs com clientes, em ordem alfabética, para o filtro por estado.
 
+    A lista fica em memória e é recarregada a cada STATES_CACHE_TTL segundos; uma gravação
+    com uma UF nova a acrescenta na hora, sem consultar o banco (ver invalidate_cache).
+    """
+    global _states
+    cached = _states
+    if cached is None or time.monotonic() - cached[0] >= STATES_CACHE_TTL:
+        try:
+            cached = (time.monotonic(), frozenset(get_backend().list_states()))
+        except Exception as e:
+            raise DatabaseError(f"Não foi possível listar os estados: {e}") from e
+        with _states_lock:
+            _states = cached
+    return sorted(cached[1])
+
+def _add_states(rows: list):
+    global _states
+    with _states_lock:
+        if _states is None:
+            return
+        new_states = {row['estado'] for row in rows if row.get('estado')} - _states[1]
+        if new_states:
+            _states = (_states[0], _states[1] | new_states)
+            logging.info(f"Estados adicionados ao filtro: {sorted(new_states)}")
+
+@cached_query
 def get_total_customers_count() -> int:
     try:
-        response = get_supabase_client().table("customers").select("id", count="exact").execute()
-        return response.count if response.count is not None else 0
+        return get_backend().count_customers(_query_filters())
     except Exception as e:
         raise DatabaseError(f"Não foi possível contar o total de clientes: {e}") from e
 
+@cached_query
 def get_new_customers_in_period_count(start_date, end_date) -> int:
     try:
-        query = get_supabase_client().table("customers").select("id", count="exact")
-        query = _apply_filters(query, start_date=start_date, end_date=end_date)
-        response = query.execute()
-        return response.count if response.count is not None else 0
+        return get_backend().count_customers(_query_filters(start_date=start_date, end_date=end_date))
     except Exception as e:
         raise DatabaseError(f"Não foi possível contar novos clientes do período: {e}") from e
 
-def get_customer_counts_by_state(start_date=None, end_date=None) -> pd.Series:
+DASHBOARD_DIMENSIONS = ['estado', 'cidade', 'tipo_documento', 'mes']
+
+def _stats_from_rows(rows: list) -> dict:
+    """Converte as linhas (dimensao, chave, contagem) em uma Series de contagens por dimensão."""
+    df = pd.DataFrame(rows, columns=['dimensao', 'chave', 'contagem'])
+    stats = {}
+    for dimension in DASHBOARD_DIMENSIONS:
+        group = df[df['dimensao'] == dimension]
+        series = pd.Series(group['contagem'].astype(int).values, index=group['chave'].values, name='count')
+        series.index.name = dimension
+        stats[dimension] = series.sort_values(ascending=False, kind='stable')
+    return stats
+
+@cached_query
+def get_dashboard_stats(start_date=None, end_date=None) -> dict:
+    """Contagens agrupadas por estado, cidade, tipo de documento e mês, calculadas no banco (RPC 'dashboard_stats')."""
     try:
-        query = get_supabase_client().table("customers").select("estado")
-        query = _apply_filters(query, start_date=start_date, end_date=end_date)
-        query = query.not_.is_("estado", "null").neq("estado", "")
-        
-        response = query.execute()
-        df = pd.DataFrame(response.data)
-        if df.empty:
-            return pd.Series(dtype=int)
-            
-        return df['estado'].value_counts()
+        rows = get_backend().dashboard_stats(_normalize_param('start_date', start_date), _normalize_param('end_date', end_date))
+        return _stats_from_rows(rows)
+    except Exception as e:
+        raise DatabaseError(f"Não foi possível obter as estatísticas do dashboard: {e}") from e
+
+@cached_query(invalidate_on=())
+def fetch_dashboard_bundle(start_date=None, end_date=None, recent_limit: int = 5) -> dict:
+    """Busca todos os dados do Dashboard em uma única requisição (RPC 'dashboard_bundle').
+
+    Retorna um dict com 'recentes' (DataFrame), 'total', 'novos_no_periodo' e 'stats'.
+    Se a função não estiver disponível no banco, faz as consultas individuais em paralelo.
+    Como 'total' conta clientes de fora do período, qualquer escrita invalida o cache.
+    """
+    try:
+        data = get_backend().dashboard_bundle(
+            _normalize_param('start_date', start_date), _normalize_param('end_date', end_date), recent_limit)
     except Exception as e:
-        raise DatabaseError(f"Não foi possível obter a contagem de clientes por estado: {e}") from e
+        logging.warning(f"RPC 'dashboard_bundle' indisponível, consultando em paralelo: {e}")
+        return _fetch_dashboard_bundle_concurrent(start_date, end_date, recent_limit)
+    return {
+        "recentes": _dashboard_df(data.get("recentes") or []),
+        "total": int(data.get("total") or 0),
+        "novos_no_periodo": int(data.get("novos_no_periodo") or 0),
+        "stats": _stats_from_rows(data.get("stats") or []),
+    }
+
+def _fetch_dashboard_bundle_concurrent(start_date=None, end_date=None, recent_limit: int = 5) -> dict:
+    return run_queries({
+        "recentes": functools.partial(fetch_dashboard_data, start_date, end_date, recent_limit),
+        "total": get_total_customers_count,
+        "novos_no_periodo": functools.partial(get_new_customers_in_period_count, start_date, end_date),
+        "stats": functools.partial(get_dashboard_stats, start_date, end_date),
+    })
+
+@instrumented
+def rebuild_dashboard_rollup() -> int:
+    """Refaz o resumo diário que alimenta o Dashboard (ver sql/005_customers_daily.sql); retorna o número de grupos.
+
+    Os triggers mantêm o resumo a cada gravação; a reconstrução só é necessária se ele
+    divergir (ex.: dados carregados com os triggers desativados). No Supabase requer a
+    chave service_role (SUPABASE_SERVICE_KEY).
+    """
+    try:
+        groups = get_backend().rebuild_rollup()
+    except Exception as e:
+        raise DatabaseError(f"Não foi possível refazer o resumo do Dashboard: {e}") from e
+    clear_cache()
+    logging.info(f"Resumo diário do Dashboard refeito: {groups} grupo(s).")
+    return int(groups or 0)
+
+def get_customer_counts_by_state(start_date=None, end_date=None) -> pd.Series:
+    return get_dashboard_stats(start_date, end_date)['estado']
+
+def iter_customer_chunks(search_query: str = None, state_filter: str = None, chunk_size: int = 1000, columns: list = None):
+    """Percorre todos os clientes dos filtros em blocos formatados de até `chunk_size` linhas.
+
+    Usa paginação por cursor (keyset), então cada bloco custa o mesmo independentemente
+    da posição, e apenas um bloco fica em memória por vez. Não passa pelo cache de consultas.
+    """
+    after_id = None
+    while True:
+        try:
+            df, _ = _query_customers(search_query, state_filter, 1, chunk_size, after_id, None, columns, cache_rows=False)
+        except Exception as e:
+            raise DatabaseError(f"Erro ao exportar dados: {e}") from e
+        if df.empty:
+            return
+        yield df
+        if len(df) < chunk_size:
+            return
+        after_id = int(df['id'].min())
 
 def df_to_csv(df: pd.DataFrame) -> bytes:
     return df.to_csv(index=False).encode('utf-8')
@@ -0,0 +1,94 @@
+"""Índice em memória dos CPFs/CNPJs já cadastrados, para detectar duplicatas sem ir ao banco.
+
+Cada documento vira um inteiro de 64 bits (os dígitos; CNPJs somam CNPJ_OFFSET para não
+colidirem com CPFs) guardado em um array NumPy ordenado, consultado por busca binária.
+Inclusões e remoções recentes ficam em conjuntos pequenos e são incorporadas ao array de
+tempos em tempos. Um milhão de documentos ocupam cerca de 8 MB.
+"""
+import threading
+import time
+import numpy as np
+import validators
+
+CNPJ_OFFSET = 10 ** 15 # acima de qualquer CNPJ (14 dígitos) e abaixo de 2**64
+COMPACT_THRESHOLD = 1024 # alterações pendentes antes de reconstruir o array
+
+
+def document_key(document: str):
+    """Chave inteira do CPF (11 dígitos) ou CNPJ (14 dígitos); None para outros valores."""
+    digits = validators.only_digits(document)
+    if len(digits) == 11:
+        return int(digits)
+    if len(digits) == 14:
+        return int(digits) + CNPJ_OFFSET
+    return None
+
+
+class DocumentIndex:
+    """Conjunto de documentos com consulta em O(log n), seguro entre threads."""
+
+    def __init__(self, documents=()):
+        self._lock = threading.Lock()
+        self._keys = np.empty(0, dtype=np.uint64)
+        self._added = set()
+        self._removed = set()
+        self.loaded_at = None
+        if documents:
+            self.load(documents)
+
+    def load(self, documents):
+        """Substitui o conteúdo do índice pelos documentos informados."""
+        keys = {key for key in map(document_key, documents) if key is not None}
+        array = np.fromiter(keys, dtype=np.uint64, count=len(keys))
+        array.sort()
+        with self._lock:
+            self._keys, self._added, self._removed = array, set(), set()
+            self.loaded_at = time.monotonic()
+
+    def _has_key(self, key: int) -> bool:
+        if key in self._added:
+            return True
+        if key in self._removed:
+            return False
+        position = np.searchsorted(self._keys, np.uint64(key))
+        return position < len(self._keys) and int(self._keys[position]) == key
+
+    def __contains__(self, document) -> bool:
+        key = document_key(document)
+        if key is None:
+            return False
+        with self._lock:
+            return self._has_key(key)
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._compact()
+            return len(self._keys)
+
+    def add(self, documents):
+        with self._lock:
+            for key in map(document_key, documents):
+                if key is not None:
+                    self._removed.discard(key)
+                    self._added.add(key)
+            if len(self._added) + len(self._removed) > COMPACT_THRESHOLD:
+                self._compact()
+
+    def remove(self, documents):
+        with self._lock:
+            for key in map(document_key, documents):
+                if key is not None:
+                    self._added.discard(key)
+                    self._removed.add(key)
+            if len(self._added) + len(self._removed) > COMPACT_THRESHOLD:
+                self._compact()
+
+    def _compact(self):
+        if not self._added and not self._removed:
+            return
+        keys = self._keys
+        if self._removed:
+            keys = keys[~np.isin(keys, np.fromiter(self._removed, dtype=np.uint64))]
+        if self._added:
+            keys = np.union1d(keys, np.fromiter(self._added, dtype=np.uint64))
+        self._keys, self._added, self._removed = keys, set(), set()
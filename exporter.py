@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""Exportação em fluxo (streaming) dos clientes para CSV, CSV compactado (gzip) ou Parquet.
+
+Os geradores deste módulo produzem bytes à medida que cada bloco é lido do banco, sem
+limite de linhas e com memória limitada ao tamanho de um bloco. Uso pela linha de comando:
+    python exporter.py clientes.csv.gz --format csv --gzip --estado SP
+"""
+import argparse
+import io
+import sys
+import tempfile
+import zlib
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import database
+
+EXPORT_FORMATS = {
+    # formato: (extensão, MIME)
+    "csv": ("csv", "text/csv"),
+    "csv.gz": ("csv.gz", "application/gzip"),
+    "parquet": ("parquet", "application/vnd.apache.parquet"),
+}
+
+_DATE_COLUMNS = ('data_nascimento', 'data_cadastro')
+EXPORT_SPOOL_SIZE = 8 * 1024 * 1024 # bytes mantidos em memória antes de passar para o disco
+
+
+def stream_csv(chunks, compress: bool = False, empty_columns: list = None):
+    """Converte blocos (DataFrames) em bytes CSV UTF-8, opcionalmente compactados em gzip.
+
+    Sem nenhum bloco, gera apenas o cabeçalho com `empty_columns` (se informadas).
+    """
+    compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS) if compress else None
+    columns = None
+    for df in chunks:
+        header = columns is None
+        if header:
+            columns = list(df.columns)
+        data = df.reindex(columns=columns).to_csv(index=False, header=header).encode('utf-8')
+        if compressor is not None:
+            data = compressor.compress(data)
+        if data:
+            yield data
+    if columns is None and empty_columns:
+        data = pd.DataFrame(columns=empty_columns).to_csv(index=False).encode('utf-8')
+        yield compressor.compress(data) if compressor is not None else data
+    if compressor is not None:
+        yield compressor.flush()
+
+
+class _ChunkSink(io.RawIOBase):
+    """Destino de escrita que acumula os bytes até serem drenados (o ParquetWriter só escreve)."""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _parquet_schema(columns) -> pa.Schema:
+    fields = []
+    for col in columns:
+        if col == 'id':
+            fields.append(pa.field(col, pa.int64()))
+        elif col in _DATE_COLUMNS:
+            fields.append(pa.field(col, pa.date32()))
+        else:
+            fields.append(pa.field(col, pa.string()))
+    return pa.schema(fields)
+
+
+def stream_parquet(chunks, empty_columns: list = None):
+    """Converte blocos (DataFrames) em um arquivo Parquet, um row group por bloco.
+
+    Sem nenhum bloco, gera um arquivo válido, sem linhas, com as colunas `empty_columns` (se informadas).
+    """
+    sink = _ChunkSink()
+    writer = None
+    for df in chunks:
+        if writer is None:
+            schema = _parquet_schema(df.columns)
+            writer = pq.ParquetWriter(sink, schema)
+        table = pa.Table.from_pandas(df.reindex(columns=schema.names), schema=schema, preserve_index=False)
+        writer.write_table(table)
+        yield sink.drain()
+    if writer is None and empty_columns:
+        writer = pq.ParquetWriter(sink, _parquet_schema(empty_columns))
+    if writer is not None:
+        writer.close()
+        yield sink.drain()
+
+
+def export_customers(search_query: str = None, state_filter: str = None, fmt: str = "csv", chunk_size: int = 1000):
+    """Gera o arquivo de exportação (bytes) dos clientes que atendem aos filtros."""
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Formato de exportação inválido: '{fmt}'. Use um de {list(EXPORT_FORMATS)}.")
+    chunks = database.iter_customer_chunks(search_query, state_filter, chunk_size)
+    # Sem clientes nos filtros, o arquivo sai vazio, mas com as colunas
+    if fmt == "parquet":
+        return stream_parquet(chunks, database.ALL_COLUMNS_WITH_ID)
+    return stream_csv(chunks, compress=(fmt == "csv.gz"), empty_columns=database.ALL_COLUMNS_WITH_ID)
+
+
+def spool(stream, max_size: int = EXPORT_SPOOL_SIZE):
+    """Grava o fluxo em um arquivo temporário (em memória até `max_size` bytes, depois em disco)
+    e o retorna posicionado no início, para ser lido de uma vez ou em partes."""
+    file = tempfile.SpooledTemporaryFile(max_size=max_size)
+    try:
+        for data in stream:
+            file.write(data)
+    except BaseException:
+        file.close()
+        raise
+    file.seek(0)
+    return file
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exporta os clientes do banco de dados.")
+    parser.add_argument("output", help="Arquivo de saída ('-' para a saída padrão)")
+    parser.add_argument("--format", choices=["csv", "parquet"], default="csv")
+    parser.add_argument("--gzip", action="store_true", help="Compacta o CSV com gzip")
+    parser.add_argument("--busca", default=None, help="Filtro por nome ou CPF/CNPJ")
+    parser.add_argument("--estado", default=None, help="Filtro por UF")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    fmt = "csv.gz" if args.format == "csv" and args.gzip else args.format
+    stream = export_customers(args.busca, args.estado, fmt, args.chunk_size)
+    output = sys.stdout.buffer if args.output == "-" else open(args.output, "wb")
+    try:
+        for data in stream:
+            output.write(data)
+    finally:
+        if output is not sys.stdout.buffer:
+            output.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""Versões vetorizadas das funções de formatação de validators.py.
+
+Cada função recebe uma pandas Series inteira e devolve uma Series com exatamente o
+mesmo resultado da função escalar de mesmo nome aplicada elemento a elemento,
+inclusive "" para valores vazios ou que não podem ser formatados. As operações
+rodam em código nativo via pyarrow.compute, sem laço Python por célula.
+"""
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+
+def _digits(series: pd.Series) -> pa.Array:
+    """Remove tudo que não for dígito, tratando valores nulos como string vazia."""
+    arr = pa.array(series.to_numpy(dtype=object), type=pa.string(), from_pandas=True)
+    return pc.replace_substring_regex(pc.fill_null(arr, ""), r"[^0-9]", "")
+
+def _to_series(formatted: pa.Array, valid: pa.Array, index) -> pd.Series:
+    result = pc.if_else(valid, formatted, "")
+    return pd.Series(result.to_numpy(zero_copy_only=False), index=index, dtype=object)
+
+def format_cpf(series: pd.Series) -> pd.Series:
+    """Formata CPFs para XXX.XXX.XXX-XX (equivalente a validators.format_cpf)."""
+    d = _digits(series)
+    formatted = pc.replace_substring_regex(d, r"^(\d{3})(\d{3})(\d{3})(\d{2})$", r"\1.\2.\3-\4")
+    return _to_series(formatted, pc.equal(pc.utf8_length(d), 11), series.index)
+
+def format_cnpj(series: pd.Series) -> pd.Series:
+    """Formata CNPJs para XX.XXX.XXX/XXXX-XX (equivalente a validators.format_cnpj)."""
+    d = _digits(series)
+    formatted = pc.replace_substring_regex(d, r"^(\d{2})(\d{3})(\d{3})(\d{4})(\d{2})$", r"\1.\2.\3/\4-\5")
+    return _to_series(formatted, pc.equal(pc.utf8_length(d), 14), series.index)
+
+def format_whatsapp(series: pd.Series) -> pd.Series:
+    """Formata telefones para (XX) XXXXX-XXXX ou (XX) XXXX-XXXX (equivalente a validators.format_whatsapp)."""
+    d = _digits(series)
+    # O grupo do meio tem 5 dígitos em números de 11 e 4 em números de 10
+    formatted = pc.replace_substring_regex(d, r"^(\d{2})(\d{4,5})(\d{4})$", r"(\1) \2-\3")
+    length = pc.utf8_length(d)
+    return _to_series(formatted, pc.or_(pc.equal(length, 10), pc.equal(length, 11)), series.index)
+
+def get_whatsapp_url(series: pd.Series) -> pd.Series:
+    """Gera URLs wa.me para cada telefone (equivalente a validators.get_whatsapp_url)."""
+    d = _digits(series)
+    formatted = pc.binary_join_element_wise("https://wa.me/55", d, "")
+    return _to_series(formatted, pc.greater_equal(pc.utf8_length(d), 10), series.index)
+
+def format_filled(series: pd.Series, func) -> pd.Series:
+    """Aplica `func` apenas aos valores preenchidos, mantendo None e "" como estão."""
+    filled = series.notna() & (series != "")
+    if not filled.any():
+        return series
+    return series.mask(filled, func(series))
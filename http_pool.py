@@ -0,0 +1,200 @@
+"""Cliente HTTP do Supabase com pool de conexões, timeouts, novas tentativas e disjuntor.
+
+`ResilientTransport` envolve o transporte do httpx:
+  * leituras (GET/HEAD) que falham por erro de rede ou resposta 502/503/504 são repetidas
+    com espera exponencial e variação aleatória (jitter);
+  * um `CircuitBreaker` conta as falhas seguidas; ao atingir o limite, as requisições
+    falham na hora (sem esperar o timeout) até o banco voltar a responder.
+"""
+import logging
+import random
+import threading
+import time
+import httpx
+
+RETRY_METHODS = ("GET", "HEAD") # apenas leituras são repetidas com segurança
+RETRY_STATUS = (502, 503, 504)
+
+DEFAULTS = {
+    "HTTP_MAX_CONNECTIONS": 20,
+    "HTTP_MAX_KEEPALIVE": 10,
+    "HTTP_KEEPALIVE_EXPIRY": 30.0, # segundos que uma conexão ociosa fica aberta
+    "HTTP_CONNECT_TIMEOUT": 5.0,
+    "HTTP_READ_TIMEOUT": 30.0,
+    "HTTP_WRITE_TIMEOUT": 30.0,
+    "HTTP_POOL_TIMEOUT": 5.0, # espera máxima por uma conexão livre do pool
+    "HTTP_RETRIES": 3,
+    "HTTP_RETRY_BACKOFF": 0.25, # segundos antes da 1ª nova tentativa; dobra a cada uma
+    "HTTP_RETRY_BACKOFF_MAX": 5.0,
+    "HTTP2": True,
+    "CIRCUIT_FAILURE_THRESHOLD": 5, # falhas seguidas para abrir o disjuntor
+    "CIRCUIT_RESET_TIMEOUT": 30.0, # segundos aberto antes de deixar uma requisição de teste passar
+}
+
+
+def retry_delay(attempt: int, base: float, maximum: float) -> float:
+    """Espera antes da nova tentativa `attempt` (1, 2, ...): exponencial com jitter completo."""
+    return random.uniform(0, min(maximum, base * 2 ** (attempt - 1)))
+
+
+class CircuitBreaker:
+    """Disjuntor: fechado (normal), aberto (falha na hora) ou meio-aberto (uma requisição de teste)."""
+
+    CLOSED, OPEN, HALF_OPEN = "fechado", "aberto", "meio-aberto"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.times_opened = 0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                return True
+            return False # aberto, ou meio-aberto com o teste em andamento
+
+    def record_success(self):
+        with self._lock:
+            self.state, self.failures, self.opened_at = self.CLOSED, 0, None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or (self.state == self.CLOSED and self.failures >= self.failure_threshold):
+                if self.state == self.CLOSED:
+                    self.times_opened += 1
+                    logging.error(f"Disjuntor aberto após {self.failures} falha(s) seguida(s) do banco de dados.")
+                self.state, self.opened_at = self.OPEN, time.monotonic()
+
+    def retry_in(self) -> float:
+        with self._lock:
+            return max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at)) if self.opened_at else 0.0
+
+
+class ResilientTransport(httpx.BaseTransport):
+    """Transporte httpx com novas tentativas para leituras, disjuntor e contadores de uso do pool.
+
+    `open_error` é a exceção lançada quando o disjuntor está aberto.
+    """
+
+    def __init__(self, transport: httpx.HTTPTransport, breaker: CircuitBreaker, retries: int = 3,
+                 backoff: float = 0.25, backoff_max: float = 5.0, open_error=RuntimeError):
+        self.transport = transport
+        self.breaker = breaker
+        self.retries = retries
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        self.open_error = open_error
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.retried = 0
+        self.failures = 0
+        self.rejected = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+
+    def _count(self, **deltas):
+        with self._lock:
+            for name, delta in deltas.items():
+                setattr(self, name, getattr(self, name) + delta)
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        if not self.breaker.allow():
+            self._count(rejected=1)
+            raise self.open_error(f"Banco de dados indisponível (muitas falhas seguidas); "
+                                  f"nova tentativa em {self.breaker.retry_in():.0f} s.")
+        retries = self.retries if request.method in RETRY_METHODS else 0
+        self._count(requests=1, in_flight=1)
+        try:
+            for attempt in range(retries + 1):
+                if attempt:
+                    self._count(retried=1)
+                    time.sleep(retry_delay(attempt, self.backoff, self.backoff_max))
+                try:
+                    response = self.transport.handle_request(request)
+                except httpx.TransportError as e:
+                    if attempt < retries:
+                        logging.warning(f"{request.method} {request.url.path} falhou ({e!r}); nova tentativa.")
+                        continue
+                    self._count(failures=1)
+                    self.breaker.record_failure()
+                    raise
+                except Exception:
+                    self.breaker.record_failure()
+                    raise
+                if response.status_code in RETRY_STATUS:
+                    if attempt < retries:
+                        response.close()
+                        logging.warning(f"{request.method} {request.url.path} respondeu {response.status_code}; nova tentativa.")
+                        continue
+                    self._count(failures=1)
+                    self.breaker.record_failure()
+                else:
+                    # Qualquer outra resposta (inclusive 4xx) mostra que o servidor está de pé
+                    self.breaker.record_success()
+                return response
+        finally:
+            self._count(in_flight=-1)
+
+    def close(self):
+        self.transport.close()
+
+    def stats(self) -> dict:
+        """Uso do pool e contadores de requisições, novas tentativas e estado do disjuntor."""
+        pool = getattr(self.transport, '_pool', None) # httpcore.ConnectionPool do HTTPTransport
+        connections = pool.connections if pool is not None else []
+        idle = sum(1 for connection in connections if connection.is_idle())
+        with self._lock:
+            return {
+                "connections": len(connections),
+                "idle_connections": idle,
+                "active_connections": len(connections) - idle,
+                "in_flight": self.in_flight,
+                "peak_in_flight": self.peak_in_flight,
+                "requests": self.requests,
+                "retried": self.retried,
+                "failures": self.failures,
+                "rejected": self.rejected,
+                "circuit": self.breaker.state,
+                "circuit_opened": self.breaker.times_opened,
+            }
+
+
+def create_http_client(settings: dict, open_error=RuntimeError):
+    """Cria o httpx.Client a ser passado ao Supabase; `settings` sobrescreve DEFAULTS.
+
+    Retorna (cliente, transporte); o transporte fornece `stats()`.
+    """
+    settings = {**DEFAULTS, **{k: v for k, v in settings.items() if v is not None}}
+    transport = httpx.HTTPTransport(
+        limits=httpx.Limits(
+            max_connections=int(settings["HTTP_MAX_CONNECTIONS"]),
+            max_keepalive_connections=int(settings["HTTP_MAX_KEEPALIVE"]),
+            keepalive_expiry=float(settings["HTTP_KEEPALIVE_EXPIRY"]),
+        ),
+        http2=bool(settings["HTTP2"]),
+    )
+    breaker = CircuitBreaker(int(settings["CIRCUIT_FAILURE_THRESHOLD"]), float(settings["CIRCUIT_RESET_TIMEOUT"]))
+    resilient = ResilientTransport(
+        transport, breaker, int(settings["HTTP_RETRIES"]),
+        float(settings["HTTP_RETRY_BACKOFF"]), float(settings["HTTP_RETRY_BACKOFF_MAX"]), open_error,
+    )
+    client = httpx.Client(
+        transport=resilient,
+        timeout=httpx.Timeout(
+            connect=float(settings["HTTP_CONNECT_TIMEOUT"]),
+            read=float(settings["HTTP_READ_TIMEOUT"]),
+            write=float(settings["HTTP_WRITE_TIMEOUT"]),
+            pool=float(settings["HTTP_POOL_TIMEOUT"]),
+        ),
+        follow_redirects=True,
+    )
+    return client, resilient
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""Importação em lote de clientes a partir de planilhas CSV ou XLSX.
+
+A planilha inteira é validada de uma vez com operações vetorizadas do pandas, os CPFs/CNPJs
+são conferidos no banco em uma única consulta e as linhas válidas são gravadas em blocos.
+O resultado é um relatório por linha, em vez de parar no primeiro erro. Uso pela linha de comando:
+    python importer.py clientes.xlsx --chunk-size 500 --relatorio relatorio.csv
+"""
+import argparse
+import os
+import re
+import sys
+import numpy as np
+import pandas as pd
+from email_validator import validate_email, EmailNotValidError
+import database
+import formatters
+import validators
+
+IMPORT_EXTENSIONS = ('csv', 'xlsx')
+IMPORT_COLUMNS = [c for c in database.DB_COLUMNS if c != 'data_cadastro']
+
+# Cabeçalhos aceitos além dos nomes das colunas do banco (sem acentos, em minúsculas, com '_')
+COLUMN_ALIASES = {
+    'nome': 'nome_completo', 'razao_social': 'nome_completo', 'nome_completo_razao_social': 'nome_completo',
+    'tipo': 'tipo_documento', 'tipo_de_documento': 'tipo_documento',
+    'documento': 'documento', 'cpf_cnpj': 'documento',
+    'contato': 'contato1', 'contato_1': 'contato1', 'nome_do_contato_1': 'contato1',
+    'contato_2': 'contato2', 'nome_do_contato_2': 'contato2',
+    'telefone': 'telefone1', 'telefone_1': 'telefone1', 'whatsapp': 'telefone1', 'telefone_2': 'telefone2',
+    'cargo_do_contato_1': 'cargo', 'e_mail': 'email',
+    'data_de_nascimento': 'data_nascimento', 'data_de_nascimento_fundacao': 'data_nascimento', 'nascimento': 'data_nascimento',
+    'uf': 'estado', 'observacoes': 'observacao',
+}
+
+# Status do relatório
+INSERTED, DUPLICATE, INVALID, FAILED, VALID = "inserido", "duplicado", "inválido", "erro", "válido"
+
+
+def _column_key(header) -> str:
+    return re.sub(r'[^a-z0-9]+', '_', validators.fold_accents(str(header))).strip('_')
+
+def read_import_file(file, filename: str = None) -> pd.DataFrame:
+    """Lê a planilha (caminho ou arquivo enviado) como texto, sem converter valores."""
+    filename = filename or getattr(file, 'name', str(file))
+    extension = os.path.splitext(filename)[1].lower().lstrip('.')
+    if extension not in IMPORT_EXTENSIONS:
+        raise ValueError(f"Formato de arquivo não suportado: '{extension}'. Use CSV ou XLSX.")
+    if extension == 'xlsx':
+        return pd.read_excel(file, dtype=str, keep_default_na=False)
+    # Separador detectado automaticamente (',' ou ';', comum em planilhas exportadas no Brasil)
+    return pd.read_csv(file, dtype=str, keep_default_na=False, sep=None, engine='python', encoding='utf-8-sig')
+
+
+def prepare_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Renomeia os cabeçalhos para as colunas do banco e normaliza os valores (texto, sem espaços)."""
+    renamed = {}
+    for header in df.columns:
+        key = _column_key(header)
+        column = key if key in IMPORT_COLUMNS else COLUMN_ALIASES.get(key)
+        if column and column not in renamed.values():
+            renamed[header] = column
+    df = df[list(renamed)].rename(columns=renamed)
+    df = df.fillna('').astype(str).apply(lambda col: col.str.strip())
+    df = df.reindex(columns=IMPORT_COLUMNS + ['documento'], fill_value='')
+
+    # Coluna única 'documento': CPF ou CNPJ conforme o tipo (ou a quantidade de dígitos)
+    doc_digits = df['documento'].str.replace(r'[^0-9]', '', regex=True)
+    tipo = df['tipo_documento'].str.upper()
+    cpf_digits = df['cpf'].str.replace(r'[^0-9]', '', regex=True)
+    cnpj_digits = df['cnpj'].str.replace(r'[^0-9]', '', regex=True)
+    inferred = np.select(
+        [cpf_digits != '', cnpj_digits != '', doc_digits.str.len() == 11, doc_digits.str.len() == 14],
+        ['CPF', 'CNPJ', 'CPF', 'CNPJ'], default='')
+    df['tipo_documento'] = tipo.where(tipo != '', inferred)
+    df['cpf'] = cpf_digits.where(cpf_digits != '', doc_digits.where(df['tipo_documento'] == 'CPF', ''))
+    df['cnpj'] = cnpj_digits.where(cnpj_digits != '', doc_digits.where(df['tipo_documento'] == 'CNPJ', ''))
+    df = df.drop(columns='documento')
+
+    df['estado'] = df['estado'].str.upper()
+    return df
+
+
+def _unique_check(series: pd.Series, check) -> pd.Series:
+    """Aplica `check` uma vez por valor distinto e preenchido; retorna a máscara de inválidos."""
+    filled = series[series != '']
+    invalid = {value for value in filled.unique() if not check(value)}
+    return series.isin(invalid)
+
+def _is_valid_email(email: str) -> bool:
+    try:
+        validate_email(email, check_deliverability=False)
+        return True
+    except EmailNotValidError:
+        return False
+
+def check_import_frame(df: pd.DataFrame) -> pd.Series:
+    """Valida todas as linhas de uma vez; retorna as mensagens de erro por linha ("" se válida).
+
+    Recebe o resultado de prepare_frame. Documentos e telefones são verificados por
+    validators.validate_frame; aqui ficam o e-mail, a data e as repetições na planilha.
+    """
+    tipo = df['tipo_documento']
+    is_cpf, is_cnpj = tipo == 'CPF', tipo == 'CNPJ'
+    checks = [(_unique_check(df['email'], _is_valid_email), "O formato do e-mail é inválido.")]
+
+    birth = pd.to_datetime(df['data_nascimento'], dayfirst=True, format='mixed', errors='coerce')
+    checks.append(((df['data_nascimento'] != '') & birth.isna(), "A data de nascimento é inválida."))
+
+    # Documentos repetidos dentro da própria planilha: apenas a primeira ocorrência é importada
+    document = df['cpf'].where(is_cpf, df['cnpj'].where(is_cnpj, ''))
+    checks.append(((document != '') & document.duplicated(keep='first'), "CPF/CNPJ repetido na planilha."))
+
+    errors = pd.Series(validators.error_messages(validators.validate_frame(df)), index=df.index, dtype=object) + ' '
+    for mask, message in checks:
+        errors = errors + np.where(mask, message + ' ', '')
+    return errors.str.strip()
+
+
+def _to_rows(df: pd.DataFrame) -> list:
+    """Formata os documentos, telefones e datas como no formulário e remove os campos vazios."""
+    df = df.copy()
+    df['cpf'] = formatters.format_filled(df['cpf'].where(df['tipo_documento'] == 'CPF', ''), formatters.format_cpf)
+    df['cnpj'] = formatters.format_filled(df['cnpj'].where(df['tipo_documento'] == 'CNPJ', ''), formatters.format_cnpj)
+    for column in ('telefone1', 'telefone2'):
+        df[column] = formatters.format_filled(df[column], formatters.format_whatsapp)
+    birth = pd.to_datetime(df['data_nascimento'], dayfirst=True, format='mixed', errors='coerce')
+    df['data_nascimento'] = birth.dt.strftime('%Y-%m-%d').fillna('')
+    return [{k: v for k, v in row.items() if v != ''} for row in df.to_dict('records')]
+
+def import_customers(df: pd.DataFrame, chunk_size: int = 500, dry_run: bool = False, progress=None) -> pd.DataFrame:
+    """Valida e insere os clientes da planilha; retorna o relatório com o status de cada linha.
+
+    As linhas válidas são gravadas em blocos de `chunk_size`. Se um bloco falhar (ex.: CPF
+    cadastrado por outra pessoa durante a importação), as linhas dele são gravadas uma a uma
+    para identificar a que falhou. `dry_run` apenas valida. `progress(feitas, total)` é
+    chamado após cada bloco.
+    """
+    prepared = prepare_frame(df)
+    rows = _to_rows(prepared)
+    report = pd.DataFrame({
+        'linha': prepared.index + 2, # +1 do cabeçalho, +1 porque planilhas começam na linha 1
+        'nome_completo': prepared['nome_completo'],
+        'documento': [row.get('cpf') or row.get('cnpj') or '' for row in rows],
+        'status': INVALID,
+        'mensagem': check_import_frame(prepared),
+        'id': None,
+    })
+    valid = report['mensagem'] == ''
+
+    existing = database.find_existing_documents(
+        [row['cpf'] for row, ok in zip(rows, valid) if ok and 'cpf' in row],
+        [row['cnpj'] for row, ok in zip(rows, valid) if ok and 'cnpj' in row])
+    duplicate = valid & report['documento'].isin(existing)
+    report.loc[duplicate, ['status', 'mensagem']] = [DUPLICATE, "O CPF ou CNPJ informado já existe no banco de dados."]
+
+    pending = list(np.flatnonzero(valid & ~duplicate))
+    if dry_run:
+        report.loc[report.index[pending], 'status'] = VALID
+        return report
+
+    for start in range(0, len(pending), chunk_size):
+        positions = pending[start:start + chunk_size]
+        try:
+            inserted = database.insert_customers([rows[i] for i in positions])
+            _record_inserted(report, positions, inserted)
+        except database.DatabaseError:
+            for i in positions:
+                try:
+                    _record_inserted(report, [i], database.insert_customers([rows[i]]))
+                except database.DuplicateEntryError as e:
+                    report.loc[report.index[i], ['status', 'mensagem']] = [DUPLICATE, str(e)]
+                except database.DatabaseError as e:
+                    report.loc[report.index[i], ['status', 'mensagem']] = [FAILED, str(e)]
+        if progress:
+            progress(min(start + chunk_size, len(pending)), len(pending))
+    return report
+
+def _record_inserted(report: pd.DataFrame, positions: list, inserted: list):
+    labels = report.index[positions]
+    report.loc[labels, 'status'] = INSERTED
+    if len(inserted) == len(positions):
+        report.loc[labels, 'id'] = [row.get('id') for row in inserted]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Importa clientes de uma planilha CSV ou XLSX.")
+    parser.add_argument("arquivo", help="Planilha de entrada (.csv ou .xlsx)")
+    parser.add_argument("--chunk-size", type=int, default=500, help="Linhas por bloco de inserção")
+    parser.add_argument("--relatorio", default=None, help="Grava o relatório por linha neste CSV")
+    parser.add_argument("--validar", action="store_true", help="Apenas valida, sem inserir")
+    args = parser.parse_args()
+
+    report = import_customers(read_import_file(args.arquivo), args.chunk_size, dry_run=args.validar)
+    for status, total in report['status'].value_counts().items():
+        print(f"{status}: {total}")
+    if args.relatorio:
+        report.to_csv(args.relatorio, index=False)
+    else:
+        problems = report[report['mensagem'] != '']
+        if not problems.empty:
+            problems[['linha', 'documento', 'mensagem']].to_csv(sys.stdout, index=False)
+    sys.exit(1 if (report['status'].isin([INVALID, FAILED])).any() else 0)
+
+
+if __name__ == "__main__":
+    main()
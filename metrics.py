@@ -0,0 +1,169 @@
+"""Métricas de latência das consultas ao banco (tempo, linhas e bytes por chamada).
+
+Cada chamada instrumentada em database.py é registrada com o nome da função e a assinatura
+dos filtros usados (quais filtros, não seus valores). As métricas ficam em memória e são
+expostas no formato texto do Prometheus (`prometheus_text`, ou `start_server` para um
+endpoint /metrics) e na página de diagnóstico. Chamadas lentas ou com erro geram uma linha
+de log em JSON (WARNING) no logger "database.metrics"; as demais, inclusive os acertos do
+cache, só em DEBUG, para não inundar o log a cada execução das páginas.
+"""
+import collections
+import json
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+import pandas as pd
+
+WINDOW = 1000 # latências recentes guardadas por consulta, para os percentis
+SLOW_QUERY_SECONDS = 1.0 # chamadas mais lentas que isso (ou com erro) são registradas como WARNING
+QUANTILES = (0.5, 0.95, 0.99)
+
+logger = logging.getLogger("database.metrics")
+
+
+def filter_signature(filters: dict) -> str:
+    """Assinatura dos filtros ativos, ex.: 'search_query:nome+state_filter'; '-' sem filtros.
+
+    A busca indica apenas o tipo (nome ou documento), que muda o plano da consulta.
+    """
+    parts = []
+    for name, value in sorted(filters.items()):
+        if value is None or value == '':
+            continue
+        if name == 'search_query':
+            kind = 'nome' if any(c.isalpha() for c in str(value)) else 'documento'
+            parts.append(f"{name}:{kind}")
+        else:
+            parts.append(name)
+    return '+'.join(parts) or '-'
+
+def measure(result):
+    """(linhas, bytes) aproximados do resultado de uma consulta."""
+    if result is None:
+        return 0, 0
+    if isinstance(result, pd.DataFrame):
+        return len(result), int(result.memory_usage(index=False, deep=True).sum())
+    if isinstance(result, pd.Series):
+        return len(result), int(result.memory_usage(index=False, deep=True))
+    if isinstance(result, tuple) and result and isinstance(result[0], pd.DataFrame):
+        return measure(result[0]) # (DataFrame, total) de fetch_page
+    if isinstance(result, list):
+        return len(result), len(json.dumps(result, default=str))
+    if isinstance(result, dict):
+        tables = [v for v in result.values() if isinstance(v, (pd.DataFrame, pd.Series, list))]
+        if tables:
+            sizes = [measure(v) for v in tables]
+            return sum(r for r, _ in sizes), sum(b for _, b in sizes)
+        return 1, len(json.dumps(result, default=str))
+    return 1, 0
+
+
+class _Series:
+    __slots__ = ("calls", "errors", "seconds", "rows", "bytes", "cache_hits", "latencies")
+
+    def __init__(self):
+        self.calls = self.errors = self.rows = self.bytes = self.cache_hits = 0
+        self.seconds = 0.0
+        self.latencies = collections.deque(maxlen=WINDOW)
+
+
+class QueryMetrics:
+    """Acumula as métricas por (função, assinatura dos filtros); seguro entre threads."""
+
+    def __init__(self):
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def record(self, function: str, filters: str, seconds: float, result=None, error: Exception = None, cache: str = None):
+        rows, size = measure(result) if error is None else (0, 0)
+        with self._lock:
+            series = self._series.setdefault((function, filters), _Series())
+            series.calls += 1
+            series.errors += error is not None
+            series.seconds += seconds
+            series.rows += rows
+            series.bytes += size
+            series.cache_hits += cache == "hit"
+            series.latencies.append(seconds)
+        level = logging.WARNING if error is not None or seconds >= SLOW_QUERY_SECONDS else logging.DEBUG
+        if logger.isEnabledFor(level):
+            event = {"event": "query", "function": function, "filters": filters, "ms": round(seconds * 1000, 2),
+                     "rows": rows, "bytes": size, "cache": cache, "error": str(error) if error is not None else None}
+            logger.log(level, json.dumps(event, ensure_ascii=False))
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+    def summary(self) -> pd.DataFrame:
+        """Uma linha por consulta: chamadas, erros, acertos de cache, p50/p95/p99 (ms), linhas e bytes médios."""
+        with self._lock:
+            items = [(key, s.calls, s.errors, s.cache_hits, s.seconds, s.rows, s.bytes, np.array(s.latencies))
+                     for key, s in self._series.items()]
+        records = []
+        for (function, filters), calls, errors, hits, seconds, rows, size, latencies in items:
+            p50, p95, p99 = np.quantile(latencies, QUANTILES) * 1000 if len(latencies) else (0.0, 0.0, 0.0)
+            records.append({
+                "funcao": function, "filtros": filters, "chamadas": calls, "erros": errors, "acertos_cache": hits,
+                "p50_ms": p50, "p95_ms": p95, "p99_ms": p99, "total_s": seconds,
+                "linhas_media": rows / calls, "bytes_media": size / calls,
+            })
+        columns = ["funcao", "filtros", "chamadas", "erros", "acertos_cache", "p50_ms", "p95_ms", "p99_ms",
+                   "total_s", "linhas_media", "bytes_media"]
+        return pd.DataFrame(records, columns=columns).sort_values("total_s", ascending=False, ignore_index=True)
+
+    def prometheus_text(self) -> str:
+        """Métricas no formato de exposição em texto do Prometheus."""
+        with self._lock:
+            items = [(key, s.calls, s.errors, s.cache_hits, s.seconds, s.rows, s.bytes, np.array(s.latencies))
+                     for key, s in sorted(self._series.items())]
+        lines = [
+            "# HELP database_query_duration_seconds Duração das chamadas ao banco (percentis das últimas chamadas).",
+            "# TYPE database_query_duration_seconds summary",
+        ]
+        for (function, filters), calls, _, _, seconds, _, _, latencies in items:
+            labels = f'function="{function}",filters="{filters}"'
+            for quantile, value in zip(QUANTILES, np.quantile(latencies, QUANTILES) if len(latencies) else (0.0,) * 3):
+                lines.append(f'database_query_duration_seconds{{{labels},quantile="{quantile}"}} {value:.6f}')
+            lines.append(f"database_query_duration_seconds_sum{{{labels}}} {seconds:.6f}")
+            lines.append(f"database_query_duration_seconds_count{{{labels}}} {calls}")
+        counters = (
+            ("database_query_errors_total", "Chamadas ao banco que terminaram em erro.", 2),
+            ("database_query_cache_hits_total", "Chamadas atendidas pelo cache de consultas.", 3),
+            ("database_query_rows_total", "Linhas retornadas pelas chamadas ao banco.", 5),
+            ("database_query_bytes_total", "Bytes (aproximados) retornados pelas chamadas ao banco.", 6),
+        )
+        for name, help_text, position in counters:
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+            for item in items:
+                function, filters = item[0]
+                lines.append(f'{name}{{function="{function}",filters="{filters}"}} {item[position]}')
+        return "\n".join(lines) + "\n"
+
+
+query_metrics = QueryMetrics()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = query_metrics.prometheus_text().encode('utf-8')
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass # sem uma linha de log por coleta do Prometheus
+
+
+def start_server(port: int, host: str = "0.0.0.0") -> ThreadingHTTPServer:
+    """Serve /metrics em uma thread em segundo plano, para coleta pelo Prometheus."""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    logging.info(f"Métricas do Prometheus em http://{host}:{port}/metrics")
+    return server
@@ -0,0 +1,226 @@
+"""Fila local durável (outbox) para gravar cadastros em segundo plano.
+
+Com a fila ativa, database.insert_customer valida o cliente, grava-o em um arquivo SQLite
+local e retorna na hora; um `Flusher` (thread) envia os cadastros pendentes ao banco em
+lotes, com novas tentativas espaçadas exponencialmente quando o banco está lento ou fora
+do ar. CPF/CNPJ já existentes, descobertos só no envio, ficam registrados como conflitos
+até alguém tomar ciência deles na página de Cadastro; um cadastro recusado por outro motivo
+é isolado do lote e fica como falha, também exibida na página, sem novas tentativas.
+"""
+import json
+import logging
+import random
+import sqlite3
+import threading
+import time
+import httpx
+from sqlite_backend import ConnectionPool, _fetch_dicts
+
+OUTBOX_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS outbox (
+        id INTEGER PRIMARY KEY,
+        payload TEXT NOT NULL,                   -- cliente validado, em JSON
+        document TEXT,                           -- CPF ou CNPJ, para detectar repetição na fila
+        status TEXT NOT NULL DEFAULT 'pending',  -- pending, sent, conflict ou failed
+        attempts INTEGER NOT NULL DEFAULT 0,
+        created_at REAL NOT NULL,
+        next_attempt_at REAL NOT NULL,
+        sent_at REAL,
+        customer_id INTEGER,
+        error TEXT,
+        acknowledged INTEGER NOT NULL DEFAULT 0
+    );
+    CREATE INDEX IF NOT EXISTS outbox_due_idx ON outbox (status, next_attempt_at);
+    CREATE INDEX IF NOT EXISTS outbox_document_idx ON outbox (document) WHERE status = 'pending';
+'''
+
+PENDING, SENT, CONFLICT, FAILED = "pending", "sent", "conflict", "failed"
+
+BACKOFF_BASE = 2 # segundos antes da 2ª tentativa; dobra a cada falha
+BACKOFF_MAX = 300
+MAX_ATTEMPTS = 50 # falhas transitórias seguidas; depois disso o cadastro fica como 'failed' e é exibido na página
+SENT_RETENTION = 24 * 3600 # cadastros enviados ficam no arquivo por um dia (métricas de latência)
+# Erros em que o lote inteiro é repetido: o banco pode estar apenas fora do ar
+TRANSIENT_ERRORS = (ConnectionError, TimeoutError, httpx.TransportError)
+
+
+def create_outbox_schema(conn: sqlite3.Connection):
+    conn.executescript(OUTBOX_SCHEMA)
+
+def backoff(attempts: int) -> float:
+    """Espera antes da próxima tentativa: exponencial, com limite e variação aleatória (jitter)."""
+    return min(BACKOFF_MAX, BACKOFF_BASE * 2 ** max(attempts - 1, 0)) * random.uniform(0.5, 1.0)
+
+
+class Outbox:
+    """Fila de cadastros em um arquivo SQLite (synchronous=FULL: sobrevive a quedas de energia)."""
+
+    def __init__(self, path: str = "outbox.db", max_attempts: int = MAX_ATTEMPTS):
+        self.pool = ConnectionPool(path, size=2, schema=create_outbox_schema, synchronous="FULL")
+        self.max_attempts = max_attempts
+
+    def enqueue(self, row: dict) -> int:
+        document = row.get('cpf') or row.get('cnpj')
+        now = time.time()
+        with self.pool.connection() as conn:
+            cursor = conn.execute(
+                "INSERT INTO outbox (payload, document, created_at, next_attempt_at) VALUES (?, ?, ?, ?)",
+                (json.dumps(row, ensure_ascii=False), document, now, now))
+            return cursor.lastrowid
+
+    def has_pending(self, document: str) -> bool:
+        if not document:
+            return False
+        with self.pool.connection() as conn:
+            return conn.execute("SELECT 1 FROM outbox WHERE status = 'pending' AND document = ?", (document,)).fetchone() is not None
+
+    def due(self, limit: int = 100) -> list:
+        """Cadastros pendentes cuja próxima tentativa já venceu, na ordem de chegada: [(id, linha)]."""
+        with self.pool.connection() as conn:
+            rows = conn.execute(
+                "SELECT id, payload FROM outbox WHERE status = 'pending' AND next_attempt_at <= ? ORDER BY id LIMIT ?",
+                (time.time(), limit)).fetchall()
+        return [(entry_id, json.loads(payload)) for entry_id, payload in rows]
+
+    def mark_sent(self, ids: list, written: list = None):
+        now = time.time()
+        customer_ids = [row.get('id') for row in written] if written and len(written) == len(ids) else [None] * len(ids)
+        with self.pool.connection() as conn:
+            conn.executemany("UPDATE outbox SET status = 'sent', sent_at = ?, customer_id = ?, error = NULL WHERE id = ?",
+                             [(now, customer_id, entry_id) for entry_id, customer_id in zip(ids, customer_ids)])
+            conn.execute("DELETE FROM outbox WHERE status = 'sent' AND sent_at < ?", (now - SENT_RETENTION,))
+
+    def mark_retry(self, ids: list, error: str):
+        now = time.time()
+        with self.pool.connection() as conn:
+            for entry_id in ids:
+                attempts = conn.execute("SELECT attempts FROM outbox WHERE id = ?", (entry_id,)).fetchone()[0] + 1
+                status = FAILED if attempts >= self.max_attempts else PENDING
+                conn.execute("UPDATE outbox SET attempts = ?, status = ?, error = ?, next_attempt_at = ? WHERE id = ?",
+                             (attempts, status, error, now + backoff(attempts), entry_id))
+
+    def mark_conflict(self, entry_id: int, error: str):
+        with self.pool.connection() as conn:
+            conn.execute("UPDATE outbox SET status = 'conflict', attempts = attempts + 1, error = ? WHERE id = ?", (error, entry_id))
+
+    def mark_failed(self, entry_id: int, error: str):
+        """Falha definitiva: o banco recusou o próprio cadastro, e repeti-lo daria o mesmo erro."""
+        with self.pool.connection() as conn:
+            conn.execute("UPDATE outbox SET status = 'failed', attempts = attempts + 1, error = ? WHERE id = ?", (error, entry_id))
+
+    def problems(self) -> list:
+        """Conflitos e falhas definitivas ainda não vistos: dicts com id, status, error e o cadastro."""
+        with self.pool.connection() as conn:
+            rows = _fetch_dicts(conn.execute(
+                "SELECT id, status, error, payload, created_at FROM outbox "
+                "WHERE status IN ('conflict', 'failed') AND acknowledged = 0 ORDER BY id"))
+        for row in rows:
+            row['customer'] = json.loads(row.pop('payload'))
+        return rows
+
+    def acknowledge(self, ids: list):
+        with self.pool.connection() as conn:
+            conn.executemany("UPDATE outbox SET acknowledged = 1 WHERE id = ?", [(i,) for i in ids])
+
+    def stats(self) -> dict:
+        """Profundidade da fila e latência (da chegada à confirmação do banco) dos últimos 100 envios."""
+        now = time.time()
+        with self.pool.connection() as conn:
+            depth, oldest = conn.execute("SELECT COUNT(*), MIN(created_at) FROM outbox WHERE status = 'pending'").fetchone()
+            conflicts, failed = conn.execute(
+                "SELECT COUNT(*) FILTER (WHERE status = 'conflict'), COUNT(*) FILTER (WHERE status = 'failed') "
+                "FROM outbox WHERE acknowledged = 0").fetchone()
+            latencies = [r[0] for r in conn.execute(
+                "SELECT sent_at - created_at FROM outbox WHERE status = 'sent' ORDER BY sent_at DESC LIMIT 100")]
+        return {
+            "depth": depth,
+            "oldest_pending_age": now - oldest if oldest else 0.0,
+            "conflicts": conflicts,
+            "failed": failed,
+            "last_latency": latencies[0] if latencies else None,
+            "avg_latency": sum(latencies) / len(latencies) if latencies else None,
+            "max_latency": max(latencies) if latencies else None,
+        }
+
+
+def is_transient(error: BaseException, transient_errors=TRANSIENT_ERRORS) -> bool:
+    """Indica se o erro (ou algum na cadeia de causas) é de conexão ou timeout: o lote pode ser repetido."""
+    while error is not None:
+        if isinstance(error, transient_errors):
+            return True
+        error = error.__cause__ or error.__context__
+    return False
+
+def flush_once(outbox: Outbox, send, duplicate_error=Exception, batch_size: int = 100,
+               transient_errors=TRANSIENT_ERRORS) -> int:
+    """Envia um lote de cadastros vencidos com `send(linhas)`; retorna quantos foram gravados.
+
+    Erros de conexão ou timeout (`transient_errors`) reagendam o lote inteiro com backoff.
+    Qualquer outro erro, inclusive `duplicate_error`, vem de algum cadastro do lote: o lote é
+    dividido ao meio e reenviado, até isolar o cadastro recusado, que fica como conflito
+    (duplicata) ou falha, sem novas tentativas e sem prender os demais.
+    """
+    entries = outbox.due(batch_size)
+    if not entries:
+        return 0
+    return _send_entries(outbox, send, entries, duplicate_error, transient_errors)
+
+def _send_entries(outbox: Outbox, send, entries: list, duplicate_error, transient_errors) -> int:
+    ids = [entry_id for entry_id, _ in entries]
+    try:
+        written = send([row for _, row in entries])
+        outbox.mark_sent(ids, written)
+        return len(ids)
+    except Exception as e:
+        if is_transient(e, transient_errors):
+            logging.warning(f"Falha ao enviar {len(ids)} cadastro(s) da fila; nova tentativa com backoff: {e}")
+            outbox.mark_retry(ids, str(e))
+            return 0
+        if len(entries) == 1:
+            if isinstance(e, duplicate_error):
+                logging.warning(f"Cadastro {ids[0]} da fila em conflito: {e}")
+                outbox.mark_conflict(ids[0], str(e))
+            else:
+                logging.error(f"Cadastro {ids[0]} da fila recusado pelo banco: {e}")
+                outbox.mark_failed(ids[0], str(e))
+            return 0
+    middle = len(entries) // 2
+    return (_send_entries(outbox, send, entries[:middle], duplicate_error, transient_errors)
+            + _send_entries(outbox, send, entries[middle:], duplicate_error, transient_errors))
+
+
+class Flusher(threading.Thread):
+    """Thread que esvazia a fila continuamente; `wake()` antecipa o próximo envio."""
+
+    def __init__(self, outbox: Outbox, send, duplicate_error=Exception, batch_size: int = 100, poll_interval: float = 1.0,
+                 transient_errors=TRANSIENT_ERRORS):
+        super().__init__(name="outbox-flusher", daemon=True)
+        self.outbox = outbox
+        self.send = send
+        self.duplicate_error = duplicate_error
+        self.transient_errors = transient_errors
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.last_flush_seconds = None
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+
+    def wake(self):
+        self._wake.set()
+
+    def stop(self):
+        self._stopping.set()
+        self._wake.set()
+
+    def run(self):
+        while not self._stopping.is_set():
+            try:
+                started = time.perf_counter()
+                sent = flush_once(self.outbox, self.send, self.duplicate_error, self.batch_size, self.transient_errors)
+                if sent:
+                    self.last_flush_seconds = time.perf_counter() - started
+                    continue # pode haver mais lotes vencidos
+            except Exception as e:
+                logging.error(f"Erro no envio da fila de cadastros: {e}")
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
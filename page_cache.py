@@ -0,0 +1,75 @@
+"""Cache das páginas da grade do Banco de Dados, por sessão, com pré-carregamento.
+
+Depois de exibir a página N, a página dispara em segundo plano a busca das vizinhas
+(N+1 e N-1); ao navegar, o resultado já está pronto (ou a caminho). As entradas ficam em
+um LRU limitado e valem até a próxima gravação deste processo (database.get_write_generation)
+ou, para enxergar gravações de outros processos e da sincronização da réplica, até expirarem
+(mesmo TTL do cache de consultas).
+"""
+import threading
+import time
+from collections import OrderedDict
+import database
+
+PAGE_CACHE_SIZE = 8 # páginas guardadas por sessão
+
+
+class PageCache:
+    """LRU de páginas buscadas ou em busca, de chave (busca, estado, itens por página, página)."""
+
+    def __init__(self, maxsize: int = PAGE_CACHE_SIZE, ttl: float = database.QUERY_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict() # chave -> (geração, Future com (DataFrame, total), expira em)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.prefetches = 0
+
+    def _lookup(self, key):
+        entry = self._entries.get(key)
+        if entry is not None and (entry[0] != database.get_write_generation() or entry[2] < time.monotonic()):
+            del self._entries[key]
+            return None
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def _start(self, key, func):
+        # A geração é lida antes da busca: uma gravação durante ela invalida o resultado
+        entry = (database.get_write_generation(), database.submit_query(func), time.monotonic() + self.ttl)
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+        return entry
+
+    def fetch(self, key, func):
+        """(DataFrame, total) da página `key`: do cache, esperando um pré-carregamento em andamento, ou de `func()`."""
+        with self._lock:
+            entry = self._lookup(key)
+            # Um pré-carregamento que ainda nem começou (pool ocupado) é cancelado e feito aqui
+            if entry is None or entry[1].cancel():
+                self.misses += 1
+                entry = self._start(key, func)
+            else:
+                self.hits += 1
+        try:
+            df, total = entry[1].result()
+        except Exception:
+            with self._lock:
+                if self._entries.get(key) is entry:
+                    del self._entries[key] # a próxima execução tenta de novo
+            raise
+        return df.copy(), total
+
+    def prefetch(self, key, func):
+        """Agenda `func()` em segundo plano, se a página ainda não estiver no cache."""
+        with self._lock:
+            if self._lookup(key) is None:
+                self.prefetches += 1
+                self._start(key, func)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "prefetches": self.prefetches, "size": len(self._entries)}
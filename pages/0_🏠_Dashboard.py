@@ -66,22 +66,21 @@ else:
 st.markdown("---")
 
 # --- Função de Carregamento de Dados ---
-@st.cache_data(ttl=600)
+# O cache fica no módulo database, que o invalida a cada cadastro, edição ou exclusão
 def load_data(start, end):
     """Busca todos os dados necessários para o dashboard dentro de um período."""
     try:
-        df = db.fetch_dashboard_data(start, end)
-        total_count = db.get_total_customers_count() # Sempre o total geral
-        # novos_no_periodo será o total de clientes no período *apenas se o filtro de data estiver ativo*
-        novos_no_periodo = db.get_new_customers_in_period_count(start, end)
-        by_state = db.get_customer_counts_by_state(start, end)
-        return df, total_count, novos_no_periodo, by_state
+        # Uma única requisição: 5 clientes mais recentes, total geral (sempre sem filtro),
+        # novos no período e contagens agrupadas para os gráficos
+        bundle = db.fetch_dashboard_bundle(start, end)
+        return bundle["recentes"], bundle["total"], bundle["novos_no_periodo"], bundle["stats"]
     except db.DatabaseError as e:
         st.error(f"Não foi possível carregar os dados: {e}")
-        return pd.DataFrame(), 0, 0, pd.Series()
+        return pd.DataFrame(), 0, 0, {}
 
 # --- Carregar Dados ---
-df_charts, total_clientes, novos_no_periodo, clientes_por_estado_series = load_data(current_start_date, current_end_date)
+df_charts, total_clientes, novos_no_periodo, stats = load_data(current_start_date, current_end_date)
+clientes_por_estado_series = stats.get('estado', pd.Series(dtype=int))
 
 if df_charts.empty:
     if st.session_state.use_date_filter:
@@ -95,7 +94,7 @@ if df_charts.empty:
             "Vá para a página de '📝 Cadastro' na barra lateral para começar."
         )
     if st.button("Limpar Cache e Recarregar"):
-        st.cache_data.clear()
+        db.clear_cache()
         st.rerun()
 else:
     # Garante que 'data_cadastro' é datetime para operações locais do dataframe
@@ -124,10 +123,8 @@ else:
 
     with col1:
         st.subheader("Novos Clientes por Mês")
-        df_chart = df_charts.copy()
-        df_chart['mes_cadastro'] = df_chart['data_cadastro'].dt.to_period('M').astype(str)
-        clientes_por_mes = df_chart.groupby('mes_cadastro').size().reset_index(name='contagem')
-        clientes_por_mes = clientes_por_mes.set_index('mes_cadastro')
+        clientes_por_mes = stats['mes'].sort_index().rename('contagem').to_frame()
+        clientes_por_mes.index.name = 'mes_cadastro'
         st.bar_chart(clientes_por_mes)
 
     with col2:
@@ -153,12 +150,12 @@ else:
     col3, col4, col5 = st.columns(3)
     with col3:
         st.subheader("Top 5 Cidades (no período)")
-        top_5_cidades = df_charts['cidade'].value_counts().nlargest(5)
+        top_5_cidades = stats['cidade'].nlargest(5)
         st.bar_chart(top_5_cidades)
 
     with col4:
         st.subheader("Tipo de Cliente (no período)")
-        tipo_cliente = df_charts['tipo_documento'].value_counts().reset_index()
+        tipo_cliente = stats['tipo_documento'].reset_index()
         tipo_cliente.columns = ['tipo', 'contagem']
         
         donut_chart = alt.Chart(tipo_cliente).mark_arc(innerRadius=80).encode(
@@ -188,5 +185,5 @@ else:
         )
     
     if st.button("Limpar Cache e Atualizar Dados"):
-        st.cache_data.clear()
+        db.clear_cache()
         st.rerun()
\ No newline at end of file
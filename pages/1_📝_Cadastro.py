@@ -2,6 +2,7 @@ import streamlit as st
 import datetime
 import database
 import validators
+import importer
 import requests
 import re
 
@@ -45,11 +46,33 @@ if st.session_state.get("form_submitted_successfully", False):
     st.session_state.form_submitted_successfully = False
     clear_form_inputs()
     st.balloons()
-    st.success("Cliente salvo com sucesso!")
+    if database.get_outbox() is not None:
+        st.success("Cliente recebido! Ele será enviado ao banco de dados em instantes.")
+    else:
+        st.success("Cliente salvo com sucesso!")
+
+# Cadastros da fila de envio recusados pelo banco (ex.: CPF/CNPJ cadastrado por outra pessoa)
+outbox_problems = database.get_outbox_problems()
+if outbox_problems:
+    for problem in outbox_problems:
+        customer = problem['customer']
+        documento = customer.get('cpf') or customer.get('cnpj')
+        st.warning(f"O cliente '{customer.get('nome_completo')}' ({documento}) não foi salvo: {problem['error']}")
+    if st.button("Ciente", key="ack_outbox_problems"):
+        database.acknowledge_outbox_problems([p['id'] for p in outbox_problems])
+        st.rerun()
 
 # --- Interface ---
 st.title('📝 Cadastro de Clientes')
 
+outbox_stats = database.get_outbox_stats()
+if outbox_stats is not None and outbox_stats['depth']:
+    st.caption(f"Fila de envio: {outbox_stats['depth']} cadastro(s) aguardando o banco de dados "
+               f"(o mais antigo há {outbox_stats['oldest_pending_age']:.0f} s).")
+
+# Dispara (em segundo plano) a carga do índice de CPFs/CNPJs usado na verificação de duplicatas
+database.get_document_index()
+
 with st.container(border=True):
     st.subheader("Busca de Endereço por CEP")
     col1, col2 = st.columns([1, 2])
@@ -143,6 +166,41 @@ with st.container(border=True):
         st.markdown("---")
         submit_button = st.form_submit_button('Salvar Cliente', type="primary", use_container_width=True)
 
+st.markdown("---")
+
+with st.expander("📥 Importar Planilha (CSV/XLSX)"):
+    st.caption("Uma linha por cliente. Cabeçalhos aceitos: os nomes dos campos do formulário "
+               "(ex.: Nome Completo, CPF, CNPJ ou Documento, Telefone 1, E-mail, UF).")
+    import_file = st.file_uploader("Planilha", type=list(importer.IMPORT_EXTENSIONS), key="import_file")
+    col_validate, col_import = st.columns(2)
+    with col_validate:
+        validate_button = st.button("Validar", use_container_width=True, disabled=import_file is None)
+    with col_import:
+        import_button = st.button("Importar", type="primary", use_container_width=True, disabled=import_file is None)
+
+    if import_file is not None and (validate_button or import_button):
+        try:
+            progress_bar = st.progress(0.0, text="Importando...") if import_button else None
+            progress = (lambda done, total: progress_bar.progress(done / total, text=f"Importando... {done}/{total}")) if progress_bar else None
+            report = importer.import_customers(importer.read_import_file(import_file), dry_run=validate_button, progress=progress)
+            st.session_state.import_report = report
+        except (ValueError, database.DatabaseError) as e:
+            st.error(f"Erro na importação: {e}")
+
+    if "import_report" in st.session_state:
+        report = st.session_state.import_report
+        counts = report['status'].value_counts()
+        cols = st.columns(4)
+        cols[0].metric("Inseridos", int(counts.get(importer.INSERTED, 0)))
+        cols[1].metric("Válidos (não importados)", int(counts.get(importer.VALID, 0)))
+        cols[2].metric("Duplicados", int(counts.get(importer.DUPLICATE, 0)))
+        cols[3].metric("Com erro", int(counts.get(importer.INVALID, 0) + counts.get(importer.FAILED, 0)))
+        problems = report[report['mensagem'] != '']
+        if not problems.empty:
+            st.dataframe(problems[['linha', 'nome_completo', 'documento', 'status', 'mensagem']], hide_index=True, use_container_width=True)
+        st.download_button("⬇️ Baixar relatório", data=report.to_csv(index=False).encode('utf-8'),
+                           file_name="relatorio_importacao.csv", mime="text/csv", use_container_width=True)
+
 if submit_button:
     cpf_valor, cnpj_valor = (validators.format_cpf(documento), None) if tipo_documento == "CPF" else (None, validators.format_cnpj(documento))
     
@@ -157,6 +215,9 @@ if submit_button:
     }
     
     try:
+        # Duplicata detectada pelo índice em memória, sem esperar a recusa do banco
+        if (cpf_valor or cnpj_valor) and database.document_exists(cpf_valor or cnpj_valor):
+            raise database.DuplicateEntryError(f"O {tipo_documento} informado já está cadastrado.")
         database.insert_customer(customer_data)
         st.session_state.form_submitted_successfully = True
         st.rerun()
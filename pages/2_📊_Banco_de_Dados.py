@@ -1,12 +1,28 @@
 import streamlit as st
 import pandas as pd
 import database
+import exporter
+import page_cache
 import datetime # Adicionado para formatação de data
+import functools
 from streamlit_modal import Modal
 import math
 
 # --- Constantes ---
-EXPORT_LIMIT = 20000 # Limite para exportação completa de dados
+# Define a ordem e quais colunas serão visíveis na grade principal
+GRID_COLUMNS = [
+    'id', 'nome_completo', 'tipo_documento', 'cpf', 'cnpj',
+    'telefone1', 'link_wpp_1', 'cidade', 'estado'
+]
+# Colunas exibidas nos detalhes do cliente. São baixadas junto com a página (no máximo 100
+# linhas), para que abrir um cliente da grade não faça nova requisição (database.get_customer_details)
+DETAIL_COLUMNS = [
+    'id', 'nome_completo', 'tipo_documento', 'cpf', 'cnpj', 'email', 'data_nascimento',
+    'contato1', 'telefone1', 'cargo', 'contato2', 'telefone2',
+    'cep', 'endereco', 'numero', 'bairro', 'complemento', 'cidade', 'estado',
+    'observacao', 'data_cadastro'
+]
+PAGE_COLUMNS = GRID_COLUMNS + [col for col in DETAIL_COLUMNS if col not in GRID_COLUMNS]
 
 st.set_page_config(
     page_title="Banco de Dados de Clientes",
@@ -42,40 +58,137 @@ def display_field_with_copy(label, value, is_date=False, is_text_area=False):
     
     # st.markdown("---") # Removido para reduzir espaçamento
 
-def clear_full_export_state():
-    """Limpa o estado da exportação completa quando os filtros mudam."""
-    if 'full_export_data' in st.session_state:
-        del st.session_state.full_full_export_data
+def get_page_cursor(page_number):
+    """Retorna (after_id, before_id) para a página a partir dos limites das páginas já visitadas.
+
+    Navegar para a página vizinha usa o cursor (keyset); saltos diretos usam offset.
+    """
+    bounds = st.session_state.page_bounds
+    if page_number > 1 and page_number - 1 in bounds:
+        return bounds[page_number - 1][1], None
+    if page_number + 1 in bounds:
+        return None, bounds[page_number + 1][0]
+    return None, None
+
+# Os valores dos filtros são lidos do estado da sessão antes de desenhar os widgets,
+# para que as consultas independentes possam ser disparadas juntas
+search_query = st.session_state.get('search_query', "")
+state_filter = st.session_state.get('state_filter', "Todos")
+page_size = st.session_state.get('page_size', 10)
+
+# Os limites (maior e menor 'id') de cada página e o total valem apenas para o mesmo conjunto de filtros
+pagination_key = (search_query, state_filter, page_size)
+if st.session_state.get('pagination_key') != pagination_key:
+    st.session_state.pagination_key = pagination_key
+    st.session_state.page_bounds = {}
+    st.session_state.total_records = None
+    st.session_state.page_number = 1
+
+# Buscas por texto usam contagem estimada para não pagar um COUNT(*) completo a cada tecla
+count_method = "estimated" if search_query else "exact"
+
+# Páginas já vistas ou pré-carregadas desta sessão
+if 'page_cache' not in st.session_state:
+    st.session_state.page_cache = page_cache.PageCache()
+pages = st.session_state.page_cache
+
+def page_loader(page, after_id=None, before_id=None, count=None):
+    return functools.partial(database.fetch_page, search_query=search_query, state_filter=state_filter, page=page,
+                             page_size=page_size, after_id=after_id, before_id=before_id, columns=PAGE_COLUMNS, count=count)
+
+# --- Lógica Principal e de Exportação ---
+# Estados do filtro, página + total e (se houver) o cliente selecionado, em paralelo
+page_number = st.session_state.get('page_number', 1)
+after_id, before_id = get_page_cursor(page_number)
+queries = {
+    "states": database.list_states,
+    "page": functools.partial(pages.fetch, pagination_key + (page_number,), page_loader(page_number, after_id, before_id, count_method)),
+}
+if st.session_state.get("selected_customer_id"):
+    queries["customer"] = functools.partial(database.get_customer_details, st.session_state.selected_customer_id, DETAIL_COLUMNS)
+results = database.run_queries(queries, return_exceptions=True)
 
 # --- Barra Lateral (Filtros, Paginação e Ações) ---
 st.sidebar.header("Filtros e Ações")
-search_query = st.sidebar.text_input("Buscar por Nome ou CPF", on_change=clear_full_export_state)
-try:
-    all_states_series = database.get_customer_counts_by_state()
-    state_options = ["Todos"] + sorted(all_states_series.index.tolist())
-    state_filter = st.sidebar.selectbox("Filtrar por Estado", options=state_options, on_change=clear_full_export_state)
-except Exception as e:
+st.sidebar.text_input("Buscar por Nome ou CPF", key="search_query")
+if isinstance(results["states"], database.DatabaseError):
     st.sidebar.error("Filtros indisponíveis.")
     st.stop()
+state_options = ["Todos"] + results["states"]
+if state_filter not in state_options:
+    st.session_state.state_filter = "Todos"
+st.sidebar.selectbox("Filtrar por Estado", options=state_options, key="state_filter")
 
 # Paginação
-page_size = st.sidebar.selectbox("Itens por página", options=[10, 25, 50, 100], index=0)
-total_records = database.count_total_records(search_query, state_filter)
+st.sidebar.selectbox("Itens por página", options=[10, 25, 50, 100], key="page_size")
+
+if isinstance(results["page"], database.DatabaseError):
+    st.error(f"Erro ao buscar dados: {results['page']}")
+    st.stop()
+df_page, total_records = results["page"]
+if total_records is None:
+    total_records = st.session_state.total_records or len(df_page)
+st.session_state.total_records = total_records
+if not df_page.empty:
+    st.session_state.page_bounds[page_number] = (int(df_page['id'].max()), int(df_page['id'].min()))
+
 total_pages = math.ceil(total_records / page_size) if total_records > 0 else 1
-page_number = st.sidebar.number_input('Página', min_value=1, max_value=total_pages, value=1, step=1)
+if page_number > total_pages:
+    # Registros removidos desde a última execução: volta para a última página existente
+    st.session_state.page_number = total_pages
+    st.rerun()
+st.sidebar.number_input('Página', min_value=1, max_value=total_pages, step=1, key='page_number')
+
+# Pré-carrega as páginas vizinhas (sem contagem) enquanto esta é exibida
+if not df_page.empty:
+    if page_number < total_pages:
+        pages.prefetch(pagination_key + (page_number + 1,), page_loader(page_number + 1, after_id=int(df_page['id'].min())))
+    if page_number > 1:
+        pages.prefetch(pagination_key + (page_number - 1,), page_loader(page_number - 1, before_id=int(df_page['id'].max())))
 
 st.sidebar.markdown("---")
+cache_stats = database.get_cache_stats()
+st.sidebar.caption(f"Cache de consultas: {cache_stats['hits']} acertos, {cache_stats['misses']} falhas, {cache_stats['size']} entradas.")
+page_stats = pages.stats()
+st.sidebar.caption(f"Páginas desta sessão: {page_stats['hits']} acertos, {page_stats['misses']} falhas, {page_stats['prefetches']} pré-carregadas.")
+row_stats = database.get_row_cache_stats()
+st.sidebar.caption(f"Detalhes de clientes: {row_stats['hits']} sem nova consulta, {row_stats['misses']} buscados no banco.")
+http_stats = database.get_http_stats()
+if http_stats is not None:
+    st.sidebar.caption(f"Conexões HTTP: {http_stats['active_connections']} em uso, {http_stats['idle_connections']} ociosas "
+                       f"(pico de {http_stats['peak_in_flight']} requisições simultâneas); "
+                       f"{http_stats['retried']} nova(s) tentativa(s); disjuntor {http_stats['circuit']}.")
 
-# --- Lógica Principal e de Exportação ---
-df_page = database.fetch_data(search_query=search_query, state_filter=state_filter, page=page_number, page_size=page_size)
+# --- Exportação completa (todos os registros dos filtros atuais, sem limite) ---
+st.sidebar.subheader("Exportar")
+export_labels = {"csv": "CSV", "csv.gz": "CSV compactado (.gz)", "parquet": "Parquet"}
+export_format = st.sidebar.selectbox("Formato", options=list(export_labels), format_func=export_labels.get)
+export_extension, export_mime = exporter.EXPORT_FORMATS[export_format]
+
+def build_export():
+    """Gera o arquivo apenas quando o usuário clica em baixar, lendo o banco em blocos.
+
+    Os blocos vão para um arquivo temporário (em disco acima de alguns MB), lido uma única vez
+    ao final: o Streamlit guarda em memória o arquivo que serve, então ele fica inteiro na
+    memória do servidor até o download. Para exportações muito grandes, use `python exporter.py`.
+    """
+    with exporter.spool(exporter.export_customers(search_query, state_filter, export_format)) as file:
+        return file.read()
+
+st.sidebar.download_button(
+    "⬇️ Baixar todos os registros",
+    data=build_export,
+    file_name=f"clientes.{export_extension}",
+    mime=export_mime,
+    use_container_width=True
+)
 
 # Verifica se um cliente foi selecionado para exibir os detalhes
 if "selected_customer_id" in st.session_state and st.session_state.selected_customer_id:
     customer_id = st.session_state.selected_customer_id
-    try:
-        customer = database.get_customer_by_id(customer_id)
-    except database.DatabaseError as e:
-        st.error(f"Erro ao buscar dados do cliente: {e}")
+    customer = results.get("customer")
+    if isinstance(customer, database.DatabaseError):
+        st.error(f"Erro ao buscar dados do cliente: {customer}")
         customer = None # Garante que não tentaremos exibir dados de um cliente que falhou
 
     if customer:
@@ -225,14 +338,8 @@ else: # Nenhum cliente selecionado, exibe a tabela
             "estado": "Estado",
         }
         
-        # Define a ordem e quais colunas serão visíveis na grade principal
-        visible_columns = [
-            'id', 'nome_completo', 'tipo_documento', 'cpf', 'cnpj', 
-            'telefone1', 'link_wpp_1', 'cidade', 'estado'
-        ]
-
         # Garante que apenas colunas existentes no dataframe são usadas
-        columns_to_display = [col for col in visible_columns if col in df_page.columns]
+        columns_to_display = [col for col in GRID_COLUMNS if col in df_page.columns]
 
         st.dataframe(
             df_page[columns_to_display],
@@ -245,7 +352,8 @@ else: # Nenhum cliente selecionado, exibe a tabela
             use_container_width=True
         )
         
-        st.markdown(f"Mostrando **{len(df_page)}** de **{total_records}** registros. Página **{page_number}** de **{total_pages}**.")
+        total_label = total_records if count_method == "exact" else f"~{total_records}"
+        st.markdown(f"Mostrando **{len(df_page)}** de **{total_label}** registros. Página **{page_number}** de **{total_pages}**.")
 
         # Lógica de seleção
         grid_state = st.session_state.get("customer_grid")
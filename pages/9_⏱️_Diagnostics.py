@@ -0,0 +1,87 @@
+import streamlit as st
+import altair as alt
+import database
+import services
+
+st.set_page_config(page_title="Diagnóstico", page_icon="⏱️", layout="wide")
+
+st.title("⏱️ Diagnóstico de Desempenho")
+st.caption("Latência das chamadas ao banco de dados feitas por este servidor desde o último reinício, "
+           "por função e tipo de filtro. Os percentis consideram as últimas chamadas de cada consulta.")
+
+query_metrics = database.get_query_metrics()
+
+if query_metrics.empty:
+    st.info("Nenhuma consulta registrada ainda. Navegue pelas outras páginas e volte aqui.")
+else:
+    query_metrics['consulta'] = query_metrics['funcao'] + " [" + query_metrics['filtros'] + "]"
+    slowest = query_metrics.sort_values('p95_ms', ascending=False).head(15)
+    chart = alt.Chart(slowest).mark_bar().encode(
+        x=alt.X('p95_ms:Q', title='p95 (ms)'),
+        y=alt.Y('consulta:N', sort='-x', title=None),
+        tooltip=['funcao', 'filtros', 'chamadas', alt.Tooltip('p50_ms:Q', format='.1f'),
+                 alt.Tooltip('p95_ms:Q', format='.1f'), alt.Tooltip('p99_ms:Q', format='.1f')],
+    )
+    st.subheader("Consultas mais lentas (p95)")
+    st.altair_chart(chart, use_container_width=True)
+
+    st.subheader("Todas as consultas")
+    st.dataframe(
+        query_metrics.drop(columns=['consulta']),
+        hide_index=True,
+        use_container_width=True,
+        column_config={
+            "funcao": "Função", "filtros": "Filtros", "chamadas": "Chamadas", "erros": "Erros",
+            "acertos_cache": "Acertos de cache",
+            "p50_ms": st.column_config.NumberColumn("p50 (ms)", format="%.1f"),
+            "p95_ms": st.column_config.NumberColumn("p95 (ms)", format="%.1f"),
+            "p99_ms": st.column_config.NumberColumn("p99 (ms)", format="%.1f"),
+            "total_s": st.column_config.NumberColumn("Tempo total (s)", format="%.2f"),
+            "linhas_media": st.column_config.NumberColumn("Linhas (média)", format="%.0f"),
+            "bytes_media": st.column_config.NumberColumn("Bytes (média)", format="%.0f"),
+        },
+    )
+
+st.markdown("---")
+col_cache, col_http, col_outbox = st.columns(3)
+
+with col_cache:
+    st.subheader("Cache de consultas")
+    cache_stats = database.get_cache_stats()
+    lookups = cache_stats['hits'] + cache_stats['misses']
+    st.metric("Taxa de acerto", f"{cache_stats['hits'] / lookups:.0%}" if lookups else "-")
+    st.caption(f"{cache_stats['size']} entradas, {cache_stats['evictions']} descartadas, "
+               f"{cache_stats['invalidations']} invalidadas por escrita.")
+
+with col_http:
+    st.subheader("Conexões HTTP")
+    http_stats = database.get_http_stats()
+    if http_stats is None:
+        st.caption("O cliente do Supabase ainda não foi usado neste servidor.")
+    else:
+        st.metric("Disjuntor", http_stats['circuit'])
+        st.caption(f"{http_stats['active_connections']} conexão(ões) em uso, {http_stats['idle_connections']} ociosa(s); "
+                   f"{http_stats['requests']} requisições, {http_stats['retried']} novas tentativas, "
+                   f"{http_stats['failures']} falhas, {http_stats['rejected']} recusadas pelo disjuntor.")
+
+with col_outbox:
+    st.subheader("Fila de envio")
+    outbox_stats = database.get_outbox_stats()
+    if outbox_stats is None:
+        st.caption("Gravação em segundo plano desativada (WRITE_BEHIND).")
+    else:
+        st.metric("Cadastros aguardando", outbox_stats['depth'])
+        if outbox_stats['avg_latency'] is not None:
+            st.caption(f"Latência média de envio: {outbox_stats['avg_latency']:.1f} s "
+                       f"(máxima {outbox_stats['max_latency']:.1f} s).")
+
+st.subheader("Cache de CEP")
+cep_stats = services.get_cep_cache_stats()
+st.caption(f"{cep_stats['hits']} endereço(s) e {cep_stats['negative_hits']} CEP(s) inexistente(s) atendidos pelo cache; "
+           f"{cep_stats['misses']} consulta(s) ao ViaCEP.")
+
+st.markdown("---")
+# As métricas são compartilhadas por todas as sessões e o aplicativo não tem login de
+# administrador, por isso a página não oferece como zerá-las
+st.download_button("⬇️ Métricas no formato Prometheus", data=database.get_prometheus_metrics(),
+                   file_name="metrics.txt", mime="text/plain")
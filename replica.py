@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""Réplica local (SQLite) do Supabase, mantida por sincronização incremental.
+
+`sync` busca apenas as linhas gravadas depois da marca d'água guardada na réplica
+(coluna updated_at) e aplica as exclusões registradas em customers_deleted; ver
+sql/004_updated_at_sync.sql. `ReplicaBackend` atende listas, buscas e o Dashboard pela
+réplica e envia as gravações ao Supabase. Uso pela linha de comando:
+    python replica.py            # sincroniza uma vez
+    python replica.py --loop 60  # sincroniza a cada 60 segundos
+    python replica.py --full     # refaz a réplica do zero
+"""
+import argparse
+import datetime
+import logging
+import threading
+import time
+from storage import StorageBackend
+
+SYNC_PAGE_SIZE = 1000
+# A réplica relê este intervalo antes da marca d'água: uma transação que terminou depois
+# da última sincronização pode ter gravado um updated_at um pouco anterior à marca
+SYNC_OVERLAP = 10 # segundos
+SYNC_INTERVAL = 30 # segundos entre sincronizações disparadas por leituras
+
+CHANGES_WATERMARK = "customers.updated_at"
+DELETIONS_WATERMARK = "customers_deleted.deleted_at"
+
+
+def _rewind(watermark: str, seconds: float):
+    if not watermark:
+        return None
+    moment = datetime.datetime.fromisoformat(watermark.replace('Z', '+00:00'))
+    return (moment - datetime.timedelta(seconds=seconds)).isoformat()
+
+def _later(a: str, b: str) -> str:
+    if not a or not b:
+        return a or b
+    parse = lambda value: datetime.datetime.fromisoformat(value.replace('Z', '+00:00'))
+    return a if parse(a) >= parse(b) else b
+
+def sync(primary, replica, columns: list, full: bool = False, page_size: int = SYNC_PAGE_SIZE,
+         overlap: float = SYNC_OVERLAP, on_change=None) -> dict:
+    """Copia para `replica` (SQLiteBackend) as alterações de `primary` desde a última sincronização.
+
+    `on_change(linhas)` recebe as linhas que mudaram na réplica: novas, com outro updated_at
+    ou removidas (ex.: para invalidar o cache de consultas); as relidas sem alteração, como a
+    da marca d'água, não contam. Retorna {"upserted": n, "deleted": n}.
+    """
+    if full:
+        replica.clear()
+    stats = {"upserted": 0, "deleted": 0}
+
+    watermark = replica.get_sync_state(CHANGES_WATERMARK)
+    since, after_id = _rewind(watermark, overlap), 0
+    while True:
+        rows = primary.select_changes(columns, since, after_id, page_size)
+        if rows:
+            changed = replica.apply_changes(rows)
+            stats["upserted"] += len(rows)
+            since, after_id = rows[-1]['updated_at'], rows[-1]['id']
+            watermark = _later(watermark, since)
+            replica.set_sync_state(CHANGES_WATERMARK, watermark)
+            if on_change and changed:
+                on_change(changed)
+        if len(rows) < page_size:
+            break
+
+    watermark = replica.get_sync_state(DELETIONS_WATERMARK)
+    since, after_id = _rewind(watermark, overlap), 0
+    while True:
+        tombstones = primary.select_deletions(since, after_id, page_size)
+        if tombstones:
+            deleted = replica.delete_customers([t['id'] for t in tombstones])
+            stats["deleted"] += len(deleted)
+            since, after_id = tombstones[-1]['deleted_at'], tombstones[-1]['id']
+            watermark = _later(watermark, since)
+            replica.set_sync_state(DELETIONS_WATERMARK, watermark)
+            if on_change and deleted:
+                on_change(deleted)
+        if len(tombstones) < page_size:
+            break
+
+    logging.info(f"Réplica sincronizada: {stats['upserted']} linha(s) gravada(s), {stats['deleted']} removida(s).")
+    return stats
+
+
+class ReplicaBackend(StorageBackend):
+    """Leituras na réplica SQLite local, gravações no backend principal (Supabase).
+
+    As leituras disparam uma sincronização, em uma thread em segundo plano, quando a última
+    tem mais de `sync_interval` segundos (uma por vez); nenhuma leitura espera por ela e
+    todas seguem com a réplica como está. Enquanto a réplica nunca tiver sido sincronizada,
+    as leituras vão ao backend principal. As linhas devolvidas pelas gravações também são
+    copiadas para a réplica na hora.
+    """
+
+    name = "replica"
+
+    def __init__(self, primary: StorageBackend, replica, columns: list, sync_interval: float = SYNC_INTERVAL, on_change=None):
+        self.primary = primary
+        self.replica = replica
+        self.columns = list(columns)
+        self.sync_interval = sync_interval
+        self._on_change = on_change
+        self._sync_lock = threading.Lock()
+        self._last_sync = None
+        self._sync_thread = None
+        self._synced = replica.get_sync_state(CHANGES_WATERMARK) is not None
+
+    def sync(self, full: bool = False) -> dict:
+        with self._sync_lock:
+            stats = sync(self.primary, self.replica, self.columns, full=full, on_change=self._on_change)
+            self._last_sync = time.monotonic()
+            self._synced = True
+            return stats
+
+    def _background_sync(self):
+        try:
+            sync(self.primary, self.replica, self.columns, on_change=self._on_change)
+            self._synced = True
+        except Exception as e:
+            logging.warning(f"Falha ao sincronizar a réplica; usando os dados locais existentes: {e}")
+        finally:
+            self._last_sync = time.monotonic()
+            self._sync_lock.release()
+
+    def _reader(self) -> StorageBackend:
+        # Escolhido antes de disparar a sincronização: esta leitura não depende dela
+        reader = self.replica if self._synced else self.primary
+        stale = self._last_sync is None or time.monotonic() - self._last_sync >= self.sync_interval
+        if stale and self._sync_lock.acquire(blocking=False):
+            # O lock é liberado pela thread, ao fim da sincronização
+            self._sync_thread = threading.Thread(target=self._background_sync, name="replica-sync", daemon=True)
+            self._sync_thread.start()
+        return reader
+
+    def _copy_to_replica(self, rows: list):
+        try:
+            self.replica.apply_changes([{c: row[c] for c in self.columns if c in row} for row in rows if row.get('id') is not None])
+        except Exception as e:
+            # A próxima sincronização corrige a réplica
+            logging.warning(f"Falha ao copiar gravação para a réplica: {e}")
+
+    def _remove_from_replica(self, ids: list):
+        try:
+            self.replica.delete_customers(ids)
+        except Exception as e:
+            logging.warning(f"Falha ao remover da réplica: {e}")
+
+    # Gravações: backend principal, depois a réplica
+
+    def insert_customer(self, row):
+        written = self.primary.insert_customer(row)
+        self._copy_to_replica(written or [])
+        return written
+
+    def insert_customers(self, rows):
+        written = self.primary.insert_customers(rows)
+        self._copy_to_replica(written or [])
+        return written
+
+    def upsert_customers(self, rows):
+        written = self.primary.upsert_customers(rows)
+        self._copy_to_replica(written or [])
+        return written
+
+    def delete_customer(self, customer_id):
+        deleted = self.primary.delete_customer(customer_id)
+        self._remove_from_replica([customer_id])
+        return deleted
+
+    def delete_customers(self, ids):
+        deleted = self.primary.delete_customers(ids)
+        self._remove_from_replica(ids)
+        return deleted
+
+    def find_documents(self, cpfs, cnpjs):
+        # Checagem de duplicidade sempre no banco principal
+        return self.primary.find_documents(cpfs, cnpjs)
+
+    # Leituras: réplica local
+
+    def select_customers(self, columns, filters, page=1, page_size=10000, after_id=None, before_id=None, count=None):
+        return self._reader().select_customers(columns, filters, page, page_size, after_id, before_id, count)
+
+    def select_recent(self, columns, filters, limit=None):
+        return self._reader().select_recent(columns, filters, limit)
+
+    def get_customer(self, customer_id, columns):
+        return self._reader().get_customer(customer_id, columns)
+
+    def count_customers(self, filters, count='exact'):
+        return self._reader().count_customers(filters, count)
+
+    def list_states(self):
+        return self._reader().list_states()
+
+    def dashboard_stats(self, start_date=None, end_date=None):
+        return self._reader().dashboard_stats(start_date, end_date)
+
+    def dashboard_bundle(self, start_date=None, end_date=None, recent_limit=5):
+        return self._reader().dashboard_bundle(start_date, end_date, recent_limit)
+
+    def rebuild_rollup(self):
+        # O resumo da réplica é mantido pelos triggers locais, independentemente do principal
+        self.replica.rebuild_rollup()
+        return self.primary.rebuild_rollup()
+
+
+def main():
+    import database
+
+    parser = argparse.ArgumentParser(description="Sincroniza a réplica SQLite local com o Supabase.")
+    parser.add_argument("--full", action="store_true", help="Refaz a réplica do zero")
+    parser.add_argument("--loop", type=float, default=None, metavar="SEGUNDOS", help="Sincroniza continuamente neste intervalo")
+    args = parser.parse_args()
+
+    backend = database.create_backend("replica", path=database._get_setting("SQLITE_PATH", "clientes.db"))
+    stats = backend.sync(full=args.full)
+    print(f"gravadas: {stats['upserted']}, removidas: {stats['deleted']}")
+    while args.loop:
+        time.sleep(args.loop)
+        stats = backend.sync()
+        print(f"gravadas: {stats['upserted']}, removidas: {stats['deleted']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,19 @@
+#!/usr/bin/env python3
+"""Reconstrói o resumo diário de clientes que alimenta o Dashboard (tabela customers_daily).
+
+O resumo é mantido por triggers a cada gravação (ver sql/005_customers_daily.sql); este
+comando o refaz do zero a partir da tabela customers, no backend configurado em DB_BACKEND:
+    python rollup.py
+"""
+import argparse
+import database
+
+
+def main():
+    argparse.ArgumentParser(description="Refaz o resumo diário de clientes usado pelo Dashboard.").parse_args()
+    groups = database.rebuild_dashboard_rollup()
+    print(f"grupos: {groups}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,62 @@
 import streamlit as st
 import requests
 import re
+from requests.adapters import HTTPAdapter
+import logging
+import threading
+import cep_cache
+import database
+
+VIACEP_URL = "https://viacep.com.br/ws/{cep}/json/"
+VIACEP_TIMEOUT = 5 # segundos
+
+_session = None
+_cep_cache = None
+_lock = threading.Lock()
+
+def get_session() -> requests.Session:
+    """Sessão HTTP compartilhada: reaproveita a conexão (keep-alive) com o ViaCEP entre buscas."""
+    global _session
+    with _lock:
+        if _session is None:
+            _session = requests.Session()
+            _session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=4))
+        return _session
+
+def get_cep_cache() -> cep_cache.CepCache:
+    """Cache de CEPs no arquivo CEP_CACHE_PATH (Segredos); entradas vencidas são removidas ao abrir."""
+    global _cep_cache
+    with _lock:
+        if _cep_cache is None:
+            _cep_cache = cep_cache.CepCache(
+                database._get_setting("CEP_CACHE_PATH", "cep_cache.db"),
+                ttl=float(database._get_setting("CEP_CACHE_TTL", cep_cache.CEP_CACHE_TTL)),
+                negative_ttl=float(database._get_setting("CEP_NEGATIVE_TTL", cep_cache.CEP_NEGATIVE_TTL)),
+            )
+            removed = _cep_cache.purge()
+            if removed:
+                logging.info(f"Cache de CEP: {removed} entrada(s) vencida(s) removida(s).")
+        return _cep_cache
+
+def get_cep_cache_stats() -> dict:
+    return get_cep_cache().stats()
+
+def lookup_cep(cep_cleaned: str) -> dict:
+    """Endereço do CEP (8 dígitos) segundo o ViaCEP, ou None se ele não existir.
+
+    Respostas, inclusive as de CEP inexistente, ficam no cache; erros de rede não.
+    """
+    cache = get_cep_cache()
+    hit, data = cache.get(cep_cleaned)
+    if hit:
+        return data
+    response = get_session().get(VIACEP_URL.format(cep=cep_cleaned), timeout=VIACEP_TIMEOUT)
+    response.raise_for_status()
+    data = response.json()
+    if data.get("erro"):
+        data = None
+    cache.set(cep_cleaned, data)
+    return data
 
 def fetch_address_data(cep):
     cep_cleaned = re.sub(r'[^0-9]', '', cep)
@@ -9,10 +65,8 @@ def fetch_address_data(cep):
         return
     try:
         with st.spinner("Buscando CEP..."):
-            response = requests.get(f"https://viacep.com.br/ws/{cep_cleaned}/json/", timeout=5)
-            response.raise_for_status()
-            data = response.json()
-        if data.get("erro"):
+            data = lookup_cep(cep_cleaned)
+        if data is None:
             st.session_state.cep_notification = {"type": "warning", "message": "CEP não encontrado. Por favor, preencha o endereço manualmente."}
         else:
             st.session_state.cep_notification = {"type": "success", "message": "Endereço encontrado!"}
@@ -0,0 +1,32 @@
+-- Contagens agrupadas para o Dashboard em uma única chamada (RPC "dashboard_stats").
+-- Retorna uma linha por grupo: (dimensao, chave, contagem), onde dimensao é
+-- 'estado', 'cidade', 'tipo_documento' ou 'mes' (AAAA-MM da data de cadastro).
+-- O mesmo formato é reproduzido em sqlite_backend.DASHBOARD_STATS_SQL.
+
+create index if not exists customers_data_cadastro_idx on public.customers (data_cadastro);
+
+create or replace function public.dashboard_stats(start_date date default null, end_date date default null)
+returns table (dimensao text, chave text, contagem bigint)
+language sql
+stable
+as $$
+    with periodo as (
+        select estado, cidade, tipo_documento, data_cadastro
+        from public.customers
+        where (start_date is null or data_cadastro >= start_date)
+          and (end_date is null or data_cadastro <= end_date)
+    )
+    select 'estado', estado, count(*) from periodo
+        where estado is not null and estado <> '' group by estado
+    union all
+    select 'cidade', cidade, count(*) from periodo
+        where cidade is not null and cidade <> '' group by cidade
+    union all
+    select 'tipo_documento', tipo_documento, count(*) from periodo
+        where tipo_documento is not null group by tipo_documento
+    union all
+    select 'mes', to_char(data_cadastro, 'YYYY-MM'), count(*) from periodo
+        where data_cadastro is not null group by to_char(data_cadastro, 'YYYY-MM');
+$$;
+
+grant execute on function public.dashboard_stats(date, date) to anon, authenticated;
@@ -0,0 +1,30 @@
+-- Todos os dados do Dashboard em uma única requisição (RPC "dashboard_bundle").
+-- Depende de public.dashboard_stats (001_dashboard_stats.sql).
+
+create or replace function public.dashboard_bundle(start_date date default null, end_date date default null, recent_limit int default 5)
+returns json
+language sql
+stable
+as $$
+    select json_build_object(
+        'total', (select count(*) from public.customers),
+        'novos_no_periodo', (
+            select count(*) from public.customers
+            where start_date is null or end_date is null
+               or (data_cadastro >= start_date and data_cadastro <= end_date)
+        ),
+        'stats', coalesce((select json_agg(s) from public.dashboard_stats(start_date, end_date) s), '[]'::json),
+        'recentes', coalesce((
+            select json_agg(r) from (
+                select nome_completo, email, cidade, data_cadastro, tipo_documento, estado
+                from public.customers
+                where (start_date is null or data_cadastro >= start_date)
+                  and (end_date is null or data_cadastro <= end_date)
+                order by data_cadastro desc, id desc
+                limit recent_limit
+            ) r
+        ), '[]'::json)
+    );
+$$;
+
+grant execute on function public.dashboard_bundle(date, date, int) to anon, authenticated;
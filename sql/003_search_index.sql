@@ -0,0 +1,29 @@
+-- Busca indexada por documento e nome (usada por database._apply_filters).
+--  * cpf_digits / cnpj_digits: apenas os dígitos do documento, com índice B-tree para
+--    busca por prefixo (LIKE '123%'), encontrando o cliente com ou sem pontuação.
+--  * nome_busca: nome em minúsculas e sem acentos, com índice trigram (GIN) para
+--    ILIKE '%termo%' sem varrer a tabela.
+-- Equivalente offline: FTS5 em sqlite_backend.py.
+
+create extension if not exists unaccent;
+create extension if not exists pg_trgm;
+
+-- unaccent() não é IMMUTABLE; o wrapper com dicionário explícito pode ser usado em colunas geradas
+create or replace function public.f_unaccent(text)
+returns text
+language sql
+immutable
+parallel safe
+strict
+as $$
+    select public.unaccent('public.unaccent'::regdictionary, $1)
+$$;
+
+alter table public.customers
+    add column if not exists cpf_digits text generated always as (regexp_replace(coalesce(cpf, ''), '[^0-9]', '', 'g')) stored,
+    add column if not exists cnpj_digits text generated always as (regexp_replace(coalesce(cnpj, ''), '[^0-9]', '', 'g')) stored,
+    add column if not exists nome_busca text generated always as (lower(public.f_unaccent(coalesce(nome_completo, '')))) stored;
+
+create index if not exists customers_cpf_digits_idx on public.customers (cpf_digits text_pattern_ops);
+create index if not exists customers_cnpj_digits_idx on public.customers (cnpj_digits text_pattern_ops);
+create index if not exists customers_nome_busca_trgm_idx on public.customers using gin (nome_busca gin_trgm_ops);
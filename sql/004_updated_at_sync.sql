@@ -0,0 +1,55 @@
+-- Sincronização incremental da réplica local (replica.py).
+--  * updated_at: momento da última gravação de cada cliente, mantido por trigger. A réplica
+--    busca apenas as linhas com updated_at posterior à sua marca d'água.
+--  * customers_deleted: "lápides" dos clientes removidos, para a réplica aplicar as exclusões.
+-- Equivalente offline: coluna updated_at e triggers em sqlite_backend.py.
+
+alter table public.customers
+    add column if not exists updated_at timestamptz not null default now();
+
+create index if not exists customers_updated_at_idx on public.customers (updated_at, id);
+
+-- clock_timestamp() em vez de now(): linhas de uma mesma transação longa não ficam com o
+-- horário do início dela (a réplica ainda relê alguns segundos antes da marca, ver SYNC_OVERLAP)
+create or replace function public.set_updated_at()
+returns trigger
+language plpgsql
+as $$
+begin
+    new.updated_at := clock_timestamp();
+    return new;
+end;
+$$;
+
+drop trigger if exists customers_set_updated_at on public.customers;
+create trigger customers_set_updated_at
+    before insert or update on public.customers
+    for each row execute function public.set_updated_at();
+
+create table if not exists public.customers_deleted (
+    id bigint primary key,
+    deleted_at timestamptz not null default clock_timestamp()
+);
+
+create index if not exists customers_deleted_deleted_at_idx on public.customers_deleted (deleted_at, id);
+
+create or replace function public.record_customer_deletion()
+returns trigger
+language plpgsql
+as $$
+begin
+    insert into public.customers_deleted (id, deleted_at)
+    values (old.id, clock_timestamp())
+    on conflict (id) do update set deleted_at = excluded.deleted_at;
+    return old;
+end;
+$$;
+
+drop trigger if exists customers_record_deletion on public.customers;
+create trigger customers_record_deletion
+    after delete on public.customers
+    for each row execute function public.record_customer_deletion();
+
+-- Lápides antigas podem ser apagadas periodicamente; uma réplica parada por mais tempo
+-- que a retenção deve ser refeita do zero (python replica.py --full):
+--   delete from public.customers_deleted where deleted_at < now() - interval '90 days';
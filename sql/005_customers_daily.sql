@@ -0,0 +1,157 @@
+-- Resumo diário de clientes para o Dashboard (tabela customers_daily).
+-- Uma linha por (dia de cadastro, estado, cidade, tipo de documento) com a quantidade de
+-- clientes, mantida por triggers a cada insert, update e delete em customers. As funções
+-- dashboard_stats e dashboard_bundle passam a ler o resumo: o custo depende do número de
+-- dias do período, não do número de clientes.
+-- Depende de 001_dashboard_stats.sql e 002_dashboard_bundle.sql (substitui as duas funções).
+-- Equivalente offline: ROLLUP_SCHEMA em sqlite_backend.py.
+
+create table if not exists public.customers_daily (
+    dia date not null,            -- data_cadastro; '-infinity' para clientes sem data
+    estado text not null,         -- '' quando vazio
+    cidade text not null,         -- '' quando vazia
+    tipo_documento text not null,
+    contagem bigint not null,
+    primary key (dia, estado, cidade, tipo_documento)
+);
+
+-- Grupos que zeraram, removidos ao fim de cada comando
+create index if not exists customers_daily_zerados_idx on public.customers_daily (dia) where contagem <= 0;
+
+grant select on public.customers_daily to anon, authenticated;
+
+-- Triggers por comando (não por linha): uma importação em lote atualiza cada grupo uma vez.
+-- security definer: grava no resumo com as permissões do dono, não as de quem alterou customers
+create or replace function public.customers_daily_apply()
+returns trigger
+language plpgsql
+security definer
+set search_path = public
+as $$
+begin
+    if tg_op = 'INSERT' then
+        insert into customers_daily as d (dia, estado, cidade, tipo_documento, contagem)
+        select coalesce(data_cadastro, '-infinity'), coalesce(estado, ''), coalesce(cidade, ''), coalesce(tipo_documento, ''), count(*)
+        from novas group by 1, 2, 3, 4
+        on conflict (dia, estado, cidade, tipo_documento) do update set contagem = d.contagem + excluded.contagem;
+    elsif tg_op = 'DELETE' then
+        insert into customers_daily as d (dia, estado, cidade, tipo_documento, contagem)
+        select coalesce(data_cadastro, '-infinity'), coalesce(estado, ''), coalesce(cidade, ''), coalesce(tipo_documento, ''), -count(*)
+        from antigas group by 1, 2, 3, 4
+        on conflict (dia, estado, cidade, tipo_documento) do update set contagem = d.contagem + excluded.contagem;
+    else
+        -- Linhas cujo grupo não mudou se anulam (+1 e -1) e não tocam o resumo
+        insert into customers_daily as d (dia, estado, cidade, tipo_documento, contagem)
+        select dia, estado, cidade, tipo_documento, sum(delta)
+        from (
+            select coalesce(data_cadastro, '-infinity'::date) as dia, coalesce(estado, '') as estado,
+                   coalesce(cidade, '') as cidade, coalesce(tipo_documento, '') as tipo_documento, 1 as delta
+            from novas
+            union all
+            select coalesce(data_cadastro, '-infinity'::date), coalesce(estado, ''),
+                   coalesce(cidade, ''), coalesce(tipo_documento, ''), -1
+            from antigas
+        ) mudancas
+        group by 1, 2, 3, 4
+        having sum(delta) <> 0
+        on conflict (dia, estado, cidade, tipo_documento) do update set contagem = d.contagem + excluded.contagem;
+    end if;
+    delete from customers_daily where contagem <= 0;
+    return null;
+end;
+$$;
+
+drop trigger if exists customers_daily_insert on public.customers;
+create trigger customers_daily_insert
+    after insert on public.customers
+    referencing new table as novas
+    for each statement execute function public.customers_daily_apply();
+
+drop trigger if exists customers_daily_update on public.customers;
+create trigger customers_daily_update
+    after update on public.customers
+    referencing old table as antigas new table as novas
+    for each statement execute function public.customers_daily_apply();
+
+drop trigger if exists customers_daily_delete on public.customers;
+create trigger customers_daily_delete
+    after delete on public.customers
+    referencing old table as antigas
+    for each statement execute function public.customers_daily_apply();
+
+-- Refaz o resumo a partir de customers (RPC "rebuild_customers_daily"; python rollup.py).
+-- O lock impede gravações em customers durante a reconstrução. Retorna o número de grupos.
+-- Apenas para manutenção: executável só com a chave service_role (SUPABASE_SERVICE_KEY).
+create or replace function public.rebuild_customers_daily()
+returns bigint
+language plpgsql
+security definer
+set search_path = public
+as $$
+declare
+    grupos bigint;
+begin
+    lock table customers in share mode;
+    delete from customers_daily;
+    insert into customers_daily (dia, estado, cidade, tipo_documento, contagem)
+    select coalesce(data_cadastro, '-infinity'), coalesce(estado, ''), coalesce(cidade, ''), coalesce(tipo_documento, ''), count(*)
+    from customers group by 1, 2, 3, 4;
+    get diagnostics grupos = row_count;
+    return grupos;
+end;
+$$;
+
+revoke execute on function public.rebuild_customers_daily() from public, anon, authenticated;
+grant execute on function public.rebuild_customers_daily() to service_role;
+
+select public.rebuild_customers_daily();
+
+create or replace function public.dashboard_stats(start_date date default null, end_date date default null)
+returns table (dimensao text, chave text, contagem bigint)
+language sql
+stable
+as $$
+    with periodo as (
+        select dia, estado, cidade, tipo_documento, contagem
+        from public.customers_daily
+        where (start_date is null or dia >= start_date)
+          and (end_date is null or (isfinite(dia) and dia <= end_date))
+    )
+    select 'estado', estado, sum(contagem)::bigint from periodo
+        where estado <> '' group by estado
+    union all
+    select 'cidade', cidade, sum(contagem)::bigint from periodo
+        where cidade <> '' group by cidade
+    union all
+    select 'tipo_documento', tipo_documento, sum(contagem)::bigint from periodo
+        where tipo_documento <> '' group by tipo_documento
+    union all
+    select 'mes', to_char(dia, 'YYYY-MM'), sum(contagem)::bigint from periodo
+        where isfinite(dia) group by to_char(dia, 'YYYY-MM');
+$$;
+
+create or replace function public.dashboard_bundle(start_date date default null, end_date date default null, recent_limit int default 5)
+returns json
+language sql
+stable
+as $$
+    select json_build_object(
+        'total', (select coalesce(sum(contagem), 0) from public.customers_daily),
+        'novos_no_periodo', (
+            select coalesce(sum(contagem), 0) from public.customers_daily
+            where start_date is null or end_date is null
+               or (dia >= start_date and dia <= end_date)
+        ),
+        'stats', coalesce((select json_agg(s) from public.dashboard_stats(start_date, end_date) s), '[]'::json),
+        'recentes', coalesce((
+            select json_agg(r) from (
+                select nome_completo, email, cidade, data_cadastro, tipo_documento, estado
+                from public.customers
+                where (start_date is null or data_cadastro >= start_date)
+                  and (end_date is null or data_cadastro <= end_date)
+                order by data_cadastro desc, id desc
+                limit recent_limit
+            ) r
+        ), '[]'::json)
+    );
+$$;
@@ -0,0 +1,15 @@
+-- UFs com clientes, para o filtro "Filtrar por Estado" do Banco de Dados (RPC "list_states").
+-- Lê o resumo diário (005_customers_daily.sql), que tem uma linha por dia e grupo, em vez
+-- de percorrer a tabela customers.
+
+create index if not exists customers_daily_estado_idx on public.customers_daily (estado);
+
+create or replace function public.list_states()
+returns table (estado text)
+language sql
+stable
+as $$
+    select distinct estado from public.customers_daily where estado <> '' order by estado;
+$$;
+
+grant execute on function public.list_states() to anon, authenticated;
@@ -0,0 +1,462 @@
+import datetime
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from storage import StorageBackend
+
+# Esquema local equivalente à tabela 'customers' do Supabase.
+CUSTOMERS_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS customers (
+        id INTEGER PRIMARY KEY,
+        nome_completo TEXT NOT NULL,
+        tipo_documento TEXT NOT NULL,
+        cpf TEXT UNIQUE,
+        cnpj TEXT UNIQUE,
+        contato1 TEXT,
+        telefone1 TEXT,
+        contato2 TEXT,
+        telefone2 TEXT,
+        cargo TEXT,
+        email TEXT,
+        data_nascimento DATE,
+        cep TEXT,
+        endereco TEXT,
+        numero TEXT,
+        complemento TEXT,
+        bairro TEXT,
+        cidade TEXT,
+        estado TEXT,
+        observacao TEXT,
+        data_cadastro DATE DEFAULT (date('now')),
+        updated_at TEXT,
+        -- Apenas os dígitos do documento, para busca por prefixo com ou sem pontuação
+        cpf_digits TEXT GENERATED ALWAYS AS (replace(replace(replace(replace(cpf, '.', ''), '-', ''), '/', ''), ' ', '')) VIRTUAL,
+        cnpj_digits TEXT GENERATED ALWAYS AS (replace(replace(replace(replace(cnpj, '.', ''), '-', ''), '/', ''), ' ', '')) VIRTUAL,
+        CHECK (
+            (tipo_documento = 'CPF' AND cpf IS NOT NULL) OR
+            (tipo_documento = 'CNPJ' AND cnpj IS NOT NULL)
+        )
+    );
+    CREATE INDEX IF NOT EXISTS customers_data_cadastro_idx ON customers (data_cadastro);
+    CREATE INDEX IF NOT EXISTS customers_estado_idx ON customers (estado);
+    CREATE INDEX IF NOT EXISTS customers_cpf_digits_idx ON customers (cpf_digits);
+    CREATE INDEX IF NOT EXISTS customers_cnpj_digits_idx ON customers (cnpj_digits);
+
+    -- Índice de texto do nome, sem acentos (equivalente ao índice trigram do Postgres)
+    CREATE VIRTUAL TABLE IF NOT EXISTS customers_fts USING fts5(
+        nome_completo, content='customers', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+    );
+    CREATE TRIGGER IF NOT EXISTS customers_fts_insert AFTER INSERT ON customers BEGIN
+        INSERT INTO customers_fts (rowid, nome_completo) VALUES (new.id, new.nome_completo);
+    END;
+    CREATE TRIGGER IF NOT EXISTS customers_fts_delete AFTER DELETE ON customers BEGIN
+        INSERT INTO customers_fts (customers_fts, rowid, nome_completo) VALUES ('delete', old.id, old.nome_completo);
+    END;
+    CREATE TRIGGER IF NOT EXISTS customers_fts_update AFTER UPDATE OF nome_completo ON customers BEGIN
+        INSERT INTO customers_fts (customers_fts, rowid, nome_completo) VALUES ('delete', old.id, old.nome_completo);
+        INSERT INTO customers_fts (rowid, nome_completo) VALUES (new.id, new.nome_completo);
+    END;
+'''
+
+# Resumo diário de clientes (equivalente a sql/005_customers_daily.sql), mantido por triggers.
+# 'dia' é a data de cadastro ('' para clientes sem data); estado e cidade vazios viram ''.
+ROLLUP_KEY = "coalesce(date({0}.data_cadastro), ''), coalesce({0}.estado, ''), coalesce({0}.cidade, ''), coalesce({0}.tipo_documento, '')"
+ROLLUP_MATCH = ("dia = coalesce(date(old.data_cadastro), '') AND estado = coalesce(old.estado, '') "
+                "AND cidade = coalesce(old.cidade, '') AND tipo_documento = coalesce(old.tipo_documento, '')")
+ROLLUP_SCHEMA = f'''
+    CREATE TABLE IF NOT EXISTS customers_daily (
+        dia TEXT NOT NULL,
+        estado TEXT NOT NULL,
+        cidade TEXT NOT NULL,
+        tipo_documento TEXT NOT NULL,
+        contagem INTEGER NOT NULL,
+        PRIMARY KEY (dia, estado, cidade, tipo_documento)
+    ) WITHOUT ROWID;
+    CREATE TRIGGER IF NOT EXISTS customers_daily_insert AFTER INSERT ON customers BEGIN
+        INSERT INTO customers_daily VALUES ({ROLLUP_KEY.format('new')}, 1)
+            ON CONFLICT (dia, estado, cidade, tipo_documento) DO UPDATE SET contagem = contagem + 1;
+    END;
+    CREATE TRIGGER IF NOT EXISTS customers_daily_delete AFTER DELETE ON customers BEGIN
+        UPDATE customers_daily SET contagem = contagem - 1 WHERE {ROLLUP_MATCH};
+        DELETE FROM customers_daily WHERE {ROLLUP_MATCH} AND contagem <= 0;
+    END;
+    CREATE TRIGGER IF NOT EXISTS customers_daily_update AFTER UPDATE OF data_cadastro, estado, cidade, tipo_documento ON customers
+    WHEN old.data_cadastro IS NOT new.data_cadastro OR old.estado IS NOT new.estado
+      OR old.cidade IS NOT new.cidade OR old.tipo_documento IS NOT new.tipo_documento BEGIN
+        UPDATE customers_daily SET contagem = contagem - 1 WHERE {ROLLUP_MATCH};
+        DELETE FROM customers_daily WHERE {ROLLUP_MATCH} AND contagem <= 0;
+        INSERT INTO customers_daily VALUES ({ROLLUP_KEY.format('new')}, 1)
+            ON CONFLICT (dia, estado, cidade, tipo_documento) DO UPDATE SET contagem = contagem + 1;
+    END;
+'''
+
+REBUILD_ROLLUP_SQL = f'''
+    INSERT INTO customers_daily (dia, estado, cidade, tipo_documento, contagem)
+    SELECT {ROLLUP_KEY.format('customers')}, COUNT(*) FROM customers GROUP BY 1, 2, 3, 4
+'''
+
+# Mesmo resultado da função 'dashboard_stats' (sql/005_customers_daily.sql), lido do resumo diário.
+DASHBOARD_STATS_SQL = '''
+    WITH periodo AS (
+        SELECT dia, estado, cidade, tipo_documento, contagem
+        FROM customers_daily
+        WHERE (:start_date IS NULL OR dia >= :start_date)
+          AND (:end_date IS NULL OR (dia <> '' AND dia <= :end_date))
+    )
+    SELECT 'estado' AS dimensao, estado AS chave, SUM(contagem) AS contagem FROM periodo
+        WHERE estado <> '' GROUP BY estado
+    UNION ALL
+    SELECT 'cidade', cidade, SUM(contagem) FROM periodo
+        WHERE cidade <> '' GROUP BY cidade
+    UNION ALL
+    SELECT 'tipo_documento', tipo_documento, SUM(contagem) FROM periodo
+        WHERE tipo_documento <> '' GROUP BY tipo_documento
+    UNION ALL
+    SELECT 'mes', substr(dia, 1, 7), SUM(contagem) FROM periodo
+        WHERE dia <> '' GROUP BY substr(dia, 1, 7)
+'''
+
+# Marca d'água da sincronização com o Supabase (replica.py) e 'updated_at' mantido localmente.
+# Os triggers só preenchem 'updated_at' quando quem grava não o informou: as linhas copiadas
+# do Supabase mantêm o horário de lá.
+SYNC_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS sync_state (
+        name TEXT PRIMARY KEY,
+        value TEXT
+    );
+    CREATE INDEX IF NOT EXISTS customers_updated_at_idx ON customers (updated_at, id);
+    CREATE TRIGGER IF NOT EXISTS customers_updated_at_insert AFTER INSERT ON customers
+    WHEN new.updated_at IS NULL BEGIN
+        UPDATE customers SET updated_at = strftime('%Y-%m-%dT%H:%M:%fZ', 'now') WHERE id = new.id;
+    END;
+    CREATE TRIGGER IF NOT EXISTS customers_updated_at_update AFTER UPDATE ON customers
+    WHEN new.updated_at IS old.updated_at BEGIN
+        UPDATE customers SET updated_at = strftime('%Y-%m-%dT%H:%M:%fZ', 'now') WHERE id = new.id;
+    END;
+'''
+
+def create_schema(conn: sqlite3.Connection):
+    """Cria a tabela 'customers' e seus índices, caso ainda não existam."""
+    conn.executescript(CUSTOMERS_SCHEMA)
+    # Bancos criados antes da coluna 'updated_at'
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(customers)")}
+    if 'updated_at' not in columns:
+        conn.execute("ALTER TABLE customers ADD COLUMN updated_at TEXT")
+    conn.executescript(SYNC_SCHEMA)
+    # Bancos criados antes do resumo diário: o resumo nasce a partir dos clientes existentes
+    new_rollup = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'customers_daily'").fetchone() is None
+    conn.executescript(ROLLUP_SCHEMA)
+    if new_rollup:
+        rebuild_rollup(conn)
+
+def rebuild_rollup(conn: sqlite3.Connection) -> int:
+    """Refaz o resumo diário a partir da tabela customers; retorna o número de grupos."""
+    conn.execute("DELETE FROM customers_daily")
+    return conn.execute(REBUILD_ROLLUP_SQL).rowcount
+
+def dashboard_stats(conn: sqlite3.Connection, start_date=None, end_date=None) -> list:
+    """Equivalente local da RPC 'dashboard_stats': lista de dicts (dimensao, chave, contagem)."""
+    params = {"start_date": _adapt(start_date), "end_date": _adapt(end_date)}
+    return _fetch_dicts(conn.execute(DASHBOARD_STATS_SQL, params))
+
+def search_condition(name: str = None, digits: str = None):
+    """Condição WHERE da busca (equivalente a supabase_backend._search_filter) e seus parâmetros.
+
+    `name` (sem acentos) usa o índice FTS5, com cada palavra como prefixo;
+    `digits` usa os índices das colunas de dígitos com uma faixa (prefixo).
+    """
+    if name:
+        tokens = [token.replace('"', '') for token in name.split()]
+        match = ' '.join(f'"{token}"*' for token in tokens if token)
+        return "id IN (SELECT rowid FROM customers_fts WHERE customers_fts MATCH :fts)", {"fts": match}
+    if digits:
+        # ':' é o caractere seguinte a '9' em ASCII: a faixa cobre todos os valores com o prefixo
+        return ("((cpf_digits >= :digits AND cpf_digits < :digits_end) OR "
+                "(cnpj_digits >= :digits AND cnpj_digits < :digits_end))"), {"digits": digits, "digits_end": digits + ":"}
+    return None, {}
+
+def search_customers(conn: sqlite3.Connection, name: str = None, digits: str = None, limit: int = 50) -> list:
+    """Busca clientes pelo nome ou pelo prefixo do documento, do mais recente para o mais antigo."""
+    condition, params = search_condition(name, digits)
+    sql = "SELECT * FROM customers"
+    if condition:
+        sql += f" WHERE {condition}"
+    return _fetch_dicts(conn.execute(f"{sql} ORDER BY id DESC LIMIT :limit", {**params, "limit": limit}))
+
+
+class ConnectionPool:
+    """Pool limitado de conexões SQLite, compartilhado entre threads.
+
+    Arquivos usam WAL (leituras não bloqueiam a escrita). ':memory:' vira um banco em
+    memória compartilhado entre as conexões do pool, útil para testes. `schema(conn)` cria
+    as tabelas na primeira conexão (padrão: create_schema).
+    """
+
+    def __init__(self, path: str, size: int = 4, timeout: float = 30, schema=None, synchronous: str = "NORMAL"):
+        self.path = path
+        self.size = size
+        self.timeout = timeout
+        self._schema = schema or create_schema
+        self._synchronous = synchronous
+        self._uri = f"file:cadastro-{id(self)}?mode=memory&cache=shared" if path == ":memory:" else None
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._created = 0
+        self._in_use = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._uri:
+            conn = sqlite3.connect(self._uri, uri=True, check_same_thread=False, timeout=self.timeout)
+        else:
+            conn = sqlite3.connect(self.path, check_same_thread=False, timeout=self.timeout)
+        conn.execute(f"PRAGMA busy_timeout = {int(self.timeout * 1000)}")
+        conn.execute(f"PRAGMA synchronous = {self._synchronous}")
+        if self._created == 0:
+            # Primeira conexão: configura o arquivo e cria o esquema
+            if not self._uri:
+                conn.execute("PRAGMA journal_mode = WAL")
+            self._schema(conn)
+        self._created += 1
+        return conn
+
+    def _acquire(self) -> sqlite3.Connection:
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                conn = self._connect() if self._created < self.size else None
+            if conn is None:
+                conn = self._idle.get(timeout=self.timeout)
+        with self._lock:
+            self._in_use += 1
+        return conn
+
+    def _release(self, conn: sqlite3.Connection):
+        with self._lock:
+            self._in_use -= 1
+        self._idle.put(conn)
+
+    @contextmanager
+    def connection(self):
+        """Empresta uma conexão em uma transação (commit ao sair, rollback em caso de erro)."""
+        conn = self._acquire()
+        try:
+            with conn:
+                yield conn
+        finally:
+            self._release(conn)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"size": self.size, "open": self._created, "in_use": self._in_use}
+
+
+def _quote(column: str) -> str:
+    return '"' + column.replace('"', '""') + '"'
+
+def _adapt(value):
+    """Converte valores Python/pandas/NumPy para tipos aceitos pelo sqlite3."""
+    if hasattr(value, 'item') and not isinstance(value, (str, bytes)):
+        value = value.item()
+    if isinstance(value, float) and value != value: # NaN
+        return None
+    if isinstance(value, datetime.datetime):
+        return value.isoformat()
+    if isinstance(value, datetime.date):
+        return value.isoformat()
+    return value
+
+def _fetch_dicts(cursor) -> list:
+    columns = [c[0] for c in cursor.description]
+    return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+def _where(filters: dict):
+    clauses = []
+    condition, params = search_condition(filters.get('name'), filters.get('digits'))
+    if condition:
+        clauses.append(condition)
+    if filters.get('state'):
+        clauses.append("estado = :state")
+        params["state"] = filters['state']
+    if filters.get('start_date') and filters.get('end_date'):
+        clauses.append("data_cadastro >= :start_date AND data_cadastro <= :end_date")
+        params.update(start_date=filters['start_date'], end_date=filters['end_date'])
+    return clauses, params
+
+
+class SQLiteBackend(StorageBackend):
+    """Backend local em SQLite, sem idas e voltas pela rede.
+
+    `connect` deve retornar um context manager que entrega uma conexão (por padrão,
+    o pool deste backend); os testes podem substituí-lo por uma conexão própria.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path: str = "clientes.db", pool_size: int = 4, connect=None):
+        self.pool = ConnectionPool(path, pool_size)
+        self._connect = connect or self.pool.connection
+
+    def insert_customer(self, row: dict) -> list:
+        columns = list(row)
+        sql = (f"INSERT INTO customers ({', '.join(_quote(c) for c in columns)}) "
+               f"VALUES ({', '.join('?' for _ in columns)}) RETURNING *")
+        with self._connect() as conn:
+            return _fetch_dicts(conn.execute(sql, [_adapt(row[c]) for c in columns]))
+
+    def insert_customers(self, rows: list) -> list:
+        written = []
+        with self._connect() as conn:
+            for row in rows:
+                columns = list(row)
+                sql = (f"INSERT INTO customers ({', '.join(_quote(c) for c in columns)}) "
+                       f"VALUES ({', '.join('?' for _ in columns)}) RETURNING *")
+                written.extend(_fetch_dicts(conn.execute(sql, [_adapt(row[c]) for c in columns])))
+        return written
+
+    def find_documents(self, cpfs: list, cnpjs: list) -> list:
+        cpfs, cnpjs = list(cpfs or []), list(cnpjs or [])
+        if not cpfs and not cnpjs:
+            return []
+        clauses = []
+        if cpfs:
+            clauses.append(f"cpf IN ({', '.join('?' for _ in cpfs)})")
+        if cnpjs:
+            clauses.append(f"cnpj IN ({', '.join('?' for _ in cnpjs)})")
+        sql = f"SELECT id, cpf, cnpj FROM customers WHERE {' OR '.join(clauses)}"
+        with self._connect() as conn:
+            return _fetch_dicts(conn.execute(sql, cpfs + cnpjs))
+
+    def select_customers(self, columns, filters, page=1, page_size=10000, after_id=None, before_id=None, count=None):
+        clauses, params = _where(filters)
+        order = "id DESC"
+        offset = (page - 1) * page_size
+        if after_id is not None:
+            clauses.append("id < :after_id")
+            params["after_id"], offset = int(after_id), 0
+        elif before_id is not None:
+            clauses.append("id > :before_id")
+            params["before_id"], offset, order = int(before_id), 0, "id ASC"
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        sql = (f"SELECT {', '.join(_quote(c) for c in columns)} FROM customers{where} "
+               f"ORDER BY {order} LIMIT :limit OFFSET :offset")
+        with self._connect() as conn:
+            rows = _fetch_dicts(conn.execute(sql, {**params, "limit": page_size, "offset": offset}))
+            total = conn.execute(f"SELECT COUNT(*) FROM customers{where}", params).fetchone()[0] if count else None
+        if before_id is not None and after_id is None:
+            rows = rows[::-1]
+        return rows, total
+
+    def select_recent(self, columns, filters, limit=None):
+        clauses, params = _where(filters)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        sql = (f"SELECT {', '.join(_quote(c) for c in columns)} FROM customers{where} "
+               f"ORDER BY data_cadastro DESC, id DESC LIMIT :limit")
+        with self._connect() as conn:
+            return _fetch_dicts(conn.execute(sql, {**params, "limit": limit or -1}))
+
+    def get_customer(self, customer_id, columns):
+        sql = f"SELECT {', '.join(_quote(c) for c in columns)} FROM customers WHERE id = ?"
+        with self._connect() as conn:
+            rows = _fetch_dicts(conn.execute(sql, (int(customer_id),)))
+        return rows[0] if rows else None
+
+    def count_customers(self, filters, count='exact'):
+        # Localmente a contagem exata é barata; 'planned' e 'estimated' também são exatas
+        clauses, params = _where(filters)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._connect() as conn:
+            return conn.execute(f"SELECT COUNT(*) FROM customers{where}", params).fetchone()[0]
+
+    def delete_customer(self, customer_id):
+        with self._connect() as conn:
+            return _fetch_dicts(conn.execute("DELETE FROM customers WHERE id = ? RETURNING *", (int(customer_id),)))
+
+    def delete_customers(self, ids):
+        ids = [int(i) for i in ids]
+        sql = f"DELETE FROM customers WHERE id IN ({', '.join('?' for _ in ids)}) RETURNING *"
+        with self._connect() as conn:
+            return _fetch_dicts(conn.execute(sql, ids))
+
+    def upsert_customers(self, rows):
+        written = []
+        with self._connect() as conn:
+            for row in rows:
+                columns = list(row)
+                updates = ', '.join(f"{_quote(c)} = excluded.{_quote(c)}" for c in columns if c != 'id')
+                sql = (f"INSERT INTO customers ({', '.join(_quote(c) for c in columns)}) "
+                       f"VALUES ({', '.join('?' for _ in columns)}) "
+                       f"ON CONFLICT (id) DO UPDATE SET {updates} RETURNING *")
+                written.extend(_fetch_dicts(conn.execute(sql, [_adapt(row[c]) for c in columns])))
+        return written
+
+    def apply_changes(self, rows: list) -> list:
+        """Grava (insere ou substitui) linhas completas vindas de outro banco, como a réplica do Supabase.
+
+        Uma linha local com o mesmo CPF/CNPJ e outro 'id' está desatualizada (o documento
+        passou a outro cliente) e é removida; a versão atual dela chega na mesma sincronização.
+        Linhas com o mesmo 'updated_at' da cópia local não são regravadas. Retorna as linhas
+        gravadas (novas ou com outro 'updated_at').
+        """
+        changed = []
+        with self._connect() as conn:
+            for row in rows:
+                local = conn.execute("SELECT updated_at FROM customers WHERE id = ?", (int(row['id']),)).fetchone()
+                if local is not None and 'updated_at' in row and local[0] == _adapt(row['updated_at']):
+                    continue
+                changed.append(row)
+                documents = [row.get('cpf'), row.get('cnpj')]
+                conn.execute("DELETE FROM customers WHERE id <> ? AND (cpf = ? OR cnpj = ?)", [int(row['id'])] + documents)
+                columns = list(row)
+                updates = ', '.join(f"{_quote(c)} = excluded.{_quote(c)}" for c in columns if c != 'id')
+                conn.execute(f"INSERT INTO customers ({', '.join(_quote(c) for c in columns)}) "
+                             f"VALUES ({', '.join('?' for _ in columns)}) "
+                             f"ON CONFLICT (id) DO UPDATE SET {updates}", [_adapt(row[c]) for c in columns])
+        return changed
+
+    def get_sync_state(self, name: str):
+        with self._connect() as conn:
+            row = conn.execute("SELECT value FROM sync_state WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else None
+
+    def set_sync_state(self, name: str, value):
+        with self._connect() as conn:
+            conn.execute("INSERT INTO sync_state (name, value) VALUES (?, ?) "
+                         "ON CONFLICT (name) DO UPDATE SET value = excluded.value", (name, value))
+
+    def clear(self):
+        """Remove todos os clientes e as marcas de sincronização (para refazer a réplica)."""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM customers")
+            conn.execute("DELETE FROM sync_state")
+
+    def list_states(self):
+        # DISTINCT percorre apenas o índice de 'estado'
+        with self._connect() as conn:
+            return [row[0] for row in conn.execute("SELECT DISTINCT estado FROM customers WHERE estado <> '' ORDER BY estado")]
+
+    def dashboard_stats(self, start_date=None, end_date=None):
+        with self._connect() as conn:
+            return dashboard_stats(conn, start_date, end_date)
+
+    def dashboard_bundle(self, start_date=None, end_date=None, recent_limit=5):
+        period = {"start_date": start_date, "end_date": end_date}
+        recent_columns = ['nome_completo', 'email', 'cidade', 'data_cadastro', 'tipo_documento', 'estado']
+        with self._connect() as conn:
+            total = conn.execute("SELECT COALESCE(SUM(contagem), 0) FROM customers_daily").fetchone()[0]
+            new_in_period = total
+            if start_date and end_date:
+                new_in_period = conn.execute(
+                    "SELECT COALESCE(SUM(contagem), 0) FROM customers_daily WHERE dia >= ? AND dia <= ?",
+                    (_adapt(start_date), _adapt(end_date))).fetchone()[0]
+        return {
+            "total": total,
+            "novos_no_periodo": new_in_period,
+            "stats": self.dashboard_stats(start_date, end_date),
+            "recentes": self.select_recent(recent_columns, period, recent_limit),
+        }
+
+    def rebuild_rollup(self) -> int:
+        with self._connect() as conn:
+            return rebuild_rollup(conn)
@@ -0,0 +1,93 @@
+"""Interface dos backends de armazenamento usados pelas funções públicas de database.py.
+
+Os backends trabalham com dados brutos (listas de dicts, valores como estão no banco) e
+deixam as exceções do driver subirem; database.py formata os dados, aplica o cache e
+converte os erros em DatabaseError.
+
+`filters` é sempre um dict normalizado por database._query_filters, com as chaves:
+    name        nome sem acentos para busca (ou None)
+    digits      prefixo de dígitos de CPF/CNPJ para busca (ou None)
+    state       UF exata (ou None)
+    start_date  data inicial ISO 'AAAA-MM-DD' (ou None)
+    end_date    data final ISO 'AAAA-MM-DD' (ou None)
+"""
+
+
+class StorageBackend:
+    """Operações que um backend precisa implementar."""
+
+    name = "base"
+
+    def insert_customer(self, row: dict) -> list:
+        """Insere um cliente e retorna a(s) linha(s) gravada(s)."""
+        raise NotImplementedError
+
+    def insert_customers(self, rows: list) -> list:
+        """Insere vários clientes em uma única operação e retorna as linhas gravadas.
+
+        Se alguma linha falhar (ex.: CPF/CNPJ duplicado), nenhuma do lote é gravada.
+        """
+        raise NotImplementedError
+
+    def find_documents(self, cpfs: list, cnpjs: list) -> list:
+        """Linhas ('id', 'cpf', 'cnpj') cujo CPF ou CNPJ (formatado) está em `cpfs` ou `cnpjs`."""
+        raise NotImplementedError
+
+    def select_customers(self, columns: list, filters: dict, page: int = 1, page_size: int = 10000,
+                         after_id: int = None, before_id: int = None, count: str = None):
+        """Retorna (linhas, contagem) em ordem decrescente de 'id'.
+
+        Com cursor, a contagem cobre apenas as linhas após o cursor (mesma semântica do
+        PostgREST). `count` None dispensa a contagem (retorna None).
+        """
+        raise NotImplementedError
+
+    def select_recent(self, columns: list, filters: dict, limit: int = None) -> list:
+        """Linhas em ordem decrescente de data de cadastro (e 'id')."""
+        raise NotImplementedError
+
+    def get_customer(self, customer_id: int, columns: list):
+        """Retorna o dict do cliente ou None."""
+        raise NotImplementedError
+
+    def count_customers(self, filters: dict, count: str = 'exact') -> int:
+        raise NotImplementedError
+
+    def delete_customer(self, customer_id: int) -> list:
+        """Remove um cliente e retorna a(s) linha(s) removida(s)."""
+        raise NotImplementedError
+
+    def delete_customers(self, ids: list) -> list:
+        """Remove os clientes de `ids` em uma única operação e retorna as linhas removidas."""
+        raise NotImplementedError
+
+    def upsert_customers(self, rows: list) -> list:
+        """Atualiza (ou insere) clientes pelo 'id' e retorna as linhas gravadas."""
+        raise NotImplementedError
+
+    def select_changes(self, columns: list, since: str = None, after_id: int = 0, limit: int = 1000) -> list:
+        """Linhas gravadas depois de (`since`, `after_id`), em ordem de ('updated_at', 'id').
+
+        `since` None começa do início. Ver sql/004_updated_at_sync.sql.
+        """
+        raise NotImplementedError
+
+    def select_deletions(self, since: str = None, after_id: int = 0, limit: int = 1000) -> list:
+        """Lápides ('id', 'deleted_at') posteriores a (`since`, `after_id`), em ordem de ('deleted_at', 'id')."""
+        raise NotImplementedError
+
+    def list_states(self) -> list:
+        """UFs (não vazias) que têm ao menos um cliente, em ordem alfabética."""
+        raise NotImplementedError
+
+    def dashboard_stats(self, start_date: str = None, end_date: str = None) -> list:
+        """Linhas (dimensao, chave, contagem), lidas do resumo diário; ver sql/005_customers_daily.sql."""
+        raise NotImplementedError
+
+    def dashboard_bundle(self, start_date: str = None, end_date: str = None, recent_limit: int = 5) -> dict:
+        """Dados do Dashboard em uma chamada; ver sql/002_dashboard_bundle.sql e sql/005_customers_daily.sql."""
+        raise NotImplementedError
+
+    def rebuild_rollup(self) -> int:
+        """Refaz o resumo diário do Dashboard a partir dos clientes; retorna o número de grupos."""
+        raise NotImplementedError
@@ -0,0 +1,153 @@
+from storage import StorageBackend
+
+
+def _search_filter(name: str = None, digits: str = None) -> str:
+    if name:
+        # Coluna 'nome_busca' com índice trigram (sql/003_search_index.sql); '%' e '_' são
+        # escapados para valerem como texto no ILIKE ('\\' dentro das aspas do PostgREST)
+        pattern = name.replace('%', r'\\%').replace('_', r'\\_')
+        return f'nome_busca.ilike."*{pattern}*"'
+    if digits:
+        # Colunas só com dígitos, com índice B-tree para prefixo
+        return f"cpf_digits.like.{digits}*,cnpj_digits.like.{digits}*"
+    return None
+
+def _apply_filters(query, filters: dict):
+    search_filter = _search_filter(filters.get('name'), filters.get('digits'))
+    if search_filter:
+        query = query.or_(search_filter)
+
+    if filters.get('state'):
+        query = query.eq("estado", filters['state'])
+
+    if filters.get('start_date') and filters.get('end_date'):
+        query = query.gte("data_cadastro", filters['start_date']).lte("data_cadastro", filters['end_date'])
+
+    return query
+
+def _in_list(values) -> str:
+    """Lista para o operador 'in' do PostgREST, com os valores entre aspas."""
+    return ",".join('"' + str(v).replace('"', '') + '"' for v in values)
+
+def _after_cursor(query, column: str, since: str = None, after_id: int = 0):
+    """Cursor sobre (column, id): linhas com `column` maior que `since`, ou igual e 'id' maior."""
+    if not since:
+        return query
+    return query.or_(f'{column}.gt."{since}",and({column}.eq."{since}",id.gt.{int(after_id)})')
+
+def _apply_pagination(query, page: int = 1, page_size: int = 10000, after_id: int = None, before_id: int = None):
+    """Aplica a paginação na consulta, sempre em ordem decrescente de 'id'.
+
+    Com `after_id` (próxima página) ou `before_id` (página anterior) a consulta usa
+    o cursor sobre 'id' (keyset), cujo custo não depende da profundidade da página.
+    Sem cursor, usa offset para permitir o salto direto para um número de página.
+    """
+    if after_id is not None:
+        return query.lt("id", int(after_id)).order("id", desc=True).limit(page_size)
+    if before_id is not None:
+        # Busca em ordem crescente a partir do cursor; o resultado é invertido depois.
+        return query.gt("id", int(before_id)).order("id").limit(page_size)
+    offset = (page - 1) * page_size
+    return query.range(offset, offset + page_size - 1).order("id", desc=True)
+
+
+class SupabaseBackend(StorageBackend):
+    """Backend Supabase (PostgREST). `get_client` é chamado a cada operação.
+
+    `get_admin_client` (chave service_role) é usado apenas em operações de manutenção.
+    """
+
+    name = "supabase"
+
+    def __init__(self, get_client, get_admin_client=None):
+        self._get_client = get_client
+        self._get_admin_client = get_admin_client
+
+    def _table(self):
+        return self._get_client().table("customers")
+
+    def insert_customer(self, row: dict) -> list:
+        return self._table().insert(row).execute().data
+
+    def insert_customers(self, rows: list) -> list:
+        # Uma única requisição; o PostgREST grava o lote em uma transação
+        return self._table().insert(rows).execute().data
+
+    def find_documents(self, cpfs: list, cnpjs: list) -> list:
+        query = self._table().select("id,cpf,cnpj")
+        if cpfs and cnpjs:
+            query = query.or_(f"cpf.in.({_in_list(cpfs)}),cnpj.in.({_in_list(cnpjs)})")
+        elif cpfs:
+            query = query.in_("cpf", list(cpfs))
+        elif cnpjs:
+            query = query.in_("cnpj", list(cnpjs))
+        else:
+            return []
+        return query.execute().data
+
+    def select_customers(self, columns, filters, page=1, page_size=10000, after_id=None, before_id=None, count=None):
+        query = self._table().select(",".join(columns), count=count)
+        query = _apply_filters(query, filters)
+        query = _apply_pagination(query, page, page_size, after_id, before_id)
+        response = query.execute()
+        rows = response.data
+        if after_id is None and before_id is not None:
+            rows = rows[::-1]
+        return rows, response.count
+
+    def select_recent(self, columns, filters, limit=None):
+        query = _apply_filters(self._table().select(",".join(columns)), filters)
+        query = query.order("data_cadastro", desc=True).order("id", desc=True)
+        if limit:
+            query = query.limit(limit)
+        return query.execute().data
+
+    def get_customer(self, customer_id, columns):
+        response = self._table().select(",".join(columns)).eq("id", customer_id).execute()
+        return response.data[0] if response.data else None
+
+    def count_customers(self, filters, count='exact'):
+        response = _apply_filters(self._table().select("id", count=count), filters).execute()
+        return response.count if response.count is not None else 0
+
+    def delete_customer(self, customer_id):
+        return self._table().delete().eq("id", customer_id).execute().data
+
+    def delete_customers(self, ids):
+        return self._table().delete().in_("id", [int(i) for i in ids]).execute().data
+
+    def upsert_customers(self, rows):
+        return self._table().upsert(rows).execute().data
+
+    def select_changes(self, columns, since=None, after_id=0, limit=1000):
+        query = _after_cursor(self._table().select(",".join(columns)), "updated_at", since, after_id)
+        return query.order("updated_at").order("id").limit(limit).execute().data
+
+    def select_deletions(self, since=None, after_id=0, limit=1000):
+        query = self._get_client().table("customers_deleted").select("id,deleted_at")
+        query = _after_cursor(query, "deleted_at", since, after_id)
+        return query.order("deleted_at").order("id").limit(limit).execute().data
+
+    def _read_rpc(self, name: str, params: dict):
+        # Funções STABLE vão por GET: leituras são repetidas pelo cliente HTTP em caso de falha
+        # (http_pool.RETRY_METHODS). Parâmetros None são omitidos e assumem o padrão da função,
+        # pois na query string virariam texto vazio
+        params = {k: v for k, v in params.items() if v is not None}
+        return self._get_client().rpc(name, params, get=True).execute().data
+
+    def list_states(self):
+        rows = self._read_rpc("list_states", {})
+        return [row['estado'] for row in rows or []]
+
+    def dashboard_stats(self, start_date=None, end_date=None):
+        return self._read_rpc("dashboard_stats", {"start_date": start_date, "end_date": end_date})
+
+    def dashboard_bundle(self, start_date=None, end_date=None, recent_limit=5):
+        params = {"start_date": start_date, "end_date": end_date, "recent_limit": recent_limit}
+        return self._read_rpc("dashboard_bundle", params)
+
+    def rebuild_rollup(self):
+        # Restrita ao service_role (sql/005_customers_daily.sql): trava as gravações em customers
+        if self._get_admin_client is None:
+            raise RuntimeError("a reconstrução do resumo requer o cliente com a chave service_role.")
+        return self._get_admin_client().rpc("rebuild_customers_daily", {}).execute().data
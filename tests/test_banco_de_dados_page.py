@@ -0,0 +1,30 @@
+from unittest.mock import patch
+from streamlit.delta_generator_singletons import get_dg_singleton_instance
+from streamlit.testing.v1 import AppTest
+import database
+
+PAGE = "pages/2_📊_Banco_de_Dados.py"
+
+def test_opening_customer_from_grid_page_makes_no_request(tmp_path, monkeypatch):
+    # test_calculadora executa a página da calculadora fora do Streamlit, e o st.form dela fica
+    # preso ao container principal, que é compartilhado com o AppTest
+    monkeypatch.setattr(get_dg_singleton_instance().main_dg, "_form_data", None)
+    database.set_backend(database.create_backend("sqlite", path=str(tmp_path / "clientes.db")))
+    database.get_backend().insert_customers([
+        {'nome_completo': f'Cliente {i}', 'tipo_documento': 'CPF', 'cpf': f'{i:011d}', 'estado': 'SP',
+         'telefone1': '41999998888', 'observacao': f'Obs {i}'}
+        for i in range(1, 16)])
+    try:
+        at = AppTest.from_file(PAGE, default_timeout=30)
+        at.run() # a grade carrega a página 1 (por page_loader)
+        assert not at.exception
+
+        at.session_state.selected_customer_id = 15
+        with patch('database.get_customer_by_id', side_effect=AssertionError("requisição ao banco")) as fetch_by_id:
+            at.run()
+        assert not at.exception
+        fetch_by_id.assert_not_called()
+        assert at.subheader[0].value == "Detalhes de: Cliente 15"
+        assert "Obs 15" in [c.value for c in at.code]
+    finally:
+        database.set_backend(None)
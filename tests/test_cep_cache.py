@@ -0,0 +1,48 @@
+import pytest
+from unittest.mock import MagicMock, patch
+import cep_cache
+import services
+
+ADDRESS = {"cep": "01001-000", "logradouro": "Praça da Sé", "bairro": "Sé", "localidade": "São Paulo", "uf": "SP"}
+
+@pytest.fixture
+def cache(tmp_path):
+    return cep_cache.CepCache(str(tmp_path / "cep.db"))
+
+def test_cache_persists_and_caches_missing_ceps(cache, tmp_path):
+    assert cache.get("01001000") == (False, None)
+    cache.set("01001000", ADDRESS)
+    cache.set("99999999", None)
+    assert cache.get("01001000") == (True, ADDRESS)
+    assert cache.get("99999999") == (True, None)
+
+    # Um novo processo lê do arquivo
+    reopened = cep_cache.CepCache(str(tmp_path / "cep.db"))
+    assert reopened.get("01001000") == (True, ADDRESS)
+    assert reopened.get("99999999") == (True, None)
+    assert reopened.stats() == {"hits": 1, "negative_hits": 1, "misses": 0, "memory_size": 2}
+
+def test_cache_expires_entries(tmp_path):
+    cache = cep_cache.CepCache(str(tmp_path / "cep.db"), ttl=60, negative_ttl=10)
+    with patch("cep_cache.time.time", return_value=1000.0):
+        cache.set("01001000", ADDRESS)
+        cache.set("99999999", None)
+    with patch("cep_cache.time.time", return_value=1030.0):
+        assert cache.get("01001000") == (True, ADDRESS)
+        assert cache.get("99999999") == (False, None)
+        assert cache.purge() == 1
+    with patch("cep_cache.time.time", return_value=1060.0):
+        assert cache.get("01001000") == (False, None)
+
+def test_lookup_cep_queries_viacep_once(cache, monkeypatch):
+    session = MagicMock()
+    responses = {"01001000": ADDRESS, "99999999": {"erro": True}}
+    session.get.side_effect = lambda url, timeout: MagicMock(json=MagicMock(return_value=responses[url.split('/')[-3]]))
+    monkeypatch.setattr(services, "_session", session)
+    monkeypatch.setattr(services, "_cep_cache", cache)
+
+    for _ in range(3):
+        assert services.lookup_cep("01001000") == ADDRESS
+        assert services.lookup_cep("99999999") is None
+    assert session.get.call_count == 2
+    assert cache.stats()["misses"] == 2
@@ -1,44 +1,28 @@
 import pytest
 import sqlite3
+import datetime
 import pandas as pd
-from unittest.mock import patch
+from unittest.mock import patch, MagicMock
 import database
 import validators
+import sqlite_backend
+import supabase_backend
+
+@pytest.fixture(autouse=True)
+def supabase_backend_in_use():
+    """Por padrão os testes usam o backend Supabase, com o cliente substituído por mocks."""
+    database.set_backend(database.create_backend("supabase"))
+    yield
+    database.set_backend(None)
 
 @pytest.fixture
 def db_connection():
     """Fixture para criar um banco de dados em memória para os testes."""
     conn = sqlite3.connect(":memory:")
-    # Usando o esquema de tabela mais recente do database.py
-    conn.execute('''
-        CREATE TABLE customers (
-            id INTEGER PRIMARY KEY,
-            nome_completo TEXT NOT NULL,
-            tipo_documento TEXT NOT NULL,
-            cpf TEXT UNIQUE,
-            cnpj TEXT UNIQUE,
-            contato1 TEXT,
-            telefone1 TEXT,
-            contato2 TEXT,
-            telefone2 TEXT,
-            cargo TEXT,
-            email TEXT,
-            data_nascimento DATE,
-            cep TEXT,
-            endereco TEXT,
-            numero TEXT,
-            complemento TEXT,
-            bairro TEXT,
-            cidade TEXT,
-            estado TEXT,
-            observacao TEXT,
-            data_cadastro DATE DEFAULT (date('now')),
-            CHECK (
-                (tipo_documento = 'CPF' AND cpf IS NOT NULL) OR 
-                (tipo_documento = 'CNPJ' AND cnpj IS NOT NULL)
-            )
-        )
-    ''')
+    # Usando o esquema de tabela mais recente do backend SQLite
+    sqlite_backend.create_schema(conn)
+    # As funções de database.py passam a usar o backend SQLite (conexão via get_db_connection)
+    database.set_backend(database.create_backend("sqlite", path=":memory:"))
     yield conn
     conn.close()
 
@@ -119,4 +103,389 @@ def test_commit_changes_delete(mock_get_db_connection, db_connection):
     database.commit_changes(edited_df, original_df)
     
     df = pd.read_sql_query("SELECT * FROM customers", db_connection)
-    assert len(df) == 0
\ No newline at end of file
+    assert len(df) == 0
+
+def test_apply_pagination_keyset():
+    query = MagicMock()
+    supabase_backend._apply_pagination(query, page=5000, page_size=25, after_id=120)
+    query.lt.assert_called_once_with("id", 120)
+    query.lt.return_value.order.assert_called_once_with("id", desc=True)
+    query.lt.return_value.order.return_value.limit.assert_called_once_with(25)
+    query.range.assert_not_called()
+
+    query = MagicMock()
+    supabase_backend._apply_pagination(query, page_size=25, before_id=120)
+    query.gt.assert_called_once_with("id", 120)
+    query.gt.return_value.order.assert_called_once_with("id")
+
+def test_apply_pagination_offset():
+    query = MagicMock()
+    supabase_backend._apply_pagination(query, page=3, page_size=25)
+    query.range.assert_called_once_with(50, 74)
+
+def test_dashboard_stats_sqlite_stand_in():
+    conn = sqlite3.connect(":memory:")
+    sqlite_backend.create_schema(conn)
+    conn.executemany(
+        "INSERT INTO customers (nome_completo, tipo_documento, cpf, cnpj, cidade, estado, data_cadastro) VALUES (?, ?, ?, ?, ?, ?, ?)",
+        [
+            ('A', 'CPF', '1', None, 'Curitiba', 'PR', '2024-01-10'),
+            ('B', 'CPF', '2', None, 'Curitiba', 'PR', '2024-01-20'),
+            ('C', 'CNPJ', None, '3', 'Santos', 'SP', '2024-02-05'),
+            ('D', 'CPF', '4', None, '', '', '2023-12-31'),
+        ],
+    )
+    rows = sqlite_backend.dashboard_stats(conn, datetime.date(2024, 1, 1), datetime.date(2024, 12, 31))
+    stats = database._stats_from_rows(rows)
+
+    assert stats['estado'].to_dict() == {'PR': 2, 'SP': 1}
+    assert stats['cidade'].index[0] == 'Curitiba'
+    assert stats['tipo_documento'].to_dict() == {'CPF': 2, 'CNPJ': 1}
+    assert stats['mes'].sort_index().to_dict() == {'2024-01': 2, '2024-02': 1}
+    assert database._stats_from_rows(sqlite_backend.dashboard_stats(conn))['estado'].sum() == 3
+    conn.close()
+
+@patch('database.get_supabase_client')
+def test_fetch_dashboard_bundle_single_rpc(mock_client):
+    mock_client.return_value.rpc.return_value.execute.return_value.data = {
+        "total": 10,
+        "novos_no_periodo": 2,
+        "stats": [{"dimensao": "estado", "chave": "PR", "contagem": 2}],
+        "recentes": [{"nome_completo": "A", "email": None, "cidade": "Curitiba",
+                      "data_cadastro": "2024-01-10", "tipo_documento": "CPF", "estado": "PR"}],
+    }
+    bundle = database.fetch_dashboard_bundle(datetime.date(2024, 1, 1), datetime.date(2024, 12, 31))
+
+    # Leitura por GET (repetida pelo cliente HTTP em caso de falha)
+    mock_client.return_value.rpc.assert_called_once_with(
+        "dashboard_bundle", {"start_date": "2024-01-01", "end_date": "2024-12-31", "recent_limit": 5}, get=True)
+    assert bundle["total"] == 10
+    assert bundle["novos_no_periodo"] == 2
+    assert bundle["stats"]["estado"].to_dict() == {'PR': 2}
+    assert bundle["recentes"].iloc[0]['data_cadastro'] == datetime.date(2024, 1, 10)
+
+@patch('database.get_dashboard_stats', return_value={})
+@patch('database.get_new_customers_in_period_count', return_value=2)
+@patch('database.get_total_customers_count', return_value=10)
+@patch('database.fetch_dashboard_data', return_value=pd.DataFrame())
+@patch('database.get_supabase_client')
+def test_fetch_dashboard_bundle_concurrent_fallback(mock_client, *_):
+    mock_client.return_value.rpc.side_effect = Exception("function dashboard_bundle does not exist")
+    bundle = database.fetch_dashboard_bundle()
+    assert bundle["total"] == 10
+    assert bundle["novos_no_periodo"] == 2
+
+def test_dashboard_bundle_total_refreshed_by_write_outside_period(tmp_path):
+    database.set_backend(database.create_backend("sqlite", path=str(tmp_path / "clientes.db")))
+    database.insert_customers([{'nome_completo': 'A', 'tipo_documento': 'CPF', 'cpf': '11111111111', 'data_cadastro': '2024-03-01'}])
+    period = (datetime.date(2024, 1, 1), datetime.date(2024, 12, 31))
+    assert database.fetch_dashboard_bundle(*period)["total"] == 1
+
+    # Cliente cadastrado fora do período: não muda os dados do período, mas muda o total
+    database.insert_customers([{'nome_completo': 'B', 'tipo_documento': 'CPF', 'cpf': '22222222222', 'data_cadastro': '2023-06-01'}])
+    bundle = database.fetch_dashboard_bundle(*period)
+    assert (bundle["total"], bundle["novos_no_periodo"]) == (2, 1)
+
+def test_select_columns_projection():
+    assert database._select_columns() == database.ALL_COLUMNS_WITH_ID
+    assert database._select_columns(['nome_completo', 'link_wpp_1', 'telefone1']) == ['id', 'nome_completo', 'telefone1']
+
+def test_format_customer_df_skips_missing_columns():
+    df = pd.DataFrame({'id': [1], 'cpf': ['12345678901']})
+    df = database._format_customer_df(df)
+    assert list(df.columns) == ['id', 'cpf']
+    assert df.iloc[0]['cpf'] == '123.456.789-01'
+
+@patch('database.get_supabase_client')
+def test_fetch_page_single_request_with_count(mock_client):
+    table = mock_client.return_value.table.return_value
+    table.select.return_value.range.return_value.order.return_value.execute.return_value = MagicMock(
+        data=[{'id': 3, 'nome_completo': 'A'}], count=42)
+    df, total = database.fetch_page(page=2, page_size=1, columns=['nome_completo'], count='planned')
+
+    table.select.assert_called_once_with("id,nome_completo", count='planned')
+    assert total == 42
+    assert df.iloc[0]['id'] == 3
+
+@patch('database.get_supabase_client')
+def test_fetch_page_keyset_total(mock_client):
+    table = mock_client.return_value.table.return_value
+    table.select.return_value.lt.return_value.order.return_value.limit.return_value.execute.return_value = MagicMock(
+        data=[{'id': 5}], count=15)
+    _, total = database.fetch_page(page=3, page_size=10, after_id=20)
+    assert total == 35
+
+def test_fetch_page_invalid_count_method():
+    with pytest.raises(ValueError):
+        database.fetch_page(count='approximate')
+
+def test_query_cache_ttl_and_lru():
+    cache = database.QueryCache(maxsize=2, ttl=60)
+    cache.set('a', 1, {})
+    cache.set('b', 2, {})
+    assert cache.get('a') == (True, 1)
+    cache.set('c', 3, {}) # 'b' é o menos usado recentemente
+    assert cache.get('b') == (False, None)
+    assert cache.stats()['evictions'] == 1
+
+    cache.ttl = -1
+    cache.set('d', 4, {})
+    assert cache.get('d') == (False, None)
+    assert cache.stats()['hits'] == 1
+
+def test_query_cache_invalidates_only_affected_entries():
+    cache = database.QueryCache()
+    cache.set('pr', 'x', {'state_filter': 'PR'})
+    cache.set('sp', 'x', {'state_filter': 'SP'})
+    cache.set('maria', 'x', {'search_query': 'maria'})
+    cache.set('todos', 'x', {'state_filter': None})
+    cache.set('cliente_7', 'x', {'customer_id': 7})
+
+    removed = cache.invalidate([{'id': 9, 'nome_completo': 'João', 'estado': 'PR', 'cpf': '111.111.111-11'}])
+
+    assert removed == 2
+    assert cache.get('pr')[0] is False and cache.get('todos')[0] is False
+    assert cache.get('sp')[0] and cache.get('maria')[0] and cache.get('cliente_7')[0]
+
+@patch('database.get_supabase_client')
+def test_cached_query_hits_and_write_invalidation(mock_client):
+    table = mock_client.return_value.table.return_value
+    table.select.return_value.execute.return_value = MagicMock(count=5)
+    assert database.get_total_customers_count() == 5
+    assert database.get_total_customers_count() == 5
+    assert table.select.return_value.execute.call_count == 1
+    assert database.get_cache_stats()['hits'] == 1
+
+    table.delete.return_value.eq.return_value.execute.return_value = MagicMock(data=[{'id': 1, 'estado': 'PR'}])
+    database.delete_customer_by_id(1)
+    database.get_total_customers_count()
+    assert table.select.return_value.execute.call_count == 2
+
+def test_search_filter_uses_indexed_columns():
+    assert supabase_backend._search_filter(*database._search_terms('João  da Silva')) == 'nome_busca.ilike."*joao da silva*"'
+    assert supabase_backend._search_filter(*database._search_terms('123.456')) == "cpf_digits.like.123456*,cnpj_digits.like.123456*"
+    # '%' e '_' são texto, não curingas do ILIKE
+    assert supabase_backend._search_filter(*database._search_terms('100% _A')) == r'nome_busca.ilike."*100\\% \\_a*"'
+
+def test_search_sqlite_fts_stand_in():
+    conn = sqlite3.connect(":memory:")
+    sqlite_backend.create_schema(conn)
+    conn.executemany(
+        "INSERT INTO customers (nome_completo, tipo_documento, cpf, cnpj) VALUES (?, ?, ?, ?)",
+        [
+            ('João da Silva', 'CPF', '123.456.789-01', None),
+            ('Maria Conceição', 'CPF', '987.654.321-00', None),
+            ('Padaria Joãozinho Ltda', 'CNPJ', None, '12.345.678/0001-95'),
+        ],
+    )
+    def search(term):
+        name, digits = database._search_terms(term)
+        return [row['nome_completo'] for row in sqlite_backend.search_customers(conn, name, digits)]
+
+    assert search('joao') == ['Padaria Joãozinho Ltda', 'João da Silva']
+    assert search('CONCEICAO') == ['Maria Conceição']
+    assert search('12345678901') == ['João da Silva']
+    assert search('12.345') == ['Padaria Joãozinho Ltda', 'João da Silva']
+    conn.execute("UPDATE customers SET nome_completo = 'Maria Souza' WHERE cpf = '987.654.321-00'")
+    assert search('conceicao') == []
+    conn.close()
+
+def test_run_queries_collects_results_and_wraps_errors():
+    def boom():
+        raise RuntimeError("falhou")
+
+    results = database.run_queries({'a': lambda: 1, 'b': boom}, return_exceptions=True)
+    assert results['a'] == 1
+    assert isinstance(results['b'], database.DatabaseError)
+
+    with pytest.raises(database.DatabaseError, match="falhou"):
+        database.run_queries({'a': lambda: 1, 'b': boom})
+
+def test_run_queries_nested_runs_inline():
+    # Consultas disparadas de dentro do pool não podem esperar por vagas que elas mesmas ocupam
+    inner = lambda: database.run_queries({str(i): (lambda i=i: i) for i in range(3)})
+    results = database.run_queries({str(i): inner for i in range(database.QUERY_WORKERS * 2)})
+    assert all(r == {'0': 0, '1': 1, '2': 2} for r in results.values())
+
+@patch('validators.is_valid_cpf', return_value=True)
+def test_get_updates_sends_only_changed_columns(_):
+    original_df = pd.DataFrame({
+        'id': [1, 2, 3],
+        'nome_completo': ['Ana', 'Bruno', 'Carla'],
+        'tipo_documento': ['CPF'] * 3,
+        'cpf': ['111.111.111-11', '222.222.222-22', '333.333.333-33'],
+        'cidade': ['Curitiba', None, ''],
+        'data_nascimento': [datetime.date(1990, 1, 2), None, None],
+    })
+    edited_df = original_df.copy()
+    edited_df['data_nascimento'] = ['1990-01-02', '', None] # mesma data em outro formato, vazios equivalentes
+    edited_df.loc[1, 'cidade'] = 'Londrina'
+    edited_df.loc[2, 'cidade'] = None # '' -> None não é alteração
+
+    updates = database._get_updates(edited_df, original_df)
+
+    assert updates == [{'id': 2, 'nome_completo': 'Bruno', 'tipo_documento': 'CPF', 'cpf': '222.222.222-22',
+                        'cnpj': None, 'cidade': 'Londrina'}]
+
+@patch('validators.is_valid_cpf', return_value=True)
+def test_commit_changes_groups_upserts_by_columns(_):
+    backend = MagicMock()
+    database.set_backend(backend)
+    original_df = pd.DataFrame({'id': [1, 2, 3], 'nome_completo': ['A', 'B', 'C'], 'tipo_documento': ['CPF'] * 3,
+                                'cpf': ['1', '2', '3'], 'cidade': ['X', 'Y', 'Z'], 'estado': ['PR', 'PR', 'PR']})
+    edited_df = original_df.copy()
+    edited_df['cidade'] = ['X2', 'Y2', 'Z']
+    edited_df.loc[2, 'estado'] = 'SP'
+
+    assert database.commit_changes(edited_df, original_df) == {"updated": 3, "deleted": 0}
+    groups = [c.args[0] for c in backend.upsert_customers.call_args_list]
+    assert [[u['id'] for u in g] for g in groups] == [[1, 2], [3]]
+    assert 'estado' not in groups[0][0] and groups[1][0]['estado'] == 'SP'
+
+def test_delete_customers_chunks_and_reports_failures():
+    backend = MagicMock()
+    def delete(ids):
+        if 3 in ids:
+            raise RuntimeError("timeout")
+        return [{'id': i} for i in ids]
+    backend.delete_customers.side_effect = delete
+    database.set_backend(backend)
+
+    result = database.delete_customers([1, 2, 3, 4, 5, 5], chunk_size=2)
+
+    assert [c.args[0] for c in backend.delete_customers.call_args_list] == [[1, 2], [3, 4], [5]]
+    assert result == {"deleted": [1, 2, 5], "failed": [{"ids": [3, 4], "error": "timeout"}]}
+
+@patch('database.get_supabase_client')
+def test_delete_customers_uses_in_filter(mock_client):
+    table = mock_client.return_value.table.return_value
+    table.delete.return_value.in_.return_value.execute.return_value = MagicMock(data=[{'id': 1}, {'id': 2}])
+    assert database.delete_customers([1, 2])["deleted"] == [1, 2]
+    table.delete.return_value.in_.assert_called_once_with("id", [1, 2])
+
+@patch('validators.is_valid_cpf', return_value=True)
+def test_insert_customer_write_behind_queues(_, tmp_path, monkeypatch):
+    import outbox
+    queue = outbox.Outbox(str(tmp_path / "outbox.db"))
+    monkeypatch.setattr(database, '_outbox', queue)
+    monkeypatch.setattr(database, '_flusher', MagicMock())
+    backend = MagicMock()
+    database.set_backend(backend)
+
+    customer = {'nome_completo': 'Fila', 'tipo_documento': 'CPF', 'cpf': '123.456.789-00', 'data_nascimento': datetime.date(1990, 1, 1)}
+    database.insert_customer(customer)
+
+    backend.insert_customer.assert_not_called()
+    database._flusher.wake.assert_called_once()
+    assert queue.due()[0][1]['data_nascimento'] == '1990-01-01'
+    with pytest.raises(database.DuplicateEntryError):
+        database.insert_customer(customer)
+
+def _wait_document_index():
+    database.get_document_index()
+    database._document_index_loader.join(5)
+    return database.get_document_index()
+
+def test_document_exists_uses_index_and_tracks_writes():
+    backend = MagicMock()
+    backend.select_customers.side_effect = [([{'id': 1, 'cpf': '111.444.777-35', 'cnpj': None}], None), ([], None)]
+    backend.find_documents.side_effect = lambda cpfs, cnpjs: [{'cpf': c} for c in cpfs if c == '111.444.777-35']
+    database.set_backend(backend)
+    assert _wait_document_index() is not None
+
+    assert database.document_exists('11144477735')
+    assert not database.document_exists('222.333.444-05')
+    backend.find_documents.assert_called_once() # resposta negativa sai só do índice
+
+    backend.insert_customers.return_value = [{'id': 2, 'cpf': '222.333.444-05'}]
+    database.insert_customers([{'nome_completo': 'Novo', 'tipo_documento': 'CPF', 'cpf': '222.333.444-05'}])
+    assert '22233344405' in database.get_document_index()
+    backend.delete_customers.return_value = [{'id': 1, 'cpf': '111.444.777-35'}]
+    database.delete_customers([1])
+    assert not database.document_exists('111.444.777-35')
+    assert backend.select_customers.call_count == 2
+
+def test_document_index_loads_short_pages_in_background():
+    # O servidor devolve no máximo 2 linhas por página, menos que DOCUMENT_INDEX_PAGE_SIZE
+    rows = [{'id': i, 'cpf': f'{i:011d}', 'cnpj': None} for i in range(5, 0, -1)]
+    backend = MagicMock()
+    backend.select_customers.side_effect = lambda columns, filters, page, size, after_id: (
+        [r for r in rows if after_id is None or r['id'] < after_id][:2], None)
+    backend.find_documents.return_value = []
+    database.set_backend(backend)
+
+    # Antes da carga terminar, a verificação vai ao banco
+    with patch('database._reload_document_index'):
+        assert not database.document_exists('00000000003')
+    backend.find_documents.assert_called_once()
+
+    index = _wait_document_index()
+    assert len(index) == 5 and all(f'{i:011d}' in index for i in range(1, 6))
+    assert backend.select_customers.call_count == 4 # 3 páginas e a página vazia
+
+@patch('database.get_supabase_client')
+def test_cached_query_records_metrics(mock_client):
+    database.reset_query_metrics()
+    table = mock_client.return_value.table.return_value
+    table.select.return_value.order.return_value.range.return_value.execute.return_value = MagicMock(data=[{'id': 1, 'nome_completo': 'A'}])
+    database.fetch_data(state_filter="PR")
+    database.fetch_data(state_filter="PR")
+
+    row = database.get_query_metrics().iloc[0]
+    assert (row['funcao'], row['filtros'], row['chamadas'], row['acertos_cache']) == ("fetch_data", "state_filter", 2, 1)
+
+def test_list_states_cached_and_extended_by_writes():
+    backend = MagicMock()
+    backend.list_states.return_value = ['PR', 'SP']
+    database.set_backend(backend)
+
+    assert database.list_states() == ['PR', 'SP']
+    database.invalidate_cache([{'id': 1, 'estado': 'AC'}, {'id': 2, 'estado': 'SP'}, {'id': 3}])
+    assert database.list_states() == ['AC', 'PR', 'SP']
+    backend.list_states.assert_called_once()
+
+    database.clear_cache()
+    assert database.list_states() == ['PR', 'SP']
+    assert backend.list_states.call_count == 2
+
+def test_customer_details_served_from_fetched_page():
+    backend = MagicMock()
+    row = {col: None for col in database.ALL_COLUMNS_WITH_ID}
+    row.update(id=7, nome_completo='Cliente', tipo_documento='CPF', cpf='11111111111', telefone1='11999998888')
+    backend.select_customers.return_value = ([row], 1)
+    backend.get_customer.return_value = {**row, 'nome_completo': 'Cliente Alterado'}
+    database.set_backend(backend)
+    before = database.get_row_cache_stats()
+
+    database.fetch_page(page_size=10)
+    customer = database.get_customer_details(7)
+    assert customer['cpf'] == '111.111.111-11'
+    backend.get_customer.assert_not_called()
+
+    # Após uma escrita no cliente, ou para um cliente que não veio na página, busca no banco
+    database.invalidate_cache([{'id': 7}])
+    assert database.get_customer_details(7)['nome_completo'] == 'Cliente Alterado'
+    database.get_customer_details(8)
+    assert backend.get_customer.call_count == 2
+
+    # Páginas projetadas atendem os detalhes com as mesmas colunas; para as demais, busca no banco
+    database.clear_cache()
+    backend.select_customers.return_value = ([{'id': 7, 'nome_completo': 'Cliente'}], 1)
+    database.fetch_page(page_size=10, columns=['nome_completo'])
+    assert database.get_customer_details(7, ['nome_completo']) == {'id': 7, 'nome_completo': 'Cliente'}
+    database.get_customer_details(7)
+    assert backend.get_customer.call_count == 3
+    stats = database.get_row_cache_stats()
+    assert (stats["hits"] - before["hits"], stats["misses"] - before["misses"], stats["size"]) == (2, 3, 1)
+
+def test_rollup_rebuild_requires_service_key_client():
+    client, admin = MagicMock(), MagicMock()
+    admin.rpc.return_value.execute.return_value.data = 12
+    database.set_backend(supabase_backend.SupabaseBackend(lambda: client, lambda: admin))
+    assert database.rebuild_dashboard_rollup() == 12
+    admin.rpc.assert_called_once_with("rebuild_customers_daily", {})
+    client.rpc.assert_not_called()
+
+    database.set_backend(database.create_backend("supabase"))
+    with patch('database._get_setting', return_value=None), pytest.raises(database.DatabaseError, match="SUPABASE_SERVICE_KEY"):
+        database.rebuild_dashboard_rollup()
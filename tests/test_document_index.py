@@ -0,0 +1,25 @@
+from document_index import DocumentIndex, document_key, COMPACT_THRESHOLD
+
+def test_document_key_separates_cpf_and_cnpj():
+    assert document_key("123.456.789-01") == 12345678901
+    assert document_key("00.012.345/6789-01") != document_key("123.456.789-01")
+    assert document_key("123") is None
+    assert document_key(None) is None
+
+def test_index_lookup_add_and_remove():
+    index = DocumentIndex(["111.444.777-35", "11.222.333/0001-81"])
+    assert "11144477735" in index
+    assert "11.222.333/0001-81" in index
+    assert "222.333.444-05" not in index
+
+    index.add(["222.333.444-05"])
+    index.remove(["111.444.777-35"])
+    assert "222.333.444-05" in index
+    assert "111.444.777-35" not in index
+    assert len(index) == 2
+
+def test_index_compacts_pending_changes():
+    index = DocumentIndex()
+    index.add([f"{i:011d}" for i in range(COMPACT_THRESHOLD + 1)])
+    assert not index._added and len(index._keys) == COMPACT_THRESHOLD + 1
+    assert "00000000005" in index
@@ -0,0 +1,54 @@
+import datetime
+import gzip
+import io
+import pandas as pd
+import pyarrow.parquet as pq
+from unittest.mock import patch
+import exporter
+
+def _chunks():
+    yield pd.DataFrame({'id': [3, 2], 'nome_completo': ['Ana', None], 'data_cadastro': [datetime.date(2024, 1, 2), None]})
+    yield pd.DataFrame({'id': [1], 'nome_completo': ['Bruno'], 'data_cadastro': [datetime.date(2023, 5, 6)]})
+
+def test_stream_csv_writes_header_once():
+    data = b"".join(exporter.stream_csv(_chunks()))
+    lines = data.decode('utf-8').splitlines()
+    assert lines[0] == 'id,nome_completo,data_cadastro'
+    assert len(lines) == 4
+
+def test_stream_csv_gzip_roundtrip():
+    compressed = b"".join(exporter.stream_csv(_chunks(), compress=True))
+    assert gzip.decompress(compressed) == b"".join(exporter.stream_csv(_chunks()))
+
+def test_stream_parquet_roundtrip():
+    chunks = list(exporter.stream_parquet(_chunks()))
+    assert len(chunks) == 3 # um por bloco, mais o rodapé
+    parquet_file = pq.ParquetFile(io.BytesIO(b"".join(chunks)))
+    assert parquet_file.num_row_groups == 2
+    table = parquet_file.read()
+    assert table.num_rows == 3
+    assert table.column('nome_completo').to_pylist() == ['Ana', None, 'Bruno']
+
+def test_empty_export_keeps_columns():
+    columns = ['id', 'nome_completo', 'data_cadastro']
+    table = pq.read_table(io.BytesIO(b"".join(exporter.stream_parquet(iter([]), columns))))
+    assert table.num_rows == 0
+    assert table.schema.names == columns
+    assert str(table.schema.field('data_cadastro').type) == 'date32[day]'
+    compressed = b"".join(exporter.stream_csv(iter([]), compress=True, empty_columns=columns))
+    assert gzip.decompress(compressed) == b'id,nome_completo,data_cadastro\n'
+
+def test_spool_moves_large_exports_to_disk():
+    with exporter.spool(exporter.stream_csv(_chunks()), max_size=16) as file:
+        assert file._rolled # passou do limite em memória
+        assert file.read() == b"".join(exporter.stream_csv(_chunks()))
+
+@patch('database._query_customers')
+def test_iter_customer_chunks_uses_keyset(mock_query):
+    mock_query.side_effect = [
+        (pd.DataFrame({'id': [5, 4]}), None),
+        (pd.DataFrame({'id': [3]}), None),
+    ]
+    chunks = list(exporter.database.iter_customer_chunks(chunk_size=2))
+    assert [len(c) for c in chunks] == [2, 1]
+    assert mock_query.call_args_list[1].args[4] == 4 # after_id = menor id do bloco anterior
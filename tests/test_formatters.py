@@ -0,0 +1,29 @@
+import random
+import pandas as pd
+import pytest
+import formatters
+import validators
+
+EDGE_CASES = [
+    None, "", " ", "abc", "12345678901", "123.456.789-01", "12.345.678/0001-95",
+    "12345678000195", "(11) 98765-4321", "11 8765-4321", "1187654321", "119876543",
+    "119876543210", "1234567890123456", "+55 (11) 98765-4321", "١٢٣٤٥٦٧٨٩٠١", "12a34b56c78d901",
+]
+
+def _random_inputs(n=500, seed=42):
+    rng = random.Random(seed)
+    alphabet = "0123456789" * 4 + ".-/() +ab"
+    return [''.join(rng.choice(alphabet) for _ in range(rng.randint(0, 20))) for _ in range(n)]
+
+@pytest.mark.parametrize("name", ["format_cpf", "format_cnpj", "format_whatsapp", "get_whatsapp_url"])
+def test_batch_matches_scalar(name):
+    values = EDGE_CASES + _random_inputs()
+    batch = getattr(formatters, name)(pd.Series(values, dtype=object)).tolist()
+    scalar = [getattr(validators, name)(v) for v in values]
+    assert batch == scalar
+
+def test_format_filled_keeps_empty_values():
+    series = pd.Series(["12345678901", None, ""], index=[10, 20, 30])
+    result = formatters.format_filled(series, formatters.format_cpf)
+    assert result.tolist() == ["123.456.789-01", None, ""]
+    assert result.index.tolist() == [10, 20, 30]
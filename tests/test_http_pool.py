@@ -0,0 +1,68 @@
+import httpx
+import pytest
+from unittest.mock import patch
+import http_pool
+
+def make_client(handler, retries=2, threshold=3):
+    breaker = http_pool.CircuitBreaker(threshold, reset_timeout=60)
+    transport = http_pool.ResilientTransport(httpx.MockTransport(handler), breaker, retries, backoff=0, open_error=ValueError)
+    return httpx.Client(transport=transport, base_url="http://supabase.test"), transport
+
+def test_reads_are_retried_on_transient_errors():
+    calls = []
+    def handler(request):
+        calls.append(request.method)
+        if len(calls) < 3:
+            raise httpx.ConnectError("recusada")
+        return httpx.Response(200, json=[])
+    client, transport = make_client(handler)
+    assert client.get("/rest/v1/customers").status_code == 200
+    assert len(calls) == 3 and transport.stats()["retried"] == 2
+
+def test_writes_are_not_retried():
+    calls = []
+    def handler(request):
+        calls.append(request.method)
+        return httpx.Response(503)
+    client, _ = make_client(handler)
+    assert client.post("/rest/v1/customers", json={}).status_code == 503
+    assert calls == ["POST"]
+
+def test_circuit_opens_and_fails_fast():
+    calls = []
+    def handler(request):
+        calls.append(request.method)
+        raise httpx.ConnectError("fora do ar")
+    client, transport = make_client(handler, retries=0, threshold=2)
+    for _ in range(2):
+        with pytest.raises(httpx.ConnectError):
+            client.get("/rest/v1/customers")
+    with pytest.raises(ValueError):
+        client.get("/rest/v1/customers")
+    assert len(calls) == 2
+    assert transport.stats()["circuit"] == http_pool.CircuitBreaker.OPEN
+
+def test_circuit_half_open_probe_closes_on_success():
+    breaker = http_pool.CircuitBreaker(1, reset_timeout=10)
+    breaker.record_failure()
+    assert not breaker.allow()
+    with patch("http_pool.time.monotonic", return_value=breaker.opened_at + 11):
+        assert breaker.allow()
+        assert not breaker.allow() # só uma requisição de teste por vez
+    breaker.record_success()
+    assert breaker.allow()
+
+def test_read_rpcs_go_by_get_and_are_retried():
+    from postgrest import SyncPostgrestClient
+    import supabase_backend
+    calls = []
+    def handler(request):
+        calls.append((request.method, request.url.path, dict(request.url.params)))
+        if len(calls) == 1:
+            return httpx.Response(503)
+        return httpx.Response(200, json=[{"dimensao": "estado", "chave": "PR", "contagem": 1}])
+    client, _ = make_client(handler)
+    postgrest = SyncPostgrestClient("http://supabase.test/rest/v1", http_client=client)
+    backend = supabase_backend.SupabaseBackend(lambda: postgrest)
+    assert backend.dashboard_stats("2024-01-01", None) == [{"dimensao": "estado", "chave": "PR", "contagem": 1}]
+    assert calls == [("GET", "/rest/v1/rpc/dashboard_stats", {"start_date": "2024-01-01"})] * 2
@@ -0,0 +1,78 @@
+import io
+import pandas as pd
+import pytest
+from unittest.mock import patch, MagicMock
+import database
+import importer
+
+CSV = """Nome;Documento;Telefone 1;E-mail;Data de Nascimento;UF
+Ana;529.982.247-25;11987654321;ana@exemplo.com;10/05/1990;sp
+Bruno Ltda;11.222.333/0001-81;(21) 3333-4444;;;RJ
+;123;00123;invalido;32/13/2000;
+Ana de novo;52998224725;;;;
+"""
+
+@pytest.fixture
+def sqlite_db(tmp_path):
+    backend = database.create_backend("sqlite", path=str(tmp_path / "clientes.db"), pool_size=2)
+    database.set_backend(backend)
+    yield backend
+    database.set_backend(None)
+
+def _frame():
+    return importer.read_import_file(io.StringIO(CSV), "clientes.csv")
+
+def test_prepare_frame_maps_headers_and_document():
+    df = importer.prepare_frame(_frame())
+    assert df.loc[0, 'tipo_documento'] == 'CPF' and df.loc[0, 'cpf'] == '52998224725'
+    assert df.loc[1, 'tipo_documento'] == 'CNPJ' and df.loc[1, 'cnpj'] == '11222333000181'
+    assert df.loc[0, 'estado'] == 'SP'
+
+def test_check_import_frame_reports_every_problem():
+    errors = importer.check_import_frame(importer.prepare_frame(_frame()))
+    assert errors[0] == '' and errors[1] == ''
+    for message in ("'Nome Completo' é obrigatório", "e-mail é inválido", "10 ou 11 dígitos", "data de nascimento"):
+        assert message in errors[2]
+    assert errors[3] == "CPF/CNPJ repetido na planilha."
+
+def test_import_customers_chunks_and_duplicates(sqlite_db):
+    with patch.object(sqlite_db, 'find_documents', wraps=sqlite_db.find_documents) as lookup:
+        report = importer.import_customers(_frame(), chunk_size=1)
+    assert lookup.call_count == 1 # uma única consulta para todos os documentos
+    assert report['status'].tolist() == ['inserido', 'inserido', 'inválido', 'inválido']
+    assert report['linha'].tolist() == [2, 3, 4, 5]
+
+    customer = database.get_customer_by_id(int(report.loc[0, 'id']))
+    assert customer['cpf'] == '529.982.247-25' and customer['telefone1'] == '(11) 98765-4321'
+    assert str(customer['data_nascimento']) == '1990-05-10'
+
+    again = importer.import_customers(_frame())
+    assert again['status'].tolist()[:2] == ['duplicado', 'duplicado']
+
+def test_import_customers_isolates_failing_row_in_chunk():
+    rows_inserted = []
+    def insert(rows):
+        if len(rows) > 1:
+            raise database.DuplicateEntryError("duplicado")
+        if rows[0]['nome_completo'] == 'Bruno Ltda':
+            raise database.DuplicateEntryError("O CPF ou CNPJ informado já existe no banco de dados.")
+        rows_inserted.append(rows[0])
+        return [{'id': 7}]
+    with patch('database.find_existing_documents', return_value=set()), \
+         patch('database.insert_customers', side_effect=insert):
+        report = importer.import_customers(_frame(), chunk_size=10)
+    assert report['status'].tolist()[:2] == ['inserido', 'duplicado']
+    assert len(rows_inserted) == 1
+
+@patch('database.get_supabase_client')
+def test_find_existing_documents_single_in_query(mock_client):
+    table = mock_client.return_value.table.return_value
+    table.select.return_value.or_.return_value.execute.return_value = MagicMock(data=[{'id': 1, 'cpf': '529.982.247-25', 'cnpj': None}])
+    database.set_backend(database.create_backend("supabase"))
+    try:
+        existing = database.find_existing_documents(['529.982.247-25', '111.444.777-35'], ['11.222.333/0001-81'])
+    finally:
+        database.set_backend(None)
+    assert existing == {'529.982.247-25'}
+    table.select.return_value.or_.assert_called_once_with(
+        'cpf.in.("111.444.777-35","529.982.247-25"),cnpj.in.("11.222.333/0001-81")')
@@ -0,0 +1,39 @@
+import json
+import logging
+import pandas as pd
+import metrics
+
+def test_filter_signature_names_filters_not_values():
+    assert metrics.filter_signature({'search_query': 'Ana', 'state_filter': 'PR', 'start_date': None}) == "search_query:nome+state_filter"
+    assert metrics.filter_signature({'search_query': '123.456'}) == "search_query:documento"
+    assert metrics.filter_signature({}) == "-"
+
+def test_measure_rows_and_bytes():
+    df = pd.DataFrame({'nome': ['a', 'b']})
+    assert metrics.measure((df, 10))[0] == 2
+    assert metrics.measure([{'id': 1}]) == (1, len('[{"id": 1}]'))
+    assert metrics.measure(None) == (0, 0)
+
+def test_summary_percentiles_and_prometheus_text():
+    registry = metrics.QueryMetrics()
+    for ms in range(1, 101):
+        registry.record("fetch_page", "-", ms / 1000, [{'id': 1}], cache="miss")
+    registry.record("fetch_page", "-", 0.5, error=RuntimeError("timeout"))
+
+    row = registry.summary().iloc[0]
+    assert row['chamadas'] == 101 and row['erros'] == 1
+    assert 50 <= row['p50_ms'] <= 52 and row['p99_ms'] > row['p95_ms']
+
+    text = registry.prometheus_text()
+    assert 'database_query_duration_seconds_count{function="fetch_page",filters="-"} 101' in text
+    assert 'database_query_rows_total{function="fetch_page",filters="-"} 100' in text
+
+def test_only_slow_or_failed_calls_are_logged(caplog):
+    registry = metrics.QueryMetrics()
+    with caplog.at_level(logging.INFO, logger="database.metrics"):
+        registry.record("fetch_page", "-", 0.001, [{'id': 1}], cache="hit")
+        registry.record("fetch_page", "-", metrics.SLOW_QUERY_SECONDS, [{'id': 1}], cache="miss")
+        registry.record("fetch_page", "-", 0.001, error=RuntimeError("timeout"))
+    assert [json.loads(r.message)["ms"] for r in caplog.records] == [metrics.SLOW_QUERY_SECONDS * 1000, 1.0]
+    assert all(r.levelno == logging.WARNING for r in caplog.records)
+    assert registry.summary().iloc[0]['chamadas'] == 3
@@ -0,0 +1,111 @@
+import time
+import pytest
+import outbox
+
+class Duplicate(Exception):
+    pass
+
+@pytest.fixture
+def queue(tmp_path):
+    return outbox.Outbox(str(tmp_path / "outbox.db"), max_attempts=3)
+
+def _row(cpf):
+    return {'nome_completo': f'Cliente {cpf}', 'tipo_documento': 'CPF', 'cpf': cpf}
+
+def test_flush_sends_batch_and_records_latency(queue):
+    batches = []
+    def send(rows):
+        batches.append(rows)
+        return [{'id': i + 1, **row} for i, row in enumerate(rows)]
+    for cpf in ('111', '222', '333'):
+        queue.enqueue(_row(cpf))
+    assert queue.has_pending('222')
+    assert queue.stats()['depth'] == 3
+
+    assert outbox.flush_once(queue, send, Duplicate) == 3
+    assert len(batches) == 1 and [r['cpf'] for r in batches[0]] == ['111', '222', '333']
+    stats = queue.stats()
+    assert stats['depth'] == 0 and stats['avg_latency'] is not None
+    assert not queue.has_pending('222')
+
+def test_flush_backs_off_on_failure(queue, monkeypatch):
+    monkeypatch.setattr(outbox.random, 'uniform', lambda a, b: 1.0)
+    queue.enqueue(_row('111'))
+    def down(rows):
+        raise ConnectionError("timeout")
+    assert outbox.flush_once(queue, down, Duplicate) == 0
+    assert queue.due() == [] # reagendado para daqui a BACKOFF_BASE segundos
+    assert queue.stats()['depth'] == 1
+    assert outbox.backoff(1) == outbox.BACKOFF_BASE and outbox.backoff(3) == 4 * outbox.BACKOFF_BASE
+    assert outbox.backoff(100) == outbox.BACKOFF_MAX
+
+    # Esgotadas as tentativas, o cadastro vira 'failed' e aparece nos problemas
+    with queue.pool.connection() as conn:
+        conn.execute("UPDATE outbox SET next_attempt_at = 0")
+    outbox.flush_once(queue, down, Duplicate)
+    with queue.pool.connection() as conn:
+        conn.execute("UPDATE outbox SET next_attempt_at = 0")
+    outbox.flush_once(queue, down, Duplicate)
+    assert [p['status'] for p in queue.problems()] == ['failed']
+
+def test_flush_isolates_duplicates(queue):
+    for cpf in ('111', 'dup', '333'):
+        queue.enqueue(_row(cpf))
+    def send(rows):
+        if any(r['cpf'] == 'dup' for r in rows):
+            raise Duplicate("O CPF ou CNPJ informado já existe no banco de dados.")
+        return rows
+    assert outbox.flush_once(queue, send, Duplicate) == 2
+    problems = queue.problems()
+    assert [(p['status'], p['customer']['cpf']) for p in problems] == [('conflict', 'dup')]
+    queue.acknowledge([problems[0]['id']])
+    assert queue.problems() == [] and queue.stats()['conflicts'] == 0
+
+def test_flush_isolates_rejected_row_from_batch(queue, monkeypatch):
+    monkeypatch.setattr(outbox.random, 'uniform', lambda a, b: 1.0)
+    for cpf in ('111', '222', 'bad', '444', '555'):
+        queue.enqueue(_row(cpf))
+    batches = []
+    def send(rows):
+        batches.append(len(rows))
+        if any(r['cpf'] == 'bad' for r in rows):
+            # Erro de dados (ex.: check constraint), envolvido como faz database.insert_customers
+            try:
+                raise ValueError("new row violates check constraint")
+            except ValueError as e:
+                raise RuntimeError("Ocorreu um erro ao salvar no banco de dados") from e
+        return rows
+    assert outbox.flush_once(queue, send, Duplicate) == 4
+    assert batches[0] == 5 and len(batches) < 10 # dividido ao meio, não um a um
+    # O recusado vira falha na hora, sem novas tentativas
+    assert queue.stats()['depth'] == 0
+    assert [(p['status'], p['customer']['cpf']) for p in queue.problems()] == [('failed', 'bad')]
+
+    # Erro de conexão, mesmo envolvido em outro erro, reagenda o lote inteiro sem dividir
+    queue.enqueue(_row('666'))
+    queue.enqueue(_row('777'))
+    batches.clear()
+    def down(rows):
+        batches.append(len(rows))
+        try:
+            raise TimeoutError("timed out")
+        except TimeoutError as e:
+            raise RuntimeError("Ocorreu um erro ao salvar no banco de dados") from e
+    assert outbox.flush_once(queue, down, Duplicate) == 0
+    assert batches == [2] and queue.stats()['depth'] == 2
+
+def test_flusher_thread_drains_queue(queue):
+    sent = []
+    flusher = outbox.Flusher(queue, lambda rows: sent.extend(rows) or rows, Duplicate, poll_interval=0.05)
+    flusher.start()
+    try:
+        queue.enqueue(_row('111'))
+        flusher.wake()
+        deadline = time.time() + 5
+        while not sent and time.time() < deadline:
+            time.sleep(0.01)
+    finally:
+        flusher.stop()
+        flusher.join(timeout=5)
+    assert [r['cpf'] for r in sent] == ['111']
+    assert flusher.last_flush_seconds is not None
@@ -0,0 +1,48 @@
+import threading
+import pandas as pd
+import database
+import page_cache
+
+def _loader(calls, page, event=None, started=None):
+    def load():
+        if started is not None:
+            started.set()
+        if event is not None:
+            event.wait(5)
+        calls.append(page)
+        return pd.DataFrame({'id': [page]}), None
+    return load
+
+def test_fetch_caches_pages_with_lru_eviction():
+    cache = page_cache.PageCache(maxsize=2)
+    calls = []
+    for page in (1, 2, 1, 3, 2):
+        df, _ = cache.fetch(("", "Todos", 10, page), _loader(calls, page))
+        assert df['id'].tolist() == [page]
+    assert calls == [1, 2, 3, 2] # a página 2 foi descartada ao entrar a 3
+    assert cache.stats()["hits"] == 1
+
+def test_prefetch_is_reused_and_writes_invalidate():
+    cache = page_cache.PageCache()
+    calls, release, started = [], threading.Event(), threading.Event()
+    cache.prefetch(("", "Todos", 10, 2), _loader(calls, 2, release, started))
+    assert started.wait(5)
+    release.set() # a busca já em andamento é aguardada, não repetida
+    cache.fetch(("", "Todos", 10, 2), _loader(calls, 99))
+    assert calls == [2]
+
+    database.invalidate_cache([{'id': 1}])
+    cache.fetch(("", "Todos", 10, 2), _loader(calls, 2))
+    assert calls == [2, 2]
+
+def test_entries_expire_after_ttl(monkeypatch):
+    # Gravações de outros processos não mudam a geração: a expiração as torna visíveis
+    cache = page_cache.PageCache(ttl=30)
+    calls, now = [], [1000.0]
+    monkeypatch.setattr(page_cache.time, "monotonic", lambda: now[0])
+    cache.fetch(("", "Todos", 10, 1), _loader(calls, 1))
+    now[0] += 20
+    cache.fetch(("", "Todos", 10, 1), _loader(calls, 1))
+    now[0] += 20
+    cache.fetch(("", "Todos", 10, 1), _loader(calls, 1))
+    assert calls == [1, 1]
@@ -0,0 +1,106 @@
+import pytest
+from unittest.mock import MagicMock
+import database
+import replica
+from sqlite_backend import SQLiteBackend
+
+class FakePrimary:
+    """Backend principal em memória com updated_at e lápides, como o Supabase após sql/004."""
+
+    def __init__(self):
+        self.rows, self.tombstones, self.clock, self.calls = {}, {}, 0, []
+
+    def _tick(self):
+        self.clock += 1
+        return f"2024-01-01T00:00:{self.clock:02d}+00:00"
+
+    def write(self, id, **values):
+        self.rows[id] = {'id': id, 'tipo_documento': 'CPF', 'cpf': f'{id:011d}', **self.rows.get(id, {}), **values, 'updated_at': self._tick()}
+
+    def delete(self, id):
+        del self.rows[id]
+        self.tombstones[id] = self._tick()
+
+    @staticmethod
+    def _page(items, key, since, after_id, limit):
+        after = lambda item: since is None or (item[key], item['id']) > (since, after_id)
+        return sorted((i for i in items if after(i)), key=lambda i: (i[key], i['id']))[:limit]
+
+    def select_changes(self, columns, since=None, after_id=0, limit=1000):
+        self.calls.append(since)
+        return [{c: r.get(c) for c in columns} for r in self._page(self.rows.values(), 'updated_at', since, after_id, limit)]
+
+    def get_customer(self, customer_id, columns):
+        row = self.rows.get(customer_id)
+        return {c: row.get(c) for c in columns} if row else None
+
+    def select_deletions(self, since=None, after_id=0, limit=1000):
+        items = [{'id': i, 'deleted_at': t} for i, t in self.tombstones.items()]
+        return self._page(items, 'deleted_at', since, after_id, limit)
+
+@pytest.fixture
+def local(tmp_path):
+    return SQLiteBackend(str(tmp_path / "replica.db"), pool_size=2)
+
+def _names(backend):
+    rows, _ = backend.select_customers(['id', 'nome_completo'], database._query_filters())
+    return {r['id']: r['nome_completo'] for r in rows}
+
+def test_sync_pulls_only_changes_and_tombstones(local):
+    primary = FakePrimary()
+    for i in range(1, 6):
+        primary.write(i, nome_completo=f'Cliente {i}')
+
+    assert replica.sync(primary, local, database.REPLICA_COLUMNS, page_size=2) == {"upserted": 5, "deleted": 0}
+    assert len(_names(local)) == 5
+
+    watermark = local.get_sync_state(replica.CHANGES_WATERMARK)
+    primary.write(2, nome_completo='Cliente Dois')
+    primary.delete(4)
+    calls_before, changed = len(primary.calls), []
+    stats = replica.sync(primary, local, database.REPLICA_COLUMNS, overlap=0, on_change=changed.extend)
+
+    # A linha da marca d'água (cliente 5) é relida de propósito, mas não conta como alteração
+    assert stats == {"upserted": 2, "deleted": 1}
+    assert _names(local) == {5: 'Cliente 5', 3: 'Cliente 3', 2: 'Cliente Dois', 1: 'Cliente 1'}
+    assert {r['id'] for r in changed} == {2, 4}
+
+    # Sem alterações no principal, on_change não é chamado
+    unchanged = MagicMock()
+    for _ in range(2):
+        replica.sync(primary, local, database.REPLICA_COLUMNS, overlap=0, on_change=unchanged)
+    unchanged.assert_not_called()
+    assert primary.calls[calls_before] == watermark # a segunda sincronização parte da marca d'água
+    assert local.get_sync_state(replica.CHANGES_WATERMARK) == primary.rows[2]['updated_at']
+
+def test_sync_replaces_stale_document_owner(local):
+    primary = FakePrimary()
+    primary.write(1, nome_completo='Ana', cpf='111')
+    primary.write(2, nome_completo='Bia', cpf='222')
+    replica.sync(primary, local, database.REPLICA_COLUMNS)
+
+    # O CPF passou do cliente 1 para o 2
+    primary.write(1, cpf='333')
+    primary.write(2, cpf='111')
+    replica.sync(primary, local, database.REPLICA_COLUMNS, overlap=0)
+    documents = {r['id']: r['cpf'] for r in local.find_documents(['111', '333'], [])}
+    assert documents == {1: '333', 2: '111'}
+
+def test_replica_backend_reads_locally_and_writes_to_primary(local):
+    primary = FakePrimary()
+    primary.write(1, nome_completo='Ana')
+    primary.insert_customer = MagicMock(return_value=[{'id': 9, 'nome_completo': 'Novo', 'tipo_documento': 'CPF',
+                                                       'cpf': '999', 'nome_busca': 'novo', 'updated_at': '2024-02-01T00:00:00+00:00'}])
+    backend = replica.ReplicaBackend(primary, local, database.REPLICA_COLUMNS, sync_interval=3600)
+    primary.get_customer = MagicMock(wraps=primary.get_customer)
+
+    # A primeira leitura não espera a sincronização (em segundo plano): vai ao principal
+    assert backend.get_customer(1, ['id', 'nome_completo']) == {'id': 1, 'nome_completo': 'Ana'}
+    backend._sync_thread.join(5)
+    assert backend.get_customer(1, ['id', 'nome_completo']) == {'id': 1, 'nome_completo': 'Ana'}
+    primary.get_customer.assert_called_once()
+    backend.insert_customer({'nome_completo': 'Novo'})
+    primary.insert_customer.assert_called_once()
+    # A gravação já aparece na réplica, sem esperar a próxima sincronização
+    assert backend.get_customer(9, ['nome_completo']) == {'nome_completo': 'Novo'}
+    assert len(primary.calls) == 1 # dentro do intervalo, sem nova sincronização
@@ -0,0 +1,90 @@
+import datetime
+import pytest
+from unittest.mock import patch
+import database
+import sqlite_backend
+
+@pytest.fixture
+def sqlite_db(tmp_path):
+    """Backend SQLite real (arquivo em WAL, pool de conexões) atrás das funções de database.py."""
+    backend = database.create_backend("sqlite", path=str(tmp_path / "clientes.db"), pool_size=2)
+    database.set_backend(backend)
+    yield backend
+    database.set_backend(None)
+
+def _insert(n):
+    with patch('validators.is_valid_cpf', return_value=True):
+        for i in range(1, n + 1):
+            database.insert_customer({
+                'nome_completo': f'Cliente {i}', 'tipo_documento': 'CPF', 'cpf': f'{i:011d}',
+                'estado': 'SP' if i % 2 else 'PR', 'data_nascimento': datetime.date(1990, 1, 1),
+            })
+
+def test_sqlite_uses_wal_and_pool(sqlite_db):
+    with database.get_db_connection() as conn:
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == 'wal'
+        assert sqlite_db.pool.stats()['in_use'] == 1
+    assert sqlite_db.pool.stats()['in_use'] == 0
+
+def test_sqlite_pagination_keyset_matches_offset(sqlite_db):
+    _insert(25)
+    page_2, total = database.fetch_page(page=2, page_size=10, count='exact')
+    assert total == 25
+    page_1 = database.fetch_data(page=1, page_size=10)
+    keyset_2, keyset_total = database.fetch_page(page=2, page_size=10, after_id=int(page_1['id'].min()))
+    assert keyset_2['id'].tolist() == page_2['id'].tolist()
+    assert keyset_total == 25
+    back_1 = database.fetch_data(page=1, page_size=10, before_id=int(page_2['id'].max()))
+    assert back_1['id'].tolist() == page_1['id'].tolist()
+
+def test_sqlite_filters_and_formatting(sqlite_db):
+    _insert(6)
+    df = database.fetch_data(state_filter='PR', search_query='00000000004', columns=['cpf', 'estado'])
+    assert df['cpf'].tolist() == ['000.000.000-04']
+    assert database.count_total_records(search_query='cliente') == 6
+    assert database.get_customer_by_id(int(df.iloc[0]['id']))['data_nascimento'] == datetime.date(1990, 1, 1)
+
+def test_sqlite_duplicate_and_dashboard_bundle(sqlite_db):
+    _insert(3)
+    with pytest.raises(database.DuplicateEntryError):
+        _insert(1)
+    bundle = database.fetch_dashboard_bundle()
+    assert bundle['total'] == 3
+    assert bundle['stats']['estado'].to_dict() == {'SP': 2, 'PR': 1}
+    assert len(bundle['recentes']) == 3
+
+def _raw_stats(conn):
+    rows = conn.execute('''
+        SELECT 'estado', estado, COUNT(*) FROM customers WHERE estado <> '' GROUP BY estado
+        UNION ALL SELECT 'cidade', cidade, COUNT(*) FROM customers WHERE cidade <> '' GROUP BY cidade
+        UNION ALL SELECT 'tipo_documento', tipo_documento, COUNT(*) FROM customers GROUP BY tipo_documento
+        UNION ALL SELECT 'mes', strftime('%Y-%m', data_cadastro), COUNT(*) FROM customers
+            WHERE data_cadastro IS NOT NULL GROUP BY 2''').fetchall()
+    return sorted(rows)
+
+def test_sqlite_daily_rollup_follows_writes(sqlite_db):
+    with database.get_db_connection() as conn:
+        for i in range(1, 13):
+            conn.execute("INSERT INTO customers (nome_completo, tipo_documento, cpf, estado, cidade, data_cadastro) VALUES (?, 'CPF', ?, ?, ?, ?)",
+                         (f'C{i}', f'{i:011d}', 'SP' if i % 3 else 'PR', f'Cidade {i % 4}', f'2024-{i:02d}-15'))
+        conn.execute("UPDATE customers SET estado = 'RS', data_cadastro = '2024-01-20' WHERE id IN (2, 5)")
+        conn.execute("UPDATE customers SET nome_completo = 'Outro' WHERE id = 3") # não altera o resumo
+        conn.execute("DELETE FROM customers WHERE id IN (1, 7)")
+        conn.execute("INSERT INTO customers (nome_completo, tipo_documento, cnpj) VALUES ('Sem data', 'CNPJ', '1')")
+        conn.execute("UPDATE customers SET data_cadastro = NULL WHERE cnpj = '1'")
+
+        rollup = sorted(tuple(r.values()) for r in sqlite_backend.dashboard_stats(conn))
+        assert rollup == _raw_stats(conn)
+        assert conn.execute("SELECT SUM(contagem) FROM customers_daily").fetchone()[0] == 11
+        assert conn.execute("SELECT COUNT(*) FROM customers_daily WHERE contagem <= 0").fetchone()[0] == 0
+        conn.execute("DELETE FROM customers_daily")
+
+    assert database.rebuild_dashboard_rollup() > 0
+    bundle = database.fetch_dashboard_bundle(datetime.date(2024, 1, 1), datetime.date(2024, 1, 31))
+    assert bundle["total"] == 11
+    assert bundle["novos_no_periodo"] == 2 # ids 2 e 5 movidos para janeiro; o id 1 foi removido
+    assert bundle["stats"]["estado"].to_dict() == {'RS': 2}
+
+def test_sqlite_list_states(sqlite_db):
+    _insert(3)
+    assert database.list_states() == ['PR', 'SP']
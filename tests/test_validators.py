@@ -43,3 +43,52 @@ def test_is_valid_email_invalid():
         validators.is_valid_email("not-an-email")
     with pytest.raises(validators.EmailValueError):
         validators.is_valid_email("")
+
+def _random_documents(n, seed=0):
+    import random
+    from validate_docbr import CPF, CNPJ
+    rng = random.Random(seed)
+    values = [''.join(rng.choice("0123456789.-/ aB") for _ in range(rng.randint(0, 16))) for _ in range(n)]
+    values += [CPF().generate(mask=i % 2 == 0) for i in range(n // 4)]
+    values += [CNPJ().generate(mask=i % 2 == 0) for i in range(n // 4)]
+    return values + ['', '111.111.111-11', '00000000000000', '123.456.789-0']
+
+def test_are_valid_cpfs_parity():
+    from validate_docbr import CPF
+    values = _random_documents(4000)
+    expected = [CPF().validate(v) for v in values]
+    assert validators.are_valid_cpfs(values).tolist() == expected
+
+def test_are_valid_cnpjs_parity():
+    from validate_docbr import CNPJ
+    values = _random_documents(4000, seed=1)
+    expected = [CNPJ().validate(v) for v in values]
+    assert validators.are_valid_cnpjs(values).tolist() == expected
+
+def test_whatsapp_errors_parity():
+    import random
+    rng = random.Random(2)
+    values = [''.join(rng.choice("0123456789 ()-") for _ in range(rng.randint(1, 16))) for _ in range(4000)]
+    bad_length, bad_ddd = validators.whatsapp_errors(values)
+    for value, length_error, ddd_error in zip(values, bad_length, bad_ddd):
+        try:
+            validators.is_valid_whatsapp(value)
+            assert not length_error and not ddd_error
+        except validators.WhatsAppValueError as e:
+            assert (length_error, ddd_error) == (('dígitos' in str(e)), ('DDD' in str(e)))
+
+def test_validate_frame_error_codes():
+    import pandas as pd
+    df = pd.DataFrame({
+        'nome_completo': ['Ana', '', 'Empresa', 'Bia'],
+        'tipo_documento': ['CPF', 'CPF', 'CNPJ', 'RG'],
+        'cpf': ['529.982.247-25', '529.982.247-26', None, ''],
+        'cnpj': [None, None, '11.222.333/0001-81', ''],
+        'telefone1': ['(11) 98765-4321', '', '0198765432', '123'],
+    })
+    codes = validators.validate_frame(df)
+    assert codes[0] == 0
+    assert codes[1] == validators.ERROR_NAME_REQUIRED | validators.ERROR_CPF_INVALID
+    assert codes[2] == validators.ERROR_PHONE1_DDD
+    assert codes[3] == validators.ERROR_DOCUMENT_TYPE | validators.ERROR_PHONE1_LENGTH
+    assert validators.error_messages(codes)[2] == "O DDD do Telefone 1 é inválido."
@@ -1,4 +1,9 @@
 import re
+import unicodedata
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
 from validate_docbr import CPF, CNPJ
 from email_validator import validate_email, EmailNotValidError
 
@@ -32,10 +37,13 @@ def format_cpf(cpf: str) -> str:
         return f'{cpf_cleaned[:3]}.{cpf_cleaned[3:6]}.{cpf_cleaned[6:9]}-{cpf_cleaned[9:]}'
     return "" # Retorna string vazia se não for possível formatar
 
+# Validadores reutilizados entre chamadas (não guardam estado)
+_CPF_VALIDATOR = CPF()
+_CNPJ_VALIDATOR = CNPJ()
+
 def is_valid_cpf(cpf: str) -> bool:
     """Verifica se um CPF é válido. Lança CPFValueError se inválido."""
-    cpf_validator = CPF()
-    if not cpf_validator.validate(cpf):
+    if not _CPF_VALIDATOR.validate(cpf):
         raise CPFValueError("O CPF informado é inválido.")
     return True
 
@@ -50,8 +58,7 @@ def format_cnpj(cnpj: str) -> str:
 
 def is_valid_cnpj(cnpj: str) -> bool:
     """Verifica se um CNPJ é válido. Lança CNPJValueError se inválido."""
-    cnpj_validator = CNPJ()
-    if not cnpj_validator.validate(cnpj):
+    if not _CNPJ_VALIDATOR.validate(cnpj):
         raise CNPJValueError("O CNPJ informado é inválido.")
     return True
 
@@ -66,6 +73,16 @@ def format_whatsapp(whatsapp: str) -> str:
         return f'({whatsapp_cleaned[:2]}) {whatsapp_cleaned[2:6]}-{whatsapp_cleaned[6:]}'
     return "" # Retorna string vazia se não for possível formatar
 
+VALID_DDDS = [
+    11, 12, 13, 14, 15, 16, 17, 18, 19, 21, 22, 24, 27, 28, 31, 32, 33, 34, 35, 37, 38, 
+    41, 42, 43, 44, 45, 46, 47, 48, 49, 51, 53, 54, 55, 61, 62, 63, 64, 65, 66, 67, 
+    68, 69, 71, 73, 74, 75, 77, 79, 81, 82, 83, 84, 85, 86, 87, 88, 89, 91, 92, 93, 
+    94, 95, 96, 97, 98, 99
+]
+# Tabela de consulta indexada pelo DDD (0 a 99)
+DDD_TABLE = np.zeros(100, dtype=bool)
+DDD_TABLE[VALID_DDDS] = True
+
 def is_valid_whatsapp(whatsapp: str) -> bool:
     # ... (função mantida como antes)
     whatsapp_cleaned = re.sub(r'[^0-9]', '', whatsapp)
@@ -74,14 +91,7 @@ def is_valid_whatsapp(whatsapp: str) -> bool:
         raise WhatsAppValueError("O número de WhatsApp deve conter 10 ou 11 dígitos.")
 
     ddd = int(whatsapp_cleaned[:2])
-    valid_ddds = [
-        11, 12, 13, 14, 15, 16, 17, 18, 19, 21, 22, 24, 27, 28, 31, 32, 33, 34, 35, 37, 38, 
-        41, 42, 43, 44, 45, 46, 47, 48, 49, 51, 53, 54, 55, 61, 62, 63, 64, 65, 66, 67, 
-        68, 69, 71, 73, 74, 75, 77, 79, 81, 82, 83, 84, 85, 86, 87, 88, 89, 91, 92, 93, 
-        94, 95, 96, 97, 98, 99
-    ]
-    
-    if ddd not in valid_ddds:
+    if not DDD_TABLE[ddd]:
         raise WhatsAppValueError(f"O DDD '{ddd}' é inválido.")
         
     return True
@@ -107,3 +117,139 @@ def get_whatsapp_url(whatsapp: str) -> str:
         return f"https://wa.me/55{whatsapp_cleaned}"
     return "" # Retorna vazio se o número for inválido
 
+def only_digits(value: str) -> str:
+    """Remove todos os caracteres não numéricos (ex.: '123.456.789-01' -> '12345678901')."""
+    return re.sub(r'[^0-9]', '', value or '')
+
+def fold_accents(text: str) -> str:
+    """Remove acentos e converte para minúsculas (ex.: 'João' -> 'joao'), para comparações de busca."""
+    normalized = unicodedata.normalize('NFKD', text or '')
+    return ''.join(c for c in normalized if not unicodedata.combining(c)).lower()
+
+
+# --- Validação em lote ---
+
+# Códigos de erro de validate_frame: um bit por problema, 0 = linha válida
+ERROR_NAME_REQUIRED = 1 << 0
+ERROR_DOCUMENT_TYPE = 1 << 1
+ERROR_CPF_REQUIRED = 1 << 2
+ERROR_CPF_INVALID = 1 << 3
+ERROR_CNPJ_REQUIRED = 1 << 4
+ERROR_CNPJ_INVALID = 1 << 5
+ERROR_PHONE1_LENGTH = 1 << 6
+ERROR_PHONE1_DDD = 1 << 7
+ERROR_PHONE2_LENGTH = 1 << 8
+ERROR_PHONE2_DDD = 1 << 9
+
+ERROR_MESSAGES = {
+    ERROR_NAME_REQUIRED: "O campo 'Nome Completo' é obrigatório.",
+    ERROR_DOCUMENT_TYPE: "O campo 'Tipo de Documento' deve ser CPF ou CNPJ.",
+    ERROR_CPF_REQUIRED: "O campo 'CPF' é obrigatório.",
+    ERROR_CPF_INVALID: "O CPF informado é inválido.",
+    ERROR_CNPJ_REQUIRED: "O campo 'CNPJ' é obrigatório.",
+    ERROR_CNPJ_INVALID: "O CNPJ informado é inválido.",
+    ERROR_PHONE1_LENGTH: "O número de WhatsApp (Telefone 1) deve conter 10 ou 11 dígitos.",
+    ERROR_PHONE1_DDD: "O DDD do Telefone 1 é inválido.",
+    ERROR_PHONE2_LENGTH: "O número de WhatsApp (Telefone 2) deve conter 10 ou 11 dígitos.",
+    ERROR_PHONE2_DDD: "O DDD do Telefone 2 é inválido.",
+}
+
+_CPF_WEIGHTS_1 = np.arange(10, 1, -1)
+_CPF_WEIGHTS_2 = np.arange(11, 1, -1)
+_CNPJ_WEIGHTS_1 = np.array([5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2])
+_CNPJ_WEIGHTS_2 = np.array([6, 5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2])
+
+def _strings(values) -> pa.Array:
+    """Valores como array de texto do pyarrow, com nulos como string vazia."""
+    array = pa.array(pd.Series(values).to_numpy(dtype=object), type=pa.string(), from_pandas=True)
+    return pc.fill_null(array, "")
+
+def _char_matrix(strings: pa.Array, width: int) -> np.ndarray:
+    """Matriz (linhas x width) com o valor de cada caractere menos 48 ('0' -> 0, 'A' -> 17).
+
+    Todas as strings precisam ter exatamente `width` caracteres ASCII.
+    """
+    if len(strings) == 0:
+        return np.zeros((0, width), dtype=np.int64)
+    fixed = strings.to_numpy(zero_copy_only=False).astype(f'U{width}')
+    return fixed.view(np.uint32).reshape(-1, width).astype(np.int64) - 48
+
+def are_valid_cpfs(values) -> np.ndarray:
+    """Versão vetorizada de CPF().validate (validate_docbr): um booleano por valor.
+
+    Aceita dígitos, '.' e '-'; completa com zeros à esquerda até 11 dígitos e recusa
+    números com todos os dígitos iguais.
+    """
+    strings = _strings(values)
+    allowed = pc.invert(pc.match_substring_regex(strings, r"[^0-9.\-]"))
+    digits = pc.replace_substring_regex(strings, r"[^0-9]", "")
+    fits = pc.less_equal(pc.utf8_length(digits), 11)
+    digits = pc.if_else(fits, pc.utf8_lpad(digits, 11, "0"), "00000000000")
+    d = _char_matrix(digits, 11)
+    first = (d[:, :9] @ _CPF_WEIGHTS_1) * 10 % 11 % 10
+    second = (d[:, :10] @ _CPF_WEIGHTS_2) * 10 % 11 % 10
+    repeated = (d == d[:, :1]).all(axis=1)
+    checks = (first == d[:, 9]) & (second == d[:, 10]) & ~repeated
+    return checks & allowed.to_numpy(zero_copy_only=False) & fits.to_numpy(zero_copy_only=False)
+
+def are_valid_cnpjs(values) -> np.ndarray:
+    """Versão vetorizada de CNPJ().validate (validate_docbr): um booleano por valor.
+
+    Aceita dígitos, letras ASCII (CNPJ alfanumérico), '.', '/' e '-'; exige 14 caracteres.
+    """
+    strings = _strings(values)
+    allowed = pc.invert(pc.match_substring_regex(strings, r"[^0-9A-Za-z./\-]"))
+    chars = pc.utf8_upper(pc.replace_substring_regex(strings, r"[^0-9A-Za-z]", ""))
+    fits = pc.equal(pc.utf8_length(chars), 14)
+    d = _char_matrix(pc.if_else(fits, chars, "00000000000000"), 14)
+    first = d[:, :12] @ _CNPJ_WEIGHTS_1 % 11
+    first = np.where(first < 2, 0, 11 - first)
+    second = d[:, :13] @ _CNPJ_WEIGHTS_2 % 11
+    second = np.where(second < 2, 0, 11 - second)
+    checks = (first == d[:, 12]) & (second == d[:, 13])
+    return checks & allowed.to_numpy(zero_copy_only=False) & fits.to_numpy(zero_copy_only=False)
+
+def whatsapp_errors(values) -> tuple:
+    """Versão vetorizada de is_valid_whatsapp: (tamanho inválido, DDD inválido), um booleano por valor."""
+    digits = pc.replace_substring_regex(_strings(values), r"[^0-9]", "")
+    length = pc.utf8_length(digits).to_numpy(zero_copy_only=False)
+    bad_length = (length < 10) | (length > 11)
+    ddd = pc.utf8_slice_codeunits(pc.if_else(pa.array(bad_length), "00", digits), 0, 2)
+    bad_ddd = ~bad_length & ~DDD_TABLE[_char_matrix(ddd, 2) @ np.array([10, 1])]
+    return bad_length, bad_ddd
+
+def validate_frame(df: pd.DataFrame) -> np.ndarray:
+    """Valida todas as linhas de uma vez, com as regras de database._validate_row exceto o e-mail.
+
+    Retorna um array de inteiros com os códigos de erro (bits ERROR_*) de cada linha;
+    0 significa linha válida. Use error_messages para obter os textos.
+    """
+    n = len(df)
+    empty = lambda col: (_strings(df[col]) if col in df else pa.array([""] * n)).to_numpy(zero_copy_only=False) == ""
+    column = lambda col: df[col] if col in df else pd.Series([""] * n, index=df.index)
+    tipo = column('tipo_documento').to_numpy(dtype=object)
+    is_cpf, is_cnpj = tipo == 'CPF', tipo == 'CNPJ'
+
+    codes = np.zeros(n, dtype=np.int64)
+    codes |= np.where(empty('nome_completo'), ERROR_NAME_REQUIRED, 0)
+    codes |= np.where(~is_cpf & ~is_cnpj, ERROR_DOCUMENT_TYPE, 0)
+    for mask, col, required, invalid, check in (
+        (is_cpf, 'cpf', ERROR_CPF_REQUIRED, ERROR_CPF_INVALID, are_valid_cpfs),
+        (is_cnpj, 'cnpj', ERROR_CNPJ_REQUIRED, ERROR_CNPJ_INVALID, are_valid_cnpjs),
+    ):
+        missing = empty(col)
+        codes |= np.where(mask & missing, required, 0)
+        # Dígitos verificadores calculados só nas linhas do tipo de documento correspondente
+        rows = np.flatnonzero(mask & ~missing)
+        codes[rows[~check(column(col).iloc[rows])]] |= invalid
+    for col, length_error, ddd_error in (('telefone1', ERROR_PHONE1_LENGTH, ERROR_PHONE1_DDD),
+                                         ('telefone2', ERROR_PHONE2_LENGTH, ERROR_PHONE2_DDD)):
+        filled = ~empty(col)
+        bad_length, bad_ddd = whatsapp_errors(column(col))
+        codes |= np.where(filled & bad_length, length_error, 0)
+        codes |= np.where(filled & bad_ddd, ddd_error, 0)
+    return codes
+
+def error_messages(codes) -> list:
+    """Converte os códigos de validate_frame em textos (mensagens separadas por espaço; "" se válida)."""
+    return [' '.join(message for bit, message in ERROR_MESSAGES.items() if code & bit) for code in np.asarray(codes).tolist()]